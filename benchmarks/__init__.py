@@ -0,0 +1,4 @@
+"""Benchmarks that drive ``main:app`` in-process (``pip install -r benchmarks/requirements.txt``).
+
+Run from the repository root, e.g. ``python -m benchmarks.batch_subscriptions``.
+"""
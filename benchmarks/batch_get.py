@@ -0,0 +1,112 @@
+"""Latency of POST /users:batchGet versus one GET /users/{id} per ID.
+
+Seeds ``--users`` users straight into the store, then resolves ``--ids`` of
+them (plus ``--missing`` unknown IDs) both ways through the app in process:
+sequential GETs, as a client resolving a page of references would, and
+batchGet requests of ``--batch-size`` IDs each. The response cache is
+cleared before each pass, so every GET reads the store. Both passes must
+find the same users and report the same unknown IDs; the script exits
+non-zero otherwise.
+
+    python -m benchmarks.batch_get --backend sqlite --ids 2000 --batch-size 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+_tmp = tempfile.TemporaryDirectory()
+
+
+def configure(backend: str) -> None:
+    os.environ["STORAGE_BACKEND"] = backend
+    os.environ["SQLITE_PATH"] = os.path.join(_tmp.name, "batch_get.db")
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+
+async def sequential(client, ids: List[str]) -> Dict[str, object]:
+    found, missing = [], []
+    started = time.perf_counter()
+    for key in ids:
+        r = await client.get(f"/users/{key}")
+        if r.status_code == 404:
+            missing.append(key)
+        else:
+            r.raise_for_status()
+            found.append(r.json()["id"])
+    return {"seconds": time.perf_counter() - started, "requests": len(ids), "found": found, "missing": missing}
+
+
+async def batched(client, ids: List[str], batch_size: int) -> Dict[str, object]:
+    found, missing = [], []
+    started = time.perf_counter()
+    for start in range(0, len(ids), batch_size):
+        r = await client.post("/users:batchGet", json=ids[start:start + batch_size])
+        r.raise_for_status()
+        body = r.json()
+        found += [u["id"] for u in body["found"]]
+        missing += body["missing"]
+    requests = -(-len(ids) // batch_size)
+    return {"seconds": time.perf_counter() - started, "requests": requests, "found": found, "missing": missing}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    import httpx
+
+    import main
+    from models.user import UserCreate, UserRead
+
+    example = UserCreate.model_validate(UserCreate.model_config["json_schema_extra"]["examples"][0]).model_dump()
+    async with main.app.router.lifespan_context(main.app):
+        stored = []
+        for i in range(args.users):
+            fields = {**example, "id": uuid.uuid4(), "username": f"bench{i}", "email": f"bench{i}@example.com"}
+            stored.append(str((await main.users.add(UserRead.model_construct(**fields))).id))
+        ids = stored[:args.ids] + [str(uuid.uuid4()) for _ in range(args.missing)]
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            main.user_cache.clear()
+            one = await sequential(client, ids)
+            main.user_cache.clear()
+            many = await batched(client, ids, args.batch_size)
+
+    report: Dict[str, object] = {
+        "backend": args.backend,
+        "ids": len(ids),
+        "missing": args.missing,
+        "batch_size": args.batch_size,
+        "same_result": one["found"] == many["found"] and one["missing"] == many["missing"],
+    }
+    for name, result in (("sequential_get", one), ("batch_get", many)):
+        report[name] = {
+            "requests": result["requests"],
+            "seconds": round(result["seconds"], 4),
+            "ms_per_request": round(result["seconds"] * 1000 / result["requests"], 3),
+            "ids_per_sec": round(len(ids) / result["seconds"], 1),
+        }
+    report["speedup"] = round(one["seconds"] / many["seconds"], 1)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--users", type=int, default=5000, help="users seeded into the store")
+    parser.add_argument("--ids", type=int, default=2000, help="stored users to resolve")
+    parser.add_argument("--missing", type=int, default=50, help="unknown IDs mixed into the request")
+    parser.add_argument("-b", "--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    configure(args.backend)
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if not report["same_result"]:
+        sys.exit("batchGet and sequential GETs disagree")
@@ -0,0 +1,60 @@
+"""Throughput of POST /subscriptions:batch versus one POST /subscriptions per item."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+import main
+from services.aio import AsyncRepository
+from services.repository import SUBSCRIPTIONS, create_repository
+
+
+def payload(i: int) -> dict:
+    return {
+        "subscription_id": f"bench-{i}",
+        "service": ("Hulu", "Spotify", "Netflix")[i % 3],
+        "member_name": f"Member {i}",
+        "username": f"member{i}",
+        "password": "thisisap4ssw0rd!",
+        "gender": "F" if i % 2 else "M",
+    }
+
+
+async def single(client: httpx.AsyncClient, n: int) -> None:
+    for i in range(n):
+        r = await client.post("/subscriptions", json=payload(i))
+        r.raise_for_status()
+
+
+async def batched(client: httpx.AsyncClient, n: int, batch_size: int) -> None:
+    for start in range(0, n, batch_size):
+        body = [payload(i) for i in range(start, min(start + batch_size, n))]
+        r = await client.post("/subscriptions:batch", json=body)
+        r.raise_for_status()
+
+
+async def run(n: int, batch_size: int) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, job in (("single", single(client, n)), ("batch", batched(client, n, batch_size))):
+            main.subscriptions = AsyncRepository(create_repository(SUBSCRIPTIONS, "memory"))
+            started = time.perf_counter()
+            await job
+            elapsed = time.perf_counter() - started
+            assert len(main.subscriptions.sync) == n
+            results[name] = {"seconds": round(elapsed, 4), "items_per_sec": round(n / elapsed, 1)}
+    results["speedup"] = round(results["batch"]["items_per_sec"] / results["single"]["items_per_sec"], 2)
+    return {"items": n, "batch_size": batch_size, **results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--items", type=int, default=5000)
+    parser.add_argument("-b", "--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.items, args.batch_size)), indent=2))
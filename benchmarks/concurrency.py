@@ -0,0 +1,81 @@
+"""Throughput of the async CRUD handlers versus threadpool ``def`` handlers at high concurrency.
+
+Runs in-process over httpx's ASGI transport, so it isolates the cost of the
+threadpool hop and pool exhaustion from network and parsing overhead. For an
+over-the-wire run, start the server and point a load generator such as
+``wrk -c1000`` at ``/users/{id}``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from uuid import UUID
+
+import httpx
+from fastapi import FastAPI
+
+import main
+from models.user import UserRead
+from services.aio import AsyncRepository
+from services import repository
+from services.repository import USERS, create_repository
+
+
+def threadpool_app(repo) -> FastAPI:
+    """The pre-async shape of GET /users/{id}: a plain ``def`` FastAPI runs in its threadpool."""
+    app = FastAPI()
+
+    @app.get("/users/{user_id}", response_model=UserRead)
+    def get_user(user_id: UUID):
+        return repo.require(user_id)
+
+    return app
+
+
+async def drive(app, ids, concurrency: int, requests_per_client: int) -> dict:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", limits=limits) as client:
+        async def worker(offset: int) -> None:
+            for i in range(requests_per_client):
+                r = await client.get(f"/users/{ids[(offset + i) % len(ids)]}")
+                r.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    total = concurrency * requests_per_client
+    return {"requests": total, "seconds": round(elapsed, 3), "requests_per_sec": round(total / elapsed, 1)}
+
+
+async def run(backend: str, concurrency: int, requests_per_client: int, rows: int) -> dict:
+    repo = create_repository(USERS, backend)
+    for i in range(rows):
+        repo.add(UserRead(first_name="A", last_name="C", email=f"u{i}@example.com", username=f"u{i}", password="p"))
+    ids = [u.id for u in repo.page({}, limit=rows)[0]]
+    main.users = AsyncRepository(repo)
+    try:
+        report = {
+            "threadpool_def": await drive(threadpool_app(repo), ids, concurrency, requests_per_client),
+            "async_def": await drive(main.app, ids, concurrency, requests_per_client),
+        }
+    finally:
+        repo.close()
+    report["speedup"] = round(report["async_def"]["requests_per_sec"] / report["threadpool_def"]["requests_per_sec"], 2)
+    return {"backend": backend, "concurrency": concurrency, **report}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-c", "--concurrency", type=int, default=1000)
+    parser.add_argument("-r", "--requests-per-client", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        repository.SQLITE_PATH = os.path.join(tmp, "bench.db")
+        report = asyncio.run(run(args.backend, args.concurrency, args.requests_per_client, args.rows))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,148 @@
+"""Write-ahead log cost per fsync policy, and recovery time for a million records.
+
+Throughput: ``--writers`` concurrent asyncio tasks each create users through
+``AsyncRepository`` over an in-memory store with a ``DurableStore``
+attached, for ``--seconds``, once per fsync policy (``always``, ``batch``,
+``interval``, ``none``) plus once with no log at all. Reports writes per
+second, p50/p99 time until the write is acknowledged, and fsyncs issued
+(``batch`` groups every record appended while an fsync is in flight into the
+next one, so its fsync count stays near the disk's own rate).
+
+Recovery: bulk-loads ``--rows`` users, snapshots them, logs ``--tail``
+further writes, then times a cold :meth:`DurableStore.open` -- mapping and
+loading the snapshot, then replaying the log tail.
+
+    python -m benchmarks.durability --rows 1000000 --tail 100000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+import services.durability as durability
+from models.user import UserRead
+from services.aio import AsyncRepository
+from services.durability import FSYNC_POLICIES, DurableStore
+from services.repository import USERS, IndexedRepository
+
+START = datetime(2024, 1, 1)
+
+
+def user(i: int) -> UserRead:
+    stamp = START + timedelta(microseconds=i)
+    return UserRead.model_construct(
+        id=uuid4(), first_name="Allison", last_name="Cameron", email=f"user{i}@example.com", username=f"user{i}",
+        password="scrypt$16384$8$1$c2FsdA$aGFzaA", birth_date=None, gender="female" if i % 2 else None,
+        created_at=stamp, updated_at=stamp,
+    )
+
+
+class CountingFsync:
+    """Wraps the module's fsync to count calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self._real = durability._fsync
+
+    def __call__(self, fd: int) -> None:
+        self.calls += 1
+        self._real(fd)
+
+
+async def _write_load(repo: AsyncRepository, writers: int, seconds: float) -> List[float]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + seconds
+    counter = iter(range(10**9))
+
+    async def writer() -> None:
+        while time.perf_counter() < deadline:
+            item = user(next(counter))
+            started = time.perf_counter()
+            await repo.add(item)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(writer() for _ in range(writers)))
+    return latencies
+
+
+def throughput(policy: Optional[str], writers: int, seconds: float, directory: str) -> Dict[str, float]:
+    store = IndexedRepository(USERS)
+    durable = None
+    fsyncs = CountingFsync()
+    if policy is not None:
+        durable = DurableStore(os.path.join(directory, policy), {"users": store}, policy=policy)
+        durable.open()
+        durability._fsync = fsyncs
+    try:
+        latencies = asyncio.run(_write_load(AsyncRepository(store, durable=durable), writers, seconds))
+    finally:
+        durability._fsync = fsyncs._real
+        if durable is not None:
+            durable.close()
+    latencies.sort()
+    return {
+        "writes_per_sec": round(len(latencies) / seconds),
+        "ack_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "ack_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+        "fsyncs": fsyncs.calls,
+    }
+
+
+def recovery(rows: int, tail: int, directory: str) -> Dict[str, float]:
+    store = IndexedRepository(USERS)
+    durable = DurableStore(directory, {"users": store}, policy="none", snapshot_every=rows + tail + 1)
+    durable.open()
+    store.load(store.codec.encode(user(i)) for i in range(rows))
+    started = time.perf_counter()
+    durable.snapshot()
+    snapshot_write = time.perf_counter() - started
+    for i in range(rows, rows + tail):
+        store.add(user(i))
+    durable.close()
+    snapshot_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory) if f.endswith(".snap"))
+    log_mb = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory) if f.endswith(".log"))
+    del store, durable
+
+    fresh = IndexedRepository(USERS)
+    durable = DurableStore(directory, {"users": fresh}, policy="none", snapshot_every=rows + tail + 1)
+    started = time.perf_counter()
+    durable.open()
+    elapsed = time.perf_counter() - started
+    durable.close()
+    assert len(fresh) == rows + tail
+    return {
+        "snapshot_rows": rows,
+        "tail_records": tail,
+        "snapshot_write_seconds": round(snapshot_write, 2),
+        "snapshot_mb": round(snapshot_mb / 2**20, 1),
+        "log_mb": round(log_mb / 2**20, 1),
+        "recovery_seconds": round(elapsed, 2),
+        **durable.recovery,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=100_000)
+    parser.add_argument("--dir", default=None, help="where to write logs (default: a temp dir; use a real disk)")
+    parser.add_argument("--skip-recovery", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        report = {"writers": args.writers, "throughput": {}}
+        for policy in (None, *FSYNC_POLICIES):
+            report["throughput"][policy or "no_log"] = throughput(policy, args.writers, args.seconds, tmp)
+        if not args.skip_recovery:
+            report["recovery"] = recovery(args.rows, args.tail, os.path.join(tmp, "recovery"))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,342 @@
+"""Deterministic in-process load test: a seeded dataset and a weighted request mix through the ASGI app.
+
+Seeds the stores with ``--users`` users, ``--subscriptions`` subscriptions
+and ``--persons`` persons, each built from the first example in its
+model's ``json_schema_extra`` with the unique fields made distinct. Then it
+replays ``--requests`` requests drawn from ``--mix`` (``op=weight,...``)
+through ``httpx.AsyncClient`` over the ASGI transport, with
+``--concurrency`` clients and the app's lifespan running. No sockets or
+network are involved. The dataset and the request sequence depend only on
+``--seed`` and the sizes. IDs are still generated fresh, but which seeded
+entity each request targets, and with what payload, is fixed.
+
+Reports throughput overall and, per operation, count, error count and
+p50/p95/p99 latency. A second, sequential pass under ``tracemalloc``
+(``--alloc-samples`` requests per operation) reports the peak memory
+allocated per request and the net change in allocated blocks. Output is
+JSON with sorted keys. ``--baseline`` takes an earlier run's output and
+adds the percentage change of each headline number, so runs from two
+commits can be compared directly.
+
+    python -m benchmarks.loadgen --requests 20000 --concurrency 32 > after.json
+    python -m benchmarks.loadgen --baseline before.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from uuid import UUID
+
+import httpx
+from pydantic import BaseModel
+
+import main
+from models.person import PersonCreate
+from models.subscription import SubscriptionCreate, SubscriptionRead
+from models.user import UserCreate, UserRead
+from services.passwords import hash_password
+
+DEFAULT_MIX = (
+    "get_user=30,get_user_conditional=5,list_users=8,create_user=2,update_user=5,"
+    "get_subscription=20,list_subscriptions=5,update_subscription=3,"
+    "get_person=8,list_persons=3,search=6,health=5"
+)
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def example(model: Type[BaseModel]) -> Dict[str, Any]:
+    """The first example payload in ``model``'s ``json_schema_extra``."""
+    return dict(model.model_config["json_schema_extra"]["examples"][0])
+
+
+# -----------------------------------------------------------------------------
+# Synthetic data
+# -----------------------------------------------------------------------------
+
+def user_payload(i: int) -> Dict[str, Any]:
+    payload = example(UserCreate)
+    payload.pop("id", None)
+    local, domain = payload["email"].split("@")
+    payload.update(username=f"{payload['username']}{i}", email=f"{local}{i}@{domain}")
+    return payload
+
+
+def subscription_payload(i: int) -> Dict[str, Any]:
+    payload = example(SubscriptionCreate)
+    payload.update(subscription_id=f"{payload['subscription_id']}-{i}", username=f"{payload['username']}{i}")
+    return payload
+
+
+def person_payload(i: int) -> Dict[str, Any]:
+    payload = example(PersonCreate)
+    letters = "".join(chr(ord("a") + (i // 10_000 // 26 ** k) % 26) for k in range(2))
+    local, domain = payload["email"].split("@")
+    payload.update(uni=f"{letters}{i % 10_000}", email=f"{local}{i}@{domain}")
+    # Pairs of persons share an address, which the store deduplicates.
+    payload["addresses"] = [
+        {**{k: v for k, v in a.items() if k != "id"}, "street": f"{i // 2} {a['street']}"}
+        for a in payload["addresses"]
+    ]
+    return payload
+
+
+@dataclass
+class Dataset:
+    users: List[UUID]
+    subscriptions: List[UUID]
+    persons: List[UUID]
+
+
+def seed(users: int, subscriptions: int, persons: int) -> Dataset:
+    """Fill the app's stores directly (validated, but without paying for a password hash per row)."""
+    password = hash_password(example(UserCreate)["password"])
+    created = datetime(2024, 1, 1)
+    user_ids, subscription_ids, person_ids = [], [], []
+    for i in range(users):
+        fields = UserCreate.model_validate(user_payload(i)).model_dump()
+        stamp = created + timedelta(microseconds=i)
+        user = main.users.sync.add(UserRead.model_construct(
+            **{**fields, "password": password, "created_at": stamp, "updated_at": stamp}
+        ))
+        user_ids.append(user.id)
+    for i in range(subscriptions):
+        fields = SubscriptionCreate.model_validate(subscription_payload(i)).model_dump(exclude={"subscription_id"})
+        stamp = created + timedelta(microseconds=i)
+        subscription = main.subscriptions.sync.add(SubscriptionRead.model_construct(
+            **{**fields, "password": password, "created_at": stamp, "updated_at": stamp}
+        ))
+        subscription_ids.append(subscription.subscription_id)
+    for i in range(persons):
+        person_ids.append(main.people.add_person(PersonCreate.model_validate(person_payload(i))).id)
+    return Dataset(user_ids, subscription_ids, person_ids)
+
+
+# -----------------------------------------------------------------------------
+# Request mix
+# -----------------------------------------------------------------------------
+
+# (method, path, json body, headers)
+Request = Tuple[str, str, Optional[Any], Optional[Dict[str, str]]]
+Operation = Callable[[random.Random, Dataset, int], Request]
+
+
+def _get_user_conditional(rng: random.Random, data: Dataset, n: int) -> Request:
+    key = rng.choice(data.users)
+    user = main.users.sync.get(key)
+    etag = main.entity_etag(key, user.updated_at)
+    return "GET", f"/users/{key}", None, {"If-None-Match": etag}
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "get_user": lambda rng, data, n: ("GET", f"/users/{rng.choice(data.users)}", None, None),
+    "get_user_conditional": _get_user_conditional,
+    "list_users": lambda rng, data, n: ("GET", f"/users?limit={rng.choice((10, 50, 100))}", None, None),
+    "create_user": lambda rng, data, n: ("POST", "/users", user_payload(1_000_000_000 + n), None),
+    "update_user": lambda rng, data, n: (
+        "PUT", f"/users/{rng.choice(data.users)}", {"first_name": rng.choice(("Allison", "Lisa", "Remy"))}, None
+    ),
+    "get_subscription": lambda rng, data, n: ("GET", f"/subscriptions/{rng.choice(data.subscriptions)}", None, None),
+    "list_subscriptions": lambda rng, data, n: (
+        "GET", f"/subscriptions?limit=50&service={example(SubscriptionCreate)['service']}", None, None
+    ),
+    "update_subscription": lambda rng, data, n: (
+        "PUT", f"/subscriptions/{rng.choice(data.subscriptions)}", {"service": rng.choice(("Hulu", "Spotify"))}, None
+    ),
+    "get_person": lambda rng, data, n: ("GET", f"/persons/{rng.choice(data.persons)}", None, None),
+    "list_persons": lambda rng, data, n: ("GET", "/persons?limit=50", None, None),
+    "search": lambda rng, data, n: ("GET", f"/search?q={rng.choice(('cameron', 'allison cam', 'camreon'))}", None, None),
+    "health": lambda rng, data, n: ("GET", "/health", None, None),
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def plan(mix: Dict[str, float], count: int, data: Dataset, seed_value: int) -> List[Tuple[str, Request]]:
+    """The request sequence: a pure function of the mix, the dataset and the seed."""
+    rng = random.Random(seed_value)
+    names = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    return [(name, OPERATIONS[name](rng, data, n)) for n, name in enumerate(names)]
+
+
+# -----------------------------------------------------------------------------
+# Runs
+# -----------------------------------------------------------------------------
+
+async def send(client: httpx.AsyncClient, request: Request) -> int:
+    method, path, body, headers = request
+    response = await client.request(method, path, json=body, headers=headers)
+    return response.status_code
+
+
+async def replay(requests: List[Tuple[str, Request]], concurrency: int) -> Tuple[float, Dict[str, List[float]], Dict[str, int]]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    queue = iter(requests)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadgen") as client:
+
+        async def worker() -> None:
+            for name, request in queue:
+                started = time.perf_counter()
+                status = await send(client, request)
+                latencies[name].append(time.perf_counter() - started)
+                if status >= 400:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, errors
+
+
+async def allocations(requests: List[Tuple[str, Request]], samples: int) -> Dict[str, Dict[str, float]]:
+    """Per operation: median peak bytes allocated while serving one request, and net blocks kept."""
+    by_op: Dict[str, List[Request]] = defaultdict(list)
+    for name, request in requests:
+        if len(by_op[name]) < samples:
+            by_op[name].append(request)
+    report = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadgen") as client:
+        await send(client, ("GET", "/health", None, None))  # warm the client and app
+        tracemalloc.start()
+        try:
+            for name, batch in sorted(by_op.items()):
+                peaks = []
+                blocks = sys.getallocatedblocks()
+                for request in batch:
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    await send(client, request)
+                    peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+                report[name] = {
+                    "peak_kib_per_request": round(statistics.median(peaks) / 1024, 1),
+                    "net_blocks_per_request": round((sys.getallocatedblocks() - blocks) / len(batch), 1),
+                }
+        finally:
+            tracemalloc.stop()
+    return report
+
+
+def percentile(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(elapsed: float, latencies: Dict[str, List[float]], errors: Dict[str, int]) -> Dict[str, Any]:
+    every = sorted(t for values in latencies.values() for t in values)
+    report: Dict[str, Any] = {
+        "requests": len(every),
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(every) / elapsed, 1),
+        **{f"p{round(q * 100)}_ms": round(percentile(every, q) * 1000, 3) for q in PERCENTILES},
+        "operations": {},
+    }
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        report["operations"][name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            **{f"p{round(q * 100)}_ms": round(percentile(values, q) * 1000, 3) for q in PERCENTILES},
+        }
+    return report
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Percentage change of throughput and every percentile, overall and per operation."""
+    def delta(now: Dict[str, Any], before: Dict[str, Any]) -> Dict[str, float]:
+        return {
+            key: round((now[key] - before[key]) / before[key] * 100, 1)
+            for key in ("requests_per_sec", *(f"p{round(q * 100)}_ms" for q in PERCENTILES))
+            if key in now and before.get(key)
+        }
+
+    now, before = current["throughput"], baseline["throughput"]
+    return {
+        "baseline_commit": baseline.get("environment", {}).get("commit"),
+        "overall_pct": delta(now, before),
+        "operations_pct": {
+            name: delta(stats, before["operations"][name])
+            for name, stats in now["operations"].items() if name in before.get("operations", {})
+        },
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage_backend": os.environ.get("STORAGE_BACKEND", "memory"),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    started = time.perf_counter()
+    data = seed(args.users, args.subscriptions, args.persons)
+    seeded = time.perf_counter() - started
+    async with main.app.router.lifespan_context(main.app):
+        main.search.ready.wait()
+        requests = plan(mix, args.requests + args.warmup, data, args.seed)
+        await replay(requests[:args.warmup], args.concurrency)
+        throughput = summarize(*await replay(requests[args.warmup:], args.concurrency))
+        allocated = await allocations(requests[args.warmup:], args.alloc_samples) if args.alloc_samples else {}
+    return {
+        "config": {
+            "seed": args.seed, "users": args.users, "subscriptions": args.subscriptions, "persons": args.persons,
+            "requests": args.requests, "warmup": args.warmup, "concurrency": args.concurrency, "mix": mix,
+        },
+        "environment": environment(),
+        "seed_seconds": round(seeded, 2),
+        "throughput": throughput,
+        "allocations": allocated,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--subscriptions", type=int, default=10_000)
+    parser.add_argument("--persons", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--warmup", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"op=weight,... from: {', '.join(OPERATIONS)}")
+    parser.add_argument("--alloc-samples", type=int, default=200, help="requests per op traced for allocations (0: skip)")
+    parser.add_argument("--baseline", help="earlier JSON output to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+    print(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,89 @@
+"""Bytes per stored user: plain ``Dict[UUID, UserRead]`` versus the compact in-memory repository.
+
+Each variant runs in a fresh interpreter and counts live allocations with
+``tracemalloc`` (so transient models built during loading are not counted):
+
+* ``models`` -- the old representation, one pydantic ``UserRead`` per row.
+* ``repository`` -- ``IndexedRepository``: tuple records with int UUIDs and
+  timestamps, interned gender strings, *plus* its unique/gender indexes and
+  sort order.
+
+Users are built with ``model_construct`` to keep a 1M-row run short; the
+resulting instances are the same size as validated ones.
+
+    python -m benchmarks.memory --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Iterator
+from uuid import uuid4
+
+from models.user import UserRead
+from services.repository import USERS, IndexedRepository
+
+GENDERS = ("female", "male", "nonbinary")
+
+
+def users(rows: int) -> Iterator[UserRead]:
+    created = datetime(2024, 1, 1)
+    for i in range(rows):
+        stamp = created + timedelta(microseconds=i)
+        yield UserRead.model_construct(
+            id=uuid4(),
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            email=f"user{i}@example.com",
+            username=f"user{i}",
+            # Same length as a real scrypt$n$r$p$salt$hash string.
+            password=f"scrypt$16384$8$1${i:022d}${i:043d}",
+            birth_date=date(1990, 1, 1) + timedelta(days=i % 10_000),
+            gender=GENDERS[i % 3].encode().decode(),  # a fresh string per row, as parsed from JSON
+            created_at=stamp,
+            updated_at=stamp,
+        )
+
+
+def measure(variant: str, rows: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    if variant == "models":
+        store = {u.id: u for u in users(rows)}
+    else:
+        store = IndexedRepository(USERS)
+        for u in users(rows):
+            store.add(u)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert len(store) == rows
+    return {"variant": variant, "rows": rows, "bytes_per_record": round(used / rows), "load_seconds": round(elapsed, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--variant", choices=("models", "repository"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.rows)))
+        sys.exit(0)
+    runs = {}
+    for variant in ("models", "repository"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.memory", "--rows", str(args.rows), "--variant", variant],
+            capture_output=True, text=True, check=True,
+        )
+        runs[variant] = json.loads(out.stdout)
+    runs["reduction"] = round(runs["models"]["bytes_per_record"] / runs["repository"]["bytes_per_record"], 2)
+    print(json.dumps(runs, indent=2))
@@ -0,0 +1,80 @@
+"""Create-user throughput with scrypt hashed inline on the event loop versus on the process pool.
+
+While the sign-up load runs, a probe hits /health every few milliseconds; its
+p99 shows whether hashing stalls unrelated requests.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+import main
+from services.aio import AsyncRepository
+from services.passwords import PasswordHasher
+from services.repository import USERS, create_repository
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+
+async def run_mode(hasher: PasswordHasher, users: int, concurrency: int) -> dict:
+    main.users = AsyncRepository(create_repository(USERS, "memory"))
+    main.password_hasher = hasher
+    hasher.start()
+    # Warm the pool so process start-up is not billed to the first requests.
+    await hasher.hash_many(["warmup"] * max(hasher.workers, 1))
+    slots = asyncio.Semaphore(concurrency)
+    probe_samples: list = []
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        async def create(i: int) -> None:
+            async with slots:
+                r = await client.post("/users", json={
+                    "first_name": "Robert", "last_name": "Chase", "email": f"user{i}@example.com",
+                    "username": f"user{i}", "password": "password8",
+                })
+                r.raise_for_status()
+
+        prober = asyncio.create_task(probe(client, stop, probe_samples))
+        started = time.perf_counter()
+        await asyncio.gather(*(create(i) for i in range(users)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+    hasher.shutdown()
+    probe_samples.sort()
+    return {
+        "workers": hasher.workers,
+        "creates_per_sec": round(users / elapsed, 1),
+        # Few probes means the event loop was starved while hashing.
+        "health_probes": len(probe_samples),
+        "health_p50_ms": round(probe_samples[len(probe_samples) // 2] * 1000, 2),
+        "health_p99_ms": round(probe_samples[int(len(probe_samples) * 0.99)] * 1000, 2),
+    }
+
+
+async def run(users: int, concurrency: int, workers: int) -> dict:
+    return {
+        "users": users,
+        "concurrency": concurrency,
+        "inline": await run_mode(PasswordHasher(workers=0), users, concurrency),
+        "process_pool": await run_mode(PasswordHasher(workers=workers), users, concurrency),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--users", type=int, default=500)
+    parser.add_argument("-c", "--concurrency", type=int, default=64)
+    parser.add_argument("-w", "--workers", type=int, default=PasswordHasher().workers)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.users, args.concurrency, args.workers)), indent=2))
@@ -0,0 +1,153 @@
+"""Replay requests captured by RecordingMiddleware against the app, at their original or a faster pace.
+
+Reads one or more request logs (``REQUEST_LOG_PATH`` and its rotated
+``.1``, ``.2``, ... files, in any order) and orders every entry by arrival
+time. Each request is then sent at its original offset from the first one,
+divided by ``--speed``. ``--speed 2`` compresses an hour of traffic into
+half an hour, and ``--speed 0`` sends back to back with ``--concurrency``
+requests in flight. Requests go in process to ``main:app`` over the ASGI
+transport, with its lifespan running, or to ``--url``.
+
+The app in process starts with whatever data its environment gives it. To
+reproduce production behaviour, point ``WAL_DIR`` at a copy of the
+production write-ahead log directory, so IDs in captured paths resolve;
+otherwise most by-ID requests will 404. Redacted fields are sent as the
+literal ``[REDACTED]``.
+
+Reports, per route (method plus path with IDs collapsed): count, replayed
+and recorded p50/p95/p99, and how many statuses differ from the recording.
+Overall it also reports the target and achieved request rate and the
+scheduling lag p99, which shows whether the replayer kept up.
+
+    python -m benchmarks.replay recordings/requests.jsonl* --speed 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+_ID = re.compile(r"/[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}(?=/|$)")
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def load(paths: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    entries = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # a line cut off by a crash mid-write
+    entries.sort(key=lambda e: e["ts"])
+    return entries[:limit] if limit else entries
+
+
+def route_of(entry: Dict[str, Any]) -> str:
+    return f"{entry['method']} {_ID.sub('/{id}', entry['path'])}"
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {f"p{round(q * 100)}_ms": round(values[min(len(values) - 1, int(len(values) * q))], 3) for q in PERCENTILES}
+
+
+async def send(client: httpx.AsyncClient, entry: Dict[str, Any]) -> int:
+    url = entry["path"] + (f"?{entry['query']}" if entry.get("query") else "")
+    body = entry.get("body")
+    content = None if body is None else json.dumps(body).encode()
+    response = await client.request(entry["method"], url, content=content, headers=entry.get("headers") or {})
+    return response.status_code
+
+
+async def replay(client: httpx.AsyncClient, entries: List[Dict[str, Any]], speed: float, concurrency: int) -> Dict[str, Any]:
+    results: List[Optional[tuple]] = [None] * len(entries)
+    lags: List[float] = []
+    first = entries[0]["ts"]
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, entry: Dict[str, Any]) -> None:
+        async with gate:
+            started = time.perf_counter()
+            try:
+                status = await send(client, entry)
+            except httpx.HTTPError:
+                status = 0
+            results[i] = (status, (time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    if speed > 0:
+        tasks = []
+        for i, entry in enumerate(entries):
+            due = (entry["ts"] - first) / speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lags.append(max(0.0, -delay) * 1000)
+            tasks.append(asyncio.create_task(one(i, entry)))
+        await asyncio.gather(*tasks)
+    else:
+        await asyncio.gather(*(one(i, e) for i, e in enumerate(entries)))
+    elapsed = time.perf_counter() - started
+
+    routes: Dict[str, Dict[str, list]] = defaultdict(lambda: {"replayed": [], "recorded": [], "mismatched": []})
+    for entry, (status, ms) in zip(entries, results):
+        stats = routes[route_of(entry)]
+        stats["replayed"].append(ms)
+        stats["recorded"].append(entry["duration_ms"])
+        stats["mismatched"].append(status != entry["status"])
+    span = entries[-1]["ts"] - first
+    return {
+        "requests": len(entries),
+        "seconds": round(elapsed, 3),
+        "recorded_span_seconds": round(span, 3),
+        "target_requests_per_sec": round(len(entries) * speed / span, 1) if speed > 0 and span else None,
+        "achieved_requests_per_sec": round(len(entries) / elapsed, 1),
+        "schedule_lag_p99_ms": _percentiles(lags)["p99_ms"] if lags else None,
+        "status_mismatches": sum(sum(r["mismatched"]) for r in routes.values()),
+        "routes": {
+            route: {
+                "count": len(r["replayed"]),
+                "status_mismatches": sum(r["mismatched"]),
+                "replayed": _percentiles(r["replayed"]),
+                "recorded": _percentiles(r["recorded"]),
+            }
+            for route, r in sorted(routes.items())
+        },
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    entries = load(args.logs, args.limit)
+    if not entries:
+        raise SystemExit("no recorded requests in " + ", ".join(args.logs))
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+            return await replay(client, entries, args.speed, args.concurrency)
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=30) as client:
+            return await replay(client, entries, args.speed, args.concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("logs", nargs="+", help="request log files (JSONL), rotated ones included")
+    parser.add_argument("--speed", type=float, default=1.0, help="pace multiplier; 0 sends back to back")
+    parser.add_argument("--concurrency", type=int, default=64, help="maximum requests in flight")
+    parser.add_argument("--limit", type=int, default=None, help="replay only the first N requests")
+    parser.add_argument("--url", default=None, help="replay against a running server instead of main:app")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2, sort_keys=True))
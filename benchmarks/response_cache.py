@@ -0,0 +1,113 @@
+"""GET /users/{id} with and without the response cache, under a skewed (Zipf) key distribution.
+
+Loads ``--users`` users into the app's own store, then sends ``--requests``
+GETs through the full ASGI stack (middleware, routing, handler) in process,
+with IDs drawn from a Zipf distribution (``--skew``), as hot entities
+dominate real traffic. Runs once with caching disabled and once with a
+``--capacity``-entry cache, and reports requests per second, per-request
+latency, and the cache's hit ratio. ``handler_us`` isolates the route
+handler itself: the store read plus serialization on a miss versus a dict
+lookup on a hit.
+
+    python -m benchmarks.response_cache --users 100000 --capacity 10000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from uuid import UUID, uuid4
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from models.user import UserRead  # noqa: E402
+from services.cache import ResponseCache  # noqa: E402
+
+
+def load_users(n: int) -> List[UUID]:
+    created = datetime(2024, 1, 1)
+    ids = []
+    for i in range(n):
+        stamp = created + timedelta(microseconds=i)
+        user = UserRead.model_construct(
+            id=uuid4(), first_name="Allison", last_name="Cameron", email=f"user{i}@example.com",
+            username=f"user{i}", password="scrypt$hash", birth_date=None, gender="female",
+            created_at=stamp, updated_at=stamp,
+        )
+        main.users.sync.add(user)
+        ids.append(user.id)
+    return ids
+
+
+def zipf_keys(ids: List[UUID], count: int, skew: float, seed: int = 7) -> List[UUID]:
+    weights = [1 / (rank + 1) ** skew for rank in range(len(ids))]
+    cumulative, total = [], 0.0
+    for w in weights:
+        total += w
+        cumulative.append(total)
+    rng = random.Random(seed)
+    return [ids[bisect.bisect_left(cumulative, rng.random() * total)] for _ in range(count)]
+
+
+async def over_http(keys: List[UUID]) -> List[float]:
+    timings = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for key in keys:
+            started = time.perf_counter()
+            response = await client.get(f"/users/{key}")
+            timings.append(time.perf_counter() - started)
+            assert response.status_code == 200
+    return timings
+
+
+async def in_handler(keys: List[UUID]) -> float:
+    started = time.perf_counter()
+    for key in keys:
+        await main.get_user(user_id=key, if_none_match=None)
+    return (time.perf_counter() - started) / len(keys) * 1e6
+
+
+def run(capacity: int, keys: List[UUID]) -> Dict[str, float]:
+    # Read-only run: the replacement needs no invalidation hook.
+    main.user_cache = cache = ResponseCache("user", capacity)
+    timings = asyncio.run(over_http(keys))
+    hit_ratio = cache.hits / max(1, cache.hits + cache.misses)
+    handler_us = asyncio.run(in_handler(keys))  # cache now warm
+    timings.sort()
+    return {
+        "requests_per_sec": round(len(timings) / sum(timings)),
+        "p50_us": round(statistics.median(timings) * 1e6, 1),
+        "p99_us": round(timings[int(len(timings) * 0.99)] * 1e6, 1),
+        "hit_ratio": round(hit_ratio, 3),
+        "handler_us": round(handler_us, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--capacity", type=int, default=10_000)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent; higher is more skewed")
+    args = parser.parse_args()
+
+    keys = zipf_keys(load_users(args.users), args.requests, args.skew)
+    report = {"users": args.users, "requests": args.requests, "capacity": args.capacity, "skew": args.skew}
+    report["uncached"] = run(0, keys)
+    report["cached"] = run(args.capacity, keys)
+    report["speedup"] = {
+        "requests_per_sec": round(report["cached"]["requests_per_sec"] / report["uncached"]["requests_per_sec"], 2),
+        "handler": round(report["uncached"]["handler_us"] / report["cached"]["handler_us"], 1),
+    }
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,131 @@
+"""Search latency over a million users: the trigram/prefix index versus a full scan.
+
+Loads ``--rows`` users into an in-memory ``IndexedRepository`` with a
+``SearchService`` subscribed to it, so the index is built the way the app
+builds it -- one change notification per write. Names are drawn from small
+pools (as real names repeat) and emails are unique. Then runs a mix of
+queries (exact word, short and long prefixes, two words, typos, an email
+prefix) ``--repeat`` times each and reports per-query p50/p99 latency and
+whether it completed within the budget, plus one pass of the substring scan
+that answering the same query without an index would need.
+
+    python -m benchmarks.search --rows 1000000 --budget-ms 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import resource
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from uuid import uuid4
+
+from models.user import UserRead
+from services.repository import USERS, IndexedRepository
+from services.search import SearchField, SearchService
+
+FIRST = [
+    "Allison", "Gregory", "Robert", "Lisa", "James", "Eric", "Remy", "Chris", "Lawrence", "Martha",
+    "Zoë", "Amber", "Stacy", "Michael", "Jessica", "Taub", "Mary", "John", "Patricia", "Jennifer",
+    "Linda", "Elizabeth", "Barbara", "Susan", "Joseph", "Thomas", "Charles", "Karen", "Daniel", "Nancy",
+]
+LAST = [
+    "Cameron", "House", "Chase", "Cuddy", "Wilson", "Foreman", "Hadley", "Kutner", "Masters", "Volakis",
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Anderson", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Thompson",
+]
+
+QUERIES = {
+    "exact": "cameron",
+    "two_words": "allison cameron",
+    "prefix_short": "ca",
+    "prefix_long": "camer",
+    "typo": "camreon",
+    "two_words_typo": "alison camron",
+    "email_prefix": "user12345",
+}
+
+
+def build(rows: int, seed: int = 7) -> tuple:
+    rng = random.Random(seed)
+    # Suffixes make most names distinct-but-similar, as in a real directory.
+    firsts = [f"{f}{s}" for f in FIRST for s in ("", "a", "e", "o", "ie", "ina", "ette")]
+    lasts = [f"{l}{s}" for l in LAST for s in ("", "s", "son", "ez", "ini", "ova", "berg")]
+    repo = IndexedRepository(USERS)
+    service = SearchService()
+    index = service.register("user", repo, (
+        SearchField("first_name", fuzzy=True),
+        SearchField("last_name", fuzzy=True),
+        SearchField("email", weight=0.8),
+    ))
+    service.ready.set()  # nothing to backfill: the index follows the writes below
+    created = datetime(2024, 1, 1)
+    started = time.perf_counter()
+    for i in range(rows):
+        stamp = created + timedelta(microseconds=i)
+        repo.add(UserRead.model_construct(
+            id=uuid4(), first_name=rng.choice(firsts), last_name=rng.choice(lasts),
+            email=f"user{i}@example.com", username=f"user{i}", password="x",
+            birth_date=None, gender=None, created_at=stamp, updated_at=stamp,
+        ))
+    index.compact()
+    return repo, service, time.perf_counter() - started
+
+
+def scan(repo: IndexedRepository, query: str) -> int:
+    """Answering without an index: every row, substring match on every word."""
+    words = query.casefold().split()
+    found = 0
+    for user in repo.values():
+        text = f"{user.first_name} {user.last_name} {user.email}".casefold()
+        if all(w in text for w in words):
+            found += 1
+    return found
+
+
+def measure(service: SearchService, query: str, repeat: int, budget: float) -> Dict[str, float]:
+    timings: List[float] = []
+    complete = 0
+    hits = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found, done = service.search(query, limit=20, budget=budget)
+        timings.append((time.perf_counter() - started) * 1000)
+        complete += done
+        hits = len(found)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 2),
+        "complete": round(complete / repeat, 2),
+        "hits": hits,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--no-scan", action="store_true", help="skip the full-scan comparison")
+    args = parser.parse_args()
+
+    repo, service, load = build(args.rows)
+    report = {
+        "rows": args.rows,
+        "load_with_index_seconds": round(load, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        "budget_ms": args.budget_ms,
+        "queries": {},
+    }
+    for name, query in QUERIES.items():
+        result = measure(service, query, args.repeat, args.budget_ms / 1000)
+        if not args.no_scan:
+            started = time.perf_counter()
+            scan(repo, query)
+            result["scan_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        report["queries"][name] = {"q": query, **result}
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,73 @@
+"""Microbenchmark: FastAPI's response_model path versus PydanticJSONResponse for 1/100/10,000 users.
+
+The FastAPI path is what a route does when it returns models and declares
+``response_model``: validate against the response field, dump to Python
+objects, then ``json.dumps`` inside ``JSONResponse``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from framework.responses import PydanticJSONResponse
+from models.user import UserRead
+
+LIST_FIELD = create_model_field(name="Response_list_users", type_=List[UserRead], mode="serialization")
+
+
+def make_users(n: int) -> List[UserRead]:
+    return [
+        UserRead(
+            first_name="Allison", last_name="Cameron", email=f"user{i}@example.com",
+            username=f"user{i}", password="scrypt$hash", gender="F",
+        )
+        for i in range(n)
+    ]
+
+
+async def fastapi_path(rows: List[UserRead]) -> bytes:
+    content = await serialize_response(field=LIST_FIELD, response_content=rows)
+    return JSONResponse(content).body
+
+
+async def fast_path(rows: List[UserRead]) -> bytes:
+    return PydanticJSONResponse(rows).body
+
+
+async def per_call_us(fn, rows, budget_seconds: float) -> float:
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < budget_seconds:
+        await fn(rows)
+        calls += 1
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def run(sizes: List[int], budget_seconds: float) -> dict:
+    report = {}
+    for n in sizes:
+        rows = make_users(n)
+        assert json.loads(await fastapi_path(rows)) == json.loads(await fast_path(rows))
+        slow = await per_call_us(fastapi_path, rows, budget_seconds)
+        fast = await per_call_us(fast_path, rows, budget_seconds)
+        report[str(n)] = {
+            "response_model_us": round(slow, 1),
+            "pydantic_json_response_us": round(fast, 1),
+            "speedup": round(slow / fast, 2),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per measurement")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.sizes, args.seconds)), indent=2))
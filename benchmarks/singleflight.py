@@ -0,0 +1,100 @@
+"""Single-flight proof: N concurrent GETs for one ID make one storage read.
+
+Runs the app in process on the SQLite backend (reads go to worker
+threads, so concurrent requests really overlap) and fires ``--callers``
+simultaneous ``GET /users/{id}`` for the same user with the response cache
+cold, counting the reads that reach the repository. It does this twice:
+with coalescing, as the app runs, and with it switched off. Every response
+must be identical and 200, and with coalescing exactly one read may reach
+storage; the script exits non-zero otherwise. Also reports the burst's
+wall time and p99, and the cache's coalescing counters.
+
+    python -m benchmarks.singleflight --callers 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_tmp.name, "singleflight.db")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from models.user import UserCreate, UserRead  # noqa: E402
+from services.cache import ResponseCache  # noqa: E402
+
+
+class CountingGet:
+    """Stands in for the repository's ``get`` and counts the calls that reach it."""
+
+    def __init__(self, get):
+        self.get = get
+        self.calls = 0
+
+    def __call__(self, key):
+        self.calls += 1
+        time.sleep(0.002)  # a realistic storage round trip, so the burst overlaps
+        return self.get(key)
+
+
+async def burst(user_id, callers: int, coalesce: bool) -> Dict[str, object]:
+    main.user_cache = cache = ResponseCache("user", coalesce=coalesce)
+    counter = CountingGet(main.users.sync.get)
+    main.users.sync.get = counter
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://singleflight") as client:
+
+            async def one():
+                started = time.perf_counter()
+                response = await client.get(f"/users/{user_id}")
+                return response, time.perf_counter() - started
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(one() for _ in range(callers)))
+            elapsed = time.perf_counter() - started
+    finally:
+        del main.users.sync.get
+    bodies = {r.content for r, _ in results}
+    timings = sorted(t for _, t in results)
+    return {
+        "callers": callers,
+        "storage_reads": counter.calls,
+        "all_200": all(r.status_code == 200 for r, _ in results),
+        "identical_bodies": len(bodies) == 1,
+        "coalesced": cache.flights.coalesced if cache.flights is not None else 0,
+        "burst_ms": round(elapsed * 1000, 1),
+        "p99_ms": round(timings[int(len(timings) * 0.99)] * 1000, 1),
+    }
+
+
+async def run(callers: int) -> Dict[str, object]:
+    async with main.app.router.lifespan_context(main.app):
+        example = UserCreate.model_config["json_schema_extra"]["examples"][0]
+        user = await main.users.add(UserRead.model_construct(**UserCreate.model_validate(example).model_dump()))
+        return {
+            "coalesced": await burst(user.id, callers, coalesce=True),
+            "uncoalesced": await burst(user.id, callers, coalesce=False),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=500)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.callers))
+    print(json.dumps(report, indent=2))
+    proof = report["coalesced"]
+    if not (proof["storage_reads"] == 1 and proof["all_200"] and proof["identical_bodies"]):
+        sys.exit(f"single-flight failed: {proof['storage_reads']} storage reads for {args.callers} callers")
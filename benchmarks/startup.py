@@ -0,0 +1,104 @@
+"""Cold-start cost of ``main:app``: import time and time to the first 200.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters and
+reports the best total plus the modules with the highest self time, then
+starts ``python -m framework.server main:app`` with one worker and polls
+``/health`` until it answers 200 (and times the first ``/openapi.json``).
+Medians over ``--repeat`` runs. ``--budget-ms`` exits non-zero when the
+median time to first 200 exceeds it, so CI can track regressions:
+
+    python -m benchmarks.startup --repeat 5 --budget-ms 1500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.workers import free_port
+
+
+def import_profile() -> Tuple[float, List[Tuple[str, float]]]:
+    """Total import time of ``main`` and per-module self times, in ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, check=True, env={**os.environ, "PASSWORD_HASH_WORKERS": "0"},
+    )
+    modules: List[Tuple[str, float]] = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000))
+        if name.strip() == "main":
+            total = int(cumulative_us) / 1000
+    return total, modules
+
+
+def first_200(db: str, timeout: float = 60.0) -> Dict[str, float]:
+    port = free_port()
+    env = {
+        **os.environ, "WEB_CONCURRENCY": "1", "FASTAPIPORT": str(port), "ACCESS_LOG": "0", "SQLITE_PATH": db,
+        "WAL_DIR": os.path.join(os.path.dirname(db), "wal"),
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "framework.server", "main:app"], env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        with httpx.Client(timeout=5) as client:
+            while True:
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("server did not answer in time")
+                try:
+                    if client.get(base + "/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter() - started
+            openapi_started = time.perf_counter()
+            client.get(base + "/openapi.json", headers={"Accept-Encoding": "gzip"}).raise_for_status()
+            openapi = time.perf_counter() - openapi_started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"first_200_ms": ready * 1000, "first_openapi_ms": openapi * 1000}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules (self time) to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if median time to first 200 exceeds this")
+    args = parser.parse_args()
+
+    imports = [import_profile() for _ in range(args.repeat)]
+    best_total, best_modules = min(imports, key=lambda run: run[0])
+    with tempfile.TemporaryDirectory() as tmp:
+        starts = [first_200(os.path.join(tmp, "bench.db")) for _ in range(args.repeat)]
+    report = {
+        "import_main_ms": {
+            "median": round(statistics.median(t for t, _ in imports), 1),
+            "best": round(best_total, 1),
+        },
+        "slowest_imports_ms": {
+            name: round(ms, 1) for name, ms in sorted(best_modules, key=lambda m: -m[1])[: args.top]
+        },
+        "first_200_ms": round(statistics.median(s["first_200_ms"] for s in starts), 1),
+        "first_openapi_ms": round(statistics.median(s["first_openapi_ms"] for s in starts), 1),
+    }
+    if args.budget_ms is not None:
+        report["budget_ms"] = args.budget_ms
+    print(json.dumps(report, indent=2))
+    if args.budget_ms is not None and report["first_200_ms"] > args.budget_ms:
+        sys.exit(1)
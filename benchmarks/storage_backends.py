@@ -0,0 +1,70 @@
+"""p50/p99 CRUD latency of the memory and SQLite repository backends."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from models.user import UserRead
+from services import repository
+from services.repository import USERS, create_repository
+
+
+def make_user(i: int) -> UserRead:
+    return UserRead(
+        first_name="Allison",
+        last_name=f"Cameron{i}",
+        email=f"user{i}@example.com",
+        username=f"user{i}",
+        password="password9",
+        gender="F" if i % 2 else "M",
+    )
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+    return {
+        "p50_us": round(pick(0.50), 1),
+        "p99_us": round(pick(0.99), 1),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+    }
+
+
+def timed(op: Callable[[int], object], n: int) -> Dict[str, float]:
+    samples = []
+    for i in range(n):
+        started = time.perf_counter()
+        op(i)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def run_backend(backend: str, n: int) -> Dict[str, Dict[str, float]]:
+    repo = create_repository(USERS, backend)
+    people = [make_user(i) for i in range(n)]
+    try:
+        return {
+            "create": timed(lambda i: repo.add(people[i]), n),
+            "get": timed(lambda i: repo.get(people[i].id), n),
+            "get_by_username": timed(lambda i: repo.get_by("username", f"user{i}"), n),
+            "update": timed(lambda i: repo.update(people[i].id, {"last_name": "House"}), n),
+            "page_50": timed(lambda i: repo.page({"gender": "F"}, limit=50), min(n, 1000)),
+            "delete": timed(lambda i: repo.delete(people[i].id), n),
+        }
+    finally:
+        repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--rows", type=int, default=10_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        repository.SQLITE_PATH = os.path.join(tmp, "bench.db")
+        report = {backend: run_backend(backend, args.rows) for backend in ("memory", "sqlite")}
+    print(json.dumps({"rows": args.rows, **report}, indent=2))
@@ -0,0 +1,108 @@
+"""Validation throughput: pydantic's ``EmailStr`` versus the cached ``Email`` type.
+
+Validates the same JSON array of users with a ``List[UserCreate]``
+``TypeAdapter`` (the batch-import path) twice: once with ``UserCreate`` as
+it was, every email through email-validator, and once with the current
+model. Every email is unique, on a handful of domains. ``bulk_import_cold``
+clears the caches before each run, so only the per-domain cache helps (a
+first import); ``reimport_warm`` has every address cached already. Also
+times reading rows back the way the
+SQLite backend does, with and without the ``TRUSTED`` context, and building
+the stored ``UserRead`` from a validated ``UserCreate`` by re-validation
+versus ``model_construct``.
+
+    python -m benchmarks.validation --rows 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable, List, Optional
+
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, create_model
+from pydantic_core import to_json
+
+from models.user import UserCreate, UserRead
+from models.validation import TRUSTED, _normalized_domain, normalize_email
+
+DOMAINS = ("example.com", "columbia.edu", "gmail.com", "Princeton-Plainsboro.org", "mail.co.uk")
+
+# UserCreate as it was before models.validation: email is pydantic's EmailStr.
+LegacyUserCreate = create_model(
+    "LegacyUserCreate", __base__=UserCreate, email=(EmailStr, Field(...)),
+)
+LegacyUserRead = create_model(
+    "LegacyUserRead", __base__=UserRead, email=(EmailStr, Field(...)),
+)
+
+
+def payload(rows: int) -> bytes:
+    return json.dumps([
+        {
+            "first_name": "Allison", "last_name": "Cameron", "username": f"user{i}", "password": "pw",
+            "email": f"allison.cameron{i}@{DOMAINS[i % len(DOMAINS)]}", "birth_date": "1990-01-01",
+        }
+        for i in range(rows)
+    ]).encode()
+
+
+def clear_caches() -> None:
+    normalize_email.cache_clear()
+    _normalized_domain.cache_clear()
+
+
+def rate(fn: Callable[[], object], rows: int, repeat: int, before: Optional[Callable[[], None]] = None) -> float:
+    """Best rows/second over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return round(rows / best)
+
+
+def compare(legacy: Callable[[], object], current: Callable[[], object], rows: int, repeat: int,
+            before: Optional[Callable[[], None]] = None) -> dict:
+    old = rate(legacy, rows, repeat, before)
+    new = rate(current, rows, repeat, before)
+    return {"emailstr_rows_per_sec": old, "cached_rows_per_sec": new, "speedup": round(new / old, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    body = payload(args.rows)
+    legacy_batch = TypeAdapter(List[LegacyUserCreate])
+    current_batch = TypeAdapter(List[UserCreate])
+    report = {"rows": args.rows}
+
+    report["bulk_import_cold"] = compare(
+        lambda: legacy_batch.validate_json(body), lambda: current_batch.validate_json(body),
+        args.rows, args.repeat, before=clear_caches,
+    )
+    current_batch.validate_json(body)  # warm: every address now cached
+    report["reimport_warm"] = compare(
+        lambda: legacy_batch.validate_json(body), lambda: current_batch.validate_json(body), args.rows, args.repeat,
+    )
+
+    created: List[BaseModel] = current_batch.validate_json(body)
+    stored = [UserRead.model_construct(**u.model_dump()) for u in created]
+    rows_json = [to_json(u.__dict__) for u in stored]  # as SQLiteRepository stores them
+    clear_caches()
+    report["storage_read"] = compare(
+        lambda: [LegacyUserRead.model_validate_json(r) for r in rows_json],
+        lambda: [UserRead.model_validate_json(r, context=TRUSTED) for r in rows_json],
+        args.rows, args.repeat, before=clear_caches,
+    )
+    report["build_stored_row"] = compare(
+        lambda: [LegacyUserRead(**u.model_dump()) for u in created],
+        lambda: [UserRead.model_construct(**u.model_dump()) for u in created],
+        args.rows, args.repeat, before=clear_caches,
+    )
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,112 @@
+"""Requests/sec against a real server socket as the number of pre-forked workers grows.
+
+For each worker count, starts ``python -m framework.server main:app`` with
+``WEB_CONCURRENCY`` set, waits for ``/health``, then hammers ``--path`` from
+``--clients`` load-generator processes (each with ``--connections`` keep-alive
+connections) for ``--seconds``. The load generator competes with the server
+for CPU, so run it on a machine with spare cores (or point ``wrk`` at a
+server started the same way) and compare numbers from the same machine only.
+With one core, extra workers can only add context switches; expect
+throughput to grow with workers roughly up to the number of free cores.
+
+    python -m benchmarks.workers --workers 1,2,4,8 --path /users?limit=10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not become ready")
+
+
+async def _load(url: str, connections: int, seconds: float) -> int:
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    done = 0
+    deadline = time.monotonic() + seconds
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def worker() -> None:
+            nonlocal done
+            while time.monotonic() < deadline:
+                r = await client.get(url)
+                r.raise_for_status()
+                done += 1
+
+        await asyncio.gather(*(worker() for _ in range(connections)))
+    return done
+
+
+def load_process(url: str, connections: int, seconds: float) -> int:
+    return asyncio.run(_load(url, connections, seconds))
+
+
+def measure(workers: int, path: str, clients: int, connections: int, seconds: float, db: str) -> dict:
+    port = free_port()
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "FASTAPIPORT": str(port),
+        "ACCESS_LOG": "0",
+        "SQLITE_PATH": db,
+        "WAL_DIR": "",  # memory: a shared-nothing store per worker, as before
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "framework.server", "main:app"], env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        wait_ready(base + "/health")
+        with multiprocessing.get_context("spawn").Pool(clients) as pool:
+            started = time.perf_counter()
+            counts = pool.starmap(load_process, [(base + path, connections, seconds)] * clients)
+            elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    total = sum(counts)
+    return {"workers": workers, "requests": total, "requests_per_sec": round(total / elapsed, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, os.cpu_count() or 1})))
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--clients", type=int, default=2, help="load-generator processes")
+    parser.add_argument("--connections", type=int, default=64, help="connections per load generator")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        runs = [
+            measure(int(n), args.path, args.clients, args.connections, args.seconds, db)
+            for n in args.workers.split(",")
+        ]
+    baseline = runs[0]["requests_per_sec"]
+    for run in runs:
+        run["speedup"] = round(run["requests_per_sec"] / baseline, 2)
+    print(json.dumps({"cpus": os.cpu_count(), "path": args.path, "runs": runs}, indent=2))
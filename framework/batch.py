@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from typing import Annotated, Any, Callable, List, Optional, Sequence, Tuple, Type, TypeVar
+from uuid import UUID
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pydantic import Field, TypeAdapter, ValidationError
+
+from framework.responses import PydanticJSONResponse
+from models.batch import BatchGetResult, BatchItemResult, BatchResult
+from services.repository import BatchOutcome, ConflictError, NotFoundError, RepositoryError
+
+T = TypeVar("T")
+
+ROLLED_BACK = 424
+ROLLED_BACK_MESSAGE = "Not applied: another item in the batch failed"
+
+
+def error_status(exc: RepositoryError) -> int:
+    if isinstance(exc, NotFoundError):
+        return 404
+    if isinstance(exc, ConflictError):
+        return 409
+    return 400
+
+
+def batch_adapter(item_type: Type[T], max_items: int) -> TypeAdapter[List[T]]:
+    """Validator for a JSON array of ``item_type``, capped at ``max_items``.
+
+    The cap is part of the schema, so an oversized array fails as soon as it
+    is parsed, before any of its items are validated.
+    """
+    return TypeAdapter(Annotated[List[item_type], Field(max_length=max_items)])
+
+
+async def read_batch(
+    request: Request, adapter: TypeAdapter[List[T]], max_items: int, max_bytes: int
+) -> Tuple[Optional[List[T]], Optional[JSONResponse]]:
+    """Read a batch body of at most ``max_bytes`` and validate it with :func:`validate_batch`.
+
+    A body declared (``Content-Length``) or found to be larger is refused
+    with 413 as soon as that is known, without buffering the rest of it.
+    """
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        return None, _too_large(f"Batch body of {declared} bytes exceeds the limit of {max_bytes}")
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            return None, _too_large(f"Batch body exceeds the limit of {max_bytes} bytes")
+        chunks.append(chunk)
+    return validate_batch(adapter, b"".join(chunks), max_items)
+
+
+def validate_batch(
+    adapter: TypeAdapter[List[T]], body: bytes, max_items: int
+) -> Tuple[Optional[List[T]], Optional[JSONResponse]]:
+    """Validate a JSON array body in a single ``validate_json`` pass.
+
+    Returns ``(items, None)`` on success, or ``(None, response)`` with a
+    per-item report when any element is invalid. With an ``adapter`` from
+    :func:`batch_adapter` an array over ``max_items`` is a 413 before its
+    items are validated.
+    """
+    try:
+        items = adapter.validate_json(body)
+    except ValidationError as exc:
+        errors = exc.errors(include_url=False, include_input=False)
+        if errors[0]["type"] == "too_long" and not errors[0]["loc"]:
+            count = errors[0]["ctx"]["actual_length"]
+            return None, _too_large(f"Batch of {count} items exceeds the limit of {max_items}")
+        return None, _invalid_items_response(exc)
+    if len(items) > max_items:
+        return None, _too_large(f"Batch of {len(items)} items exceeds the limit of {max_items}")
+    return items, None
+
+
+def _too_large(detail: str) -> JSONResponse:
+    return JSONResponse(status_code=413, content={"detail": detail})
+
+
+def _invalid_items_response(exc: ValidationError) -> JSONResponse:
+    errors: dict[int, List[str]] = {}
+    for err in exc.errors(include_url=False):
+        loc = err["loc"]
+        if not loc or not isinstance(loc[0], int):
+            # The body itself is not a JSON array; there are no items to report.
+            return JSONResponse(status_code=422, content={"detail": exc.errors(include_url=False, include_input=False)})
+        field = ".".join(str(part) for part in loc[1:]) or "item"
+        errors.setdefault(loc[0], []).append(f"{field}: {err['msg']}")
+    # Item count is unknown once validation fails, so report only the bad items.
+    results = [
+        BatchItemResult(index=index, status=422, error="; ".join(messages))
+        for index, messages in sorted(errors.items())
+    ]
+    return PydanticJSONResponse(BatchResult(applied=False, results=results), status_code=422)
+
+
+def batch_response(
+    applied: bool,
+    outcomes: Sequence[BatchOutcome],
+    success_status: int,
+    key_of: Callable[[Any], UUID],
+) -> JSONResponse:
+    """Build the per-item report for an all-or-nothing batch write.
+
+    An applied batch answers 201 when its items were creates, else 200 (a
+    204 could not carry the report); a rejected one, the first failure's.
+    """
+    results: List[BatchItemResult] = []
+    success = 201 if success_status == 201 else 200
+    overall = success
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, RepositoryError):
+            status = error_status(outcome)
+            overall = overall if overall != success else status
+            results.append(BatchItemResult(
+                index=index,
+                status=status,
+                id=outcome.key if isinstance(outcome, NotFoundError) else None,
+                error=str(outcome),
+            ))
+        elif applied:
+            results.append(BatchItemResult(index=index, status=success_status, id=key_of(outcome)))
+        else:
+            results.append(BatchItemResult(
+                index=index, status=ROLLED_BACK, id=key_of(outcome), error=ROLLED_BACK_MESSAGE,
+            ))
+    return PydanticJSONResponse(BatchResult(applied=applied, results=results), status_code=overall)
+
+
+def batch_get_response(
+    result_type: Type[BatchGetResult],
+    keys: Sequence[UUID],
+    items: Sequence[Optional[Any]],
+) -> JSONResponse:
+    """Split a multi-get's ``items`` (aligned with ``keys``) into found entities and missing IDs.
+
+    A key requested more than once is reported once.
+    """
+    found: List[Any] = []
+    missing: List[UUID] = []
+    seen = set()
+    for key, item in zip(keys, items):
+        if key in seen:
+            continue
+        seen.add(key)
+        if item is None:
+            missing.append(key)
+        else:
+            found.append(item)
+    return PydanticJSONResponse(result_type.model_construct(found=found, missing=missing))
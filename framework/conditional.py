@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Response
+
+from services.pagination import to_micros
+from services.repository import Precondition
+
+
+def entity_etag(key: UUID, updated_at: datetime) -> str:
+    """Strong ETag derived from the entity's ID and version (``updated_at``).
+
+    Every write bumps ``updated_at`` to a strictly later value, so the pair
+    changes whenever the representation does, and computing it never needs
+    the body to be serialized or hashed.
+    """
+    return f'"{key.hex}-{to_micros(updated_at):x}"'
+
+
+def _tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: Optional[str], etag: str) -> bool:
+    """``If-None-Match`` evaluation (weak comparison, RFC 9110 13.1.2)."""
+    if not header:
+        return False
+    tags = _tags(header)
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def if_match_precondition(header: Optional[str], key_field: str) -> Optional[Precondition]:
+    """Turn an ``If-Match`` header into a repository precondition (strong comparison)."""
+    if not header:
+        return None
+    tags = _tags(header)
+    if "*" in tags:
+        return lambda current: True
+    wanted = set(tags)
+    return lambda current: entity_etag(getattr(current, key_field), current.updated_at) in wanted
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+from typing import Any, List, Type
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+from framework.routing import record_render
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter[List[BaseModel]]:
+    return TypeAdapter(List[model])
+
+
+def render_json(content: Any) -> bytes:
+    """Serialize already-validated models to JSON bytes in one pydantic-core pass.
+
+    Homogeneous lists go through a cached ``TypeAdapter(List[Model])``, whose
+    serializer knows the item schema up front; anything else falls back to
+    ``pydantic_core.to_json``. Field-level ``exclude=True`` is honoured either way.
+    """
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    if isinstance(content, list) and content and isinstance(content[0], BaseModel):
+        model = type(content[0])
+        if all(type(item) is model for item in content):
+            return _list_adapter(model).dump_json(content)
+    return to_json(content)
+
+
+def render_recorded(content: Any) -> bytes:
+    """:func:`render_json`, timed as the current request's serialization phase."""
+    started = time.perf_counter()
+    try:
+        return render_json(content)
+    finally:
+        record_render(time.perf_counter() - started)
+
+
+class PydanticJSONResponse(JSONResponse):
+    """JSON response for content that is already a validated pydantic model (or list of them).
+
+    Returning a response object from a route makes FastAPI skip its
+    ``response_model`` pass, which would re-validate the models, convert them
+    to plain dicts and then ``json.dumps`` those. The route's
+    ``response_model`` still drives the OpenAPI schema, so handlers must only
+    return objects of that type.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return render_recorded(content)
+
+
+class RawJSONResponse(Response):
+    """JSON body that is already serialized (e.g. by a response cache), sent as is."""
+
+    media_type = "application/json"
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable, Coroutine, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+
+@dataclass
+class RequestTimings:
+    """Phase timestamps for one request, filled in as it moves through the route.
+
+    Set by the timing middleware and shared with the route handler through
+    :data:`current_timings`. Sync endpoints run in the threadpool with a copy
+    of the context, which still points at this same object.
+    """
+    route: Optional[str] = None
+    route_started: float = 0.0
+    route_finished: float = 0.0
+    endpoint_started: float = 0.0
+    endpoint_seconds: float = 0.0
+    render_seconds: float = 0.0
+
+    def phases(self) -> dict:
+        """Split the route's time into validation, handler and serialization seconds.
+
+        Validation is everything before the endpoint runs (body parsing,
+        parameter and dependency resolution). Serialization is JSON rendering
+        inside the endpoint plus FastAPI's own ``response_model`` pass after
+        it; handler is what is left of the endpoint call.
+        """
+        if not self.route_finished or not self.endpoint_started:
+            return {}
+        total = self.route_finished - self.route_started
+        validation = self.endpoint_started - self.route_started
+        handler = max(0.0, self.endpoint_seconds - self.render_seconds)
+        return {
+            "validation": validation,
+            "handler": handler,
+            "serialization": max(0.0, total - validation - handler),
+        }
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def record_render(seconds: float) -> None:
+    """Attribute ``seconds`` of response rendering to the current request."""
+    timings = current_timings.get()
+    if timings is not None:
+        timings.render_seconds += seconds
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def timed(*args, **kwargs):
+            timings = current_timings.get()
+            if timings is None:
+                return await call(*args, **kwargs)
+            timings.endpoint_started = started = time.perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                timings.endpoint_seconds = time.perf_counter() - started
+    else:
+        @wraps(call)
+        def timed(*args, **kwargs):
+            timings = current_timings.get()
+            if timings is None:
+                return call(*args, **kwargs)
+            timings.endpoint_started = started = time.perf_counter()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                timings.endpoint_seconds = time.perf_counter() - started
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that reports its path template and phase timings to :data:`current_timings`.
+
+    The endpoint is wrapped only after FastAPI has analysed its signature, so
+    parameter and annotation handling is untouched. Install it with
+    ``app.router.route_class = TimedRoute`` before declaring routes.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        self.dependant.call = _timed_endpoint(self.dependant.call)
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def timed_handler(request: Request) -> Response:
+            timings = current_timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.route = route
+            timings.route_started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                timings.route_finished = time.perf_counter()
+
+        return timed_handler
@@ -0,0 +1,183 @@
+"""Production entry point: a pre-forking uvicorn supervisor.
+
+``python main.py`` (or ``python -m framework.server main:app``) imports the
+app once in the parent, binds the listening socket, then forks
+``WEB_CONCURRENCY`` workers (default: CPU count) that share it; the kernel
+spreads connections across them. Each worker runs its own event loop
+(uvloop and httptools when installed) and its own lifespan, so background
+threads and the password-hashing pool are started after the fork.
+
+Storage follows ``STORAGE_BACKEND``: ``memory`` gives every worker its own
+shared-nothing store (fine for stateless load tests, wrong for real data),
+``sqlite`` shares one database file between workers (persons and addresses
+stay in memory either way). The write-ahead log that keeps in-memory data
+across restarts (off unless ``WAL_DIR`` is set) belongs to one process: an
+app that builds one refuses an explicit ``WEB_CONCURRENCY`` above 1 and
+otherwise runs a single worker, saying so at startup.
+
+SIGTERM or SIGINT drains: workers stop accepting, finish in-flight requests
+for up to ``GRACEFUL_TIMEOUT_SECONDS`` and exit; stragglers are then killed.
+Workers that die on their own are replaced. ``RELOAD=1`` runs the single-
+process file-watching dev server instead.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional, Union
+
+import uvicorn
+from starlette.types import ASGIApp
+
+from services.durability import DurableStore
+
+logger = logging.getLogger("uvicorn.error")
+
+GRACEFUL_TIMEOUT_SECONDS = int(os.environ.get("GRACEFUL_TIMEOUT_SECONDS", 30))
+# Extra time the parent waits beyond the workers' own graceful timeout.
+KILL_MARGIN_SECONDS = 5
+RESPAWN_BACKOFF_SECONDS = 1.0
+
+
+def default_workers() -> int:
+    return int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def _truthy(name: str, default: str = "0") -> bool:
+    return os.environ.get(name, default) not in ("", "0")
+
+
+class Supervisor:
+    """Forks ``workers`` copies of a preloaded uvicorn server onto one socket and keeps them running."""
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        # Child: uvicorn installs its own SIGINT/SIGTERM handlers for the
+        # lifetime of serve() and re-raises the signal after a graceful exit;
+        # ignoring it afterwards lets the worker exit with status 0.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        status = 0
+        try:
+            uvicorn.Server(self.config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            status = 1
+        finally:
+            os._exit(status)
+
+    def _stop(self, signum: int, frame) -> None:
+        self.stopping = True
+
+    def _reap(self) -> None:
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                return
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning("Worker %d exited (status %d); restarting", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < RESPAWN_BACKOFF_SECONDS:
+                time.sleep(RESPAWN_BACKOFF_SECONDS)  # don't spin on a worker that dies at startup
+            self._spawn()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        logger.info("Starting %d workers (pid %d)", self.workers, os.getpid())
+        for _ in range(self.workers):
+            self._spawn()
+        while not self.stopping:
+            self._reap()
+            time.sleep(0.2)
+
+        logger.info("Draining %d workers", len(self.children))
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + (self.config.timeout_graceful_shutdown or 0) + KILL_MARGIN_SECONDS
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning("Worker %d did not drain in time; killing it", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.sock.close()
+
+
+def serve(
+    app: Union[str, ASGIApp],
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: Optional[int] = None,
+    reload: Optional[bool] = None,
+) -> None:
+    """Run ``app`` (an object or ``"module:attr"`` string) in production or dev mode."""
+    reload = _truthy("RELOAD") if reload is None else reload
+    if reload:
+        if not isinstance(app, str):
+            raise ValueError("RELOAD needs the app as an import string, e.g. 'main:app'")
+        uvicorn.run(app, host=host, port=port, reload=True)
+        return
+
+    explicit = workers is not None or "WEB_CONCURRENCY" in os.environ
+    workers = default_workers() if workers is None else workers
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop="auto",  # uvloop if installed
+        http="auto",  # httptools if installed
+        lifespan="on",
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT_SECONDS,
+        access_log=_truthy("ACCESS_LOG", "1"),
+    )
+    config.load()  # import once, before forking, so workers share the loaded code pages
+    if workers > 1 and DurableStore.configured():
+        if explicit:
+            raise SystemExit(
+                f"WAL_DIR is set, and its write-ahead log belongs to one process: run with WEB_CONCURRENCY=1, "
+                f"or unset WAL_DIR to give each of the {workers} workers its own in-memory store"
+            )
+        logger.warning(
+            "WAL_DIR is set, and its write-ahead log belongs to one process: starting 1 worker instead of "
+            "the %d CPUs; set WEB_CONCURRENCY=1 to silence this, or unset WAL_DIR to run several",
+            workers,
+        )
+        workers = 1
+    if workers > 1 and os.environ.get("STORAGE_BACKEND", "memory") == "memory":
+        logger.warning("STORAGE_BACKEND=memory with %d workers: each worker has its own store", workers)
+    sock = config.bind_socket()
+    if workers <= 1:
+        uvicorn.Server(config).run(sockets=[sock])
+        return
+    Supervisor(config, sock, workers).run()
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    serve(
+        sys.argv[1] if len(sys.argv) > 1 else "main:app",
+        port=int(os.environ.get("FASTAPIPORT", 8000)),
+    )
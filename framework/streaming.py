@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, List
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_chunks(chunks: Iterable[List[BaseModel]]) -> Iterator[bytes]:
+    """Serialize each chunk of models into one newline-delimited JSON block."""
+    for chunk in chunks:
+        yield b"".join(item.model_dump_json().encode() + b"\n" for item in chunk)
+
+
+class NDJSONResponse(StreamingResponse):
+    """Stream chunks of models as NDJSON.
+
+    Starlette drives a sync iterator from the threadpool and awaits each
+    ``send``, so a slow client stalls the generator instead of letting
+    serialized chunks pile up in memory.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    def __init__(
+        self,
+        chunks: Iterable[List[BaseModel]],
+        status_code: int = 200,
+        filename: str | None = None,
+        **kwargs,
+    ):
+        super().__init__(ndjson_chunks(chunks), status_code=status_code, media_type=self.media_type, **kwargs)
+        if filename:
+            self.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
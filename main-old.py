@@ -1,5 +1,4 @@
 from fastapi import FastAPI
-import uvicorn
 
 from datetime import datetime
 import socket
@@ -38,4 +37,8 @@ def get_health_with_path(
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    from framework.server import serve
+
+    # This file is not importable by name, so it is served as an object
+    # (no RELOAD); see framework/server.py.
+    serve(app, host="0.0.0.0", port=8000)
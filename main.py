@@ -1,86 +1,647 @@
 from __future__ import annotations
 
 import os
-import socket
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from typing import Dict, List
+from typing import Dict, List, Literal
 from uuid import UUID
 
-from fastapi import FastAPI, HTTPException
+import anyio
+from fastapi import Body, FastAPI, Header, Request, Response
 from fastapi import Query, Path
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
 from typing import Optional
 
-from models.person import PersonCreate, PersonRead, PersonUpdate
+from framework.batch import batch_adapter, batch_get_response, batch_response, read_batch
+from framework.conditional import entity_etag, if_match_precondition, none_match, not_modified
+from framework.responses import PydanticJSONResponse, RawJSONResponse, render_recorded
+from framework.routing import TimedRoute
+from framework.streaming import NDJSONResponse
 from models.address import AddressCreate, AddressRead, AddressUpdate
+from models.batch import BatchGetResult, BatchResult
 from models.health import Health
-from models.subscription import SubscriptionCreate, SubscriptionRead, SubscriptionUpdate
+from models.person import PersonCreate, PersonRead, PersonUpdate
+from models.search import SearchHit, SearchResults
+from models.subscription import (
+    SubscriptionBatchUpdate,
+    SubscriptionCreate,
+    SubscriptionRead,
+    SubscriptionUpdate,
+)
+from middleware.admission import LoadShedMiddleware, RateLimitMiddleware, ShedMetrics
+from middleware.compression import CompressionMiddleware, Precompressed, PrecompressedMiddleware
+from middleware.latency import LatencyWindow
+from middleware.recording import RecordingMiddleware, RequestLog
+from middleware.timing import RouteMetrics, TimingMiddleware
 from models.user import UserCreate, UserUpdate, UserRead
+from models.validation import Email
+from services.aio import AsyncRepository
+from services.cache import CachedResponse, ResponseCache, render_prometheus as render_cache_metrics
+from services.durability import DurableStore
+from services.hostinfo import HostInfoProvider
+from services.passwords import PasswordHasher
+from services.people import PeopleStore
+from services.search import SearchField, SearchService
+from services.pagination import InvalidCursorError, SortKey, decode_cursor, encode_cursor
+from services.repository import (
+    SUBSCRIPTIONS,
+    USERS,
+    ConflictError,
+    InUseError,
+    NotFoundError,
+    PreconditionFailedError,
+    create_repository,
+)
 
 port = int(os.environ.get("FASTAPIPORT", 8000))
+MAX_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 500))
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 10_000))
+BATCH_GET_MAX_ITEMS = int(os.environ.get("BATCH_GET_MAX_ITEMS", 5_000))
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", 8 * 2**20))
+HOSTINFO_TTL_SECONDS = float(os.environ.get("HOSTINFO_TTL_SECONDS", 60))
 
 # -----------------------------------------------------------------------------
-# Fake in-memory "databases"
+# Storage (STORAGE_BACKEND=memory|sqlite, see services/repository.py)
 # -----------------------------------------------------------------------------
 
-users: Dict[UUID, UserRead] = {}
-subscriptions: Dict[UUID, SubscriptionRead] = {}
+# Persons and their deduplicated addresses (in memory; see services/people.py).
+people = PeopleStore()
+
+# With WAL_DIR set, the in-memory stores (persons and addresses always, users
+# and subscriptions unless in SQLite) survive restarts through a write-ahead
+# log plus snapshots there (see services/durability.py); None when unset.
+_user_store = create_repository(USERS)
+_subscription_store = create_repository(SUBSCRIPTIONS)
+durability = DurableStore.from_env({"users": _user_store, "subscriptions": _subscription_store, **people.tables})
+
+# CRUD handlers are ``async def`` and go through the awaitable facade, which
+# only leaves the event loop when the backend actually blocks.
+users = AsyncRepository(_user_store, durable=durability)
+subscriptions = AsyncRepository(_subscription_store, durable=durability)
+
+# Prefix/fuzzy name search, kept current by the repositories' change
+# notifications (see services/search.py).
+search = SearchService.from_env()
+search.register("user", users.sync, (
+    SearchField("first_name", fuzzy=True),
+    SearchField("last_name", fuzzy=True),
+    SearchField("email", weight=0.8),
+))
+search.register("subscription", subscriptions.sync, (
+    SearchField("member_name", fuzzy=True),
+    SearchField("username", weight=0.9),
+))
+SEARCHABLE = {"user": users, "subscription": subscriptions}
+
+# Rendered GET-by-id responses (ETag + JSON bytes), dropped whenever the
+# entity is written (see services/cache.py). Concurrent misses for one ID
+# share a single read when the backend blocks (SQLite). A store that other
+# processes also write (SQLite) has every hit checked against the row's
+# stored version, since their writes never reach this process's listeners.
+def stored_etag(repo: AsyncRepository):
+    async def current(key: UUID) -> Optional[str]:
+        updated_at = await repo.version(key)
+        return None if updated_at is None else entity_etag(key, updated_at)
+    return current if repo.sync.shared else None
+
+
+user_cache = ResponseCache("user", coalesce=users.sync.blocking, revalidate=stored_etag(users))
+user_cache.attach(users.sync)
+subscription_cache = ResponseCache(
+    "subscription", coalesce=subscriptions.sync.blocking, revalidate=stored_etag(subscriptions)
+)
+subscription_cache.attach(subscriptions.sync)
+
+host_info = HostInfoProvider(ttl=HOSTINFO_TTL_SECONDS)
+password_hasher = PasswordHasher.from_env()
+request_latency = LatencyWindow()
+route_metrics = RouteMetrics()
+shed_metrics = ShedMetrics()
+static_payloads = Precompressed()
+# Sampled request capture for benchmarks/replay.py; off unless REQUEST_LOG_PATH is set.
+request_log = RequestLog.from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    host_info.start()
+    password_hasher.start()
+    if durability is not None:
+        durability.open()  # recovers, so before search.start() backfills
+        people.reindex()
+    search.start()
+    if request_log is not None:
+        request_log.start()
+    yield
+    if request_log is not None:
+        request_log.stop()
+    password_hasher.shutdown()
+    host_info.stop()
+    if durability is not None:
+        durability.close()
+    users.close()
+    subscriptions.close()
 
+
+# Routes return PydanticJSONResponse with already-validated models, so FastAPI
+# skips re-validating them against response_model; the declared
+# response_model still documents each route in the OpenAPI schema.
 app = FastAPI(
     title="User/Subscription API",
     description="Demo FastAPI app using Pydantic v2 models for User and Subscription",
     version="0.1.0",
+    lifespan=lifespan,
+)
+# Must be set before any route is declared; see middleware/timing.py.
+app.router.route_class = TimedRoute
+# Each add_middleware() wraps the ones before it: fixed payloads (the OpenAPI
+# schema) are answered innermost, so admission control covers them too;
+# timing sees every request, including those shed (503) or rate limited (429)
+# before reaching a route, and its totals include compression.
+app.add_middleware(PrecompressedMiddleware, payloads=static_payloads)
+app.add_middleware(RateLimitMiddleware, **RateLimitMiddleware.options_from_env())
+app.add_middleware(LoadShedMiddleware, metrics=shed_metrics, **LoadShedMiddleware.options_from_env())
+app.add_middleware(CompressionMiddleware, **CompressionMiddleware.options_from_env())
+app.add_middleware(
+    TimingMiddleware, metrics=route_metrics, window=request_latency, **TimingMiddleware.options_from_env()
 )
+# Outermost, so the recorded duration and status are what the client saw.
+app.add_middleware(RecordingMiddleware, log=request_log, **RecordingMiddleware.options_from_env())
+# The schema only changes with the code: render and compress it once, on the
+# first request for it rather than at startup (see benchmarks/startup.py).
+static_payloads.add_lazy(app.openapi_url, lambda: JSONResponse(app.openapi()).body, "application/json")
+
+
+@app.exception_handler(NotFoundError)
+def not_found_handler(request: Request, exc: NotFoundError):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+
+@app.exception_handler(ConflictError)
+def conflict_handler(request: Request, exc: ConflictError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+@app.exception_handler(InUseError)
+def in_use_handler(request: Request, exc: InUseError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+@app.exception_handler(PreconditionFailedError)
+def precondition_failed_handler(request: Request, exc: PreconditionFailedError):
+    return JSONResponse(status_code=412, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidCursorError)
+def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+async def hash_password_change(changes: dict) -> dict:
+    """Replace a plaintext ``password`` in update ``changes`` with its hash."""
+    if changes.get("password") is not None:
+        changes["password"] = await password_hasher.hash(changes["password"])
+    else:
+        changes.pop("password", None)
+    return changes
+
+
+CONDITIONAL_GET_RESPONSES = {304: {"description": "Not modified; the client's copy (If-None-Match) is current"}}
+CONDITIONAL_PUT_RESPONSES = {412: {"description": "If-Match did not match the current ETag"}}
+
+
+def rendered(key: UUID, item) -> CachedResponse:
+    """What a GET-by-id sends for ``item``: its ETag and JSON body."""
+    return entity_etag(key, item.updated_at), render_recorded(item)
+
+
+def cached_get(cached: CachedResponse, if_none_match: Optional[str]) -> Response:
+    etag, body = cached
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    return RawJSONResponse(body, headers={"ETag": etag})
+
+
+# Batch routes take a JSON array of at most BATCH_MAX_BYTES, validated in
+# one TypeAdapter pass that stops at the item limit.
+id_batch = batch_adapter(UUID, BATCH_MAX_ITEMS)
+id_batch_get = batch_adapter(UUID, BATCH_GET_MAX_ITEMS)
+
+
+def batch_body(item_type: type, max_items: int = BATCH_MAX_ITEMS) -> dict:
+    """OpenAPI request body for a raw-JSON batch route whose items are ``item_type``."""
+    schema = {"type": "array", "items": TypeAdapter(item_type).json_schema(), "maxItems": max_items}
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+
+def page_headers(request: Request, next_key: Optional[SortKey]) -> Dict[str, str]:
+    """Advertise the next page via ``X-Next-Cursor`` and an RFC 8288 ``Link`` header."""
+    cursor = encode_cursor(next_key)
+    if cursor is None:
+        return {}
+    next_url = request.url.include_query_params(cursor=cursor)
+    return {"X-Next-Cursor": cursor, "Link": f'<{next_url}>; rel="next"'}
+
+# -----------------------------------------------------------------------------
+# Health endpoints
+# -----------------------------------------------------------------------------
+
+async def make_health(echo: Optional[str], path_echo: Optional[str] = None, deep: bool = False) -> Health:
+    health = Health(
+        status=200,
+        status_message="OK",
+        timestamp=datetime.utcnow().isoformat() + "Z",
+        ip_address=host_info.ip_address,
+        echo=echo,
+        path_echo=path_echo,
+    )
+    if deep:
+        health.stores = {"users": await users.count(), "subscriptions": await subscriptions.count()}
+        health.latency_ms = request_latency.percentiles(0.5, 0.95, 0.99)
+    return health
+
+# Health handlers never block (the host IP is cached), so they run on the
+# event loop instead of paying a threadpool hop per load-balancer probe.
+
+@app.get("/health", response_model=Health)
+async def get_health_no_path(
+    echo: str | None = Query(None, description="Optional echo string"),
+    deep: bool = Query(False, description="Include store sizes and latency percentiles"),
+):
+    return await make_health(echo=echo, path_echo=None, deep=deep)
+
+@app.get("/health/{path_echo}", response_model=Health)
+async def get_health_with_path(
+    path_echo: str = Path(..., description="Required echo in the URL path"),
+    echo: str | None = Query(None, description="Optional echo string"),
+    deep: bool = Query(False, description="Include store sizes and latency percentiles"),
+):
+    return await make_health(echo=echo, path_echo=path_echo, deep=deep)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Per-route request counts, phase latency histograms, load shedding and response cache counters for Prometheus."""
+    body = (
+        route_metrics.render_prometheus()
+        + shed_metrics.render_prometheus()
+        + render_cache_metrics((user_cache, subscription_cache))
+    )
+    return Response(body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # -----------------------------------------------------------------------------
 # User Endpoints
 # -----------------------------------------------------------------------------
 
 @app.get("/users", response_model=list[UserRead])
-def list_users():
-    raise HTTPException(status_code=501, detail="Not implemented")
+async def list_users(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of users to return"),
+    username: Optional[str] = Query(None, description="Filter by exact username"),
+    email: Optional[Email] = Query(None, description="Filter by exact email (normalized like stored addresses)"),
+    gender: Optional[str] = Query(None, description="Filter by gender"),
+):
+    """List users ordered by creation time, one page at a time."""
+    filters = {"username": username, "email": email, "gender": gender}
+    rows, next_key = await users.page(filters, after=decode_cursor(cursor), limit=limit)
+    return PydanticJSONResponse(rows, headers=page_headers(request, next_key))
 
-@app.post("/users", response_model=UserRead)
-def create_user(user: UserCreate):
-    raise HTTPException(status_code=501, detail="Not implemented")
+@app.get(
+    "/users/export",
+    response_class=NDJSONResponse,
+    responses={200: {"description": "One UserRead JSON object per line."}},
+)
+def export_users():
+    """Stream every user as newline-delimited JSON."""
+    return NDJSONResponse(users.sync.iter_chunks(chunk_size=EXPORT_CHUNK_SIZE), filename="users.ndjson")
 
-@app.get("/users/{user_id}", response_model=UserRead)
-def get_user(user_id: UUID = Path(..., description="User ID")):
-    raise HTTPException(status_code=501, detail="Not implemented")
+@app.post("/users", response_model=UserRead, status_code=201)
+async def create_user(user: UserCreate):
+    password_hash = await password_hasher.hash(user.password)
+    # Built from an already-validated UserCreate: no second validation pass.
+    created = await users.add(UserRead.model_construct(**{**user.model_dump(), "password": password_hash}))
+    etag = entity_etag(created.id, created.updated_at)
+    return PydanticJSONResponse(created, status_code=201, headers={"ETag": etag})
 
-@app.put("/users/{user_id}", response_model=UserRead)
-def update_user(user_id: UUID, update: UserUpdate):
-    raise HTTPException(status_code=501, detail="Not implemented")
+@app.post(
+    "/users:batchGet",
+    response_model=BatchGetResult[UserRead],
+    openapi_extra=batch_body(UUID, BATCH_GET_MAX_ITEMS),
+)
+async def batch_get_users(request: Request):
+    """Fetch many users by ID in one store lookup; unknown IDs are listed as missing."""
+    keys, error = await read_batch(request, id_batch_get, BATCH_GET_MAX_ITEMS, BATCH_MAX_BYTES)
+    if error is not None:
+        return error
+    return batch_get_response(BatchGetResult[UserRead], keys, await users.get_many(keys))
+
+@app.get("/users/{user_id}", response_model=UserRead, responses=CONDITIONAL_GET_RESPONSES)
+async def get_user(
+    user_id: UUID = Path(..., description="User ID"),
+    if_none_match: Optional[str] = Header(None),
+):
+    cached = await user_cache.get_or_load(user_id, users.require, lambda user: rendered(user.id, user))
+    return cached_get(cached, if_none_match)
+
+@app.put("/users/{user_id}", response_model=UserRead, responses=CONDITIONAL_PUT_RESPONSES)
+async def update_user(
+    user_id: UUID,
+    update: UserUpdate,
+    if_match: Optional[str] = Header(None, description="Only update if the current ETag matches"),
+):
+    changes = await hash_password_change(update.model_dump(exclude_unset=True))
+    updated = await users.update(user_id, changes, if_match_precondition(if_match, "id"))
+    etag = entity_etag(updated.id, updated.updated_at)
+    return PydanticJSONResponse(updated, headers={"ETag": etag})
 
 @app.delete("/users/{user_id}", status_code=204)
-def delete_user(user_id: UUID):
-    raise HTTPException(status_code=501, detail="Not implemented")
+async def delete_user(user_id: UUID):
+    await users.delete(user_id)
 
 # -----------------------------------------------------------------------------
 # Subscription endpoints
 # -----------------------------------------------------------------------------
 
 @app.get("/subscriptions", response_model=List[SubscriptionRead])
-def list_subscriptions():
-    """Get a list of all subscriptions available."""
-    raise HTTPException(status_code=501, detail="Not implemented")
+async def list_subscriptions(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of subscriptions to return"),
+    service: Optional[str] = Query(None, description="Filter by service name"),
+    username: Optional[str] = Query(None, description="Filter by member username"),
+    gender: Optional[str] = Query(None, description="Filter by member gender"),
+):
+    """Get a page of subscriptions, ordered by creation time."""
+    filters = {"service": service, "username": username, "gender": gender}
+    rows, next_key = await subscriptions.page(filters, after=decode_cursor(cursor), limit=limit)
+    return PydanticJSONResponse(rows, headers=page_headers(request, next_key))
+
+@app.get(
+    "/subscriptions/export",
+    response_class=NDJSONResponse,
+    responses={200: {"description": "One SubscriptionRead JSON object per line."}},
+)
+def export_subscriptions():
+    """Stream every subscription as newline-delimited JSON."""
+    return NDJSONResponse(subscriptions.sync.iter_chunks(chunk_size=EXPORT_CHUNK_SIZE), filename="subscriptions.ndjson")
+
+def new_subscription(subscription: SubscriptionCreate, password_hash: str) -> SubscriptionRead:
+    # The client-facing subscription_id is a label; the stored ID is server-generated.
+    fields = subscription.model_dump(exclude={"subscription_id"})
+    return SubscriptionRead.model_construct(**{**fields, "password": password_hash})
 
-@app.post("/subscriptions", response_model=SubscriptionRead)
-def create_subscription(subscription: SubscriptionCreate = Body(...)):
+@app.post("/subscriptions", response_model=SubscriptionRead, status_code=201)
+async def create_subscription(subscription: SubscriptionCreate = Body(...)):
     """Create a new subscription."""
-    raise HTTPException(status_code=501, detail="Not implemented")
+    password_hash = await password_hasher.hash(subscription.password)
+    created = await subscriptions.add(new_subscription(subscription, password_hash))
+    etag = entity_etag(created.subscription_id, created.updated_at)
+    return PydanticJSONResponse(created, status_code=201, headers={"ETag": etag})
+
+# Batch writes are applied all-or-nothing; the response reports a status for
+# every item.
+subscription_create_batch = batch_adapter(SubscriptionCreate, BATCH_MAX_ITEMS)
+subscription_update_batch = batch_adapter(SubscriptionBatchUpdate, BATCH_MAX_ITEMS)
+
+
+@app.post(
+    "/subscriptions:batch",
+    response_model=BatchResult,
+    status_code=201,
+    openapi_extra=batch_body(SubscriptionCreate),
+)
+async def create_subscriptions_batch(request: Request):
+    """Create many subscriptions atomically."""
+    items, error = await read_batch(request, subscription_create_batch, BATCH_MAX_ITEMS, BATCH_MAX_BYTES)
+    if error is not None:
+        return error
+    hashes = await password_hasher.hash_many([item.password for item in items])
+    applied, outcomes = await subscriptions.add_many([new_subscription(i, h) for i, h in zip(items, hashes)])
+    return batch_response(applied, outcomes, 201, lambda s: s.subscription_id)
+
+@app.patch(
+    "/subscriptions:batch",
+    response_model=BatchResult,
+    openapi_extra=batch_body(SubscriptionBatchUpdate),
+)
+async def update_subscriptions_batch(request: Request):
+    """Apply partial updates to many subscriptions atomically."""
+    items, error = await read_batch(request, subscription_update_batch, BATCH_MAX_ITEMS, BATCH_MAX_BYTES)
+    if error is not None:
+        return error
+    changes = [
+        (item.subscription_id, item.model_dump(exclude_unset=True, exclude={"subscription_id"}))
+        for item in items
+    ]
+    # Hash every new password in one gather, as the batch create does.
+    with_password = [c for _, c in changes if "password" in c]
+    hashes = await password_hasher.hash_many([c["password"] for c in with_password])
+    for c, hashed in zip(with_password, hashes):
+        c["password"] = hashed
+    applied, outcomes = await subscriptions.update_many(changes)
+    return batch_response(applied, outcomes, 200, lambda s: s.subscription_id)
+
+@app.delete(
+    "/subscriptions:batch",
+    response_model=BatchResult,
+    openapi_extra=batch_body(UUID),
+)
+async def delete_subscriptions_batch(request: Request):
+    """Delete many subscriptions atomically."""
+    keys, error = await read_batch(request, id_batch, BATCH_MAX_ITEMS, BATCH_MAX_BYTES)
+    if error is not None:
+        return error
+    applied, outcomes = await subscriptions.delete_many(keys)
+    return batch_response(applied, outcomes, 204, lambda s: s.subscription_id)
+
+@app.post(
+    "/subscriptions:batchGet",
+    response_model=BatchGetResult[SubscriptionRead],
+    openapi_extra=batch_body(UUID, BATCH_GET_MAX_ITEMS),
+)
+async def batch_get_subscriptions(request: Request):
+    """Fetch many subscriptions by ID in one store lookup; unknown IDs are listed as missing."""
+    keys, error = await read_batch(request, id_batch_get, BATCH_GET_MAX_ITEMS, BATCH_MAX_BYTES)
+    if error is not None:
+        return error
+    return batch_get_response(BatchGetResult[SubscriptionRead], keys, await subscriptions.get_many(keys))
+
+@app.get("/subscriptions/{subscription_id}", response_model=SubscriptionRead, responses=CONDITIONAL_GET_RESPONSES)
+async def get_subscription(
+    subscription_id: UUID = Path(..., description="Subscription to retrieve's ID"),
+    if_none_match: Optional[str] = Header(None),
+):
+    cached = await subscription_cache.get_or_load(
+        subscription_id, subscriptions.require, lambda s: rendered(s.subscription_id, s)
+    )
+    return cached_get(cached, if_none_match)
 
-@app.get("/subscriptions/{subscription_id}", response_model=SubscriptionRead)
-def get_subscription(subscription_id: UUID = Path(..., description="Subscription to retrieve's ID")):
-    raise HTTPException(status_code=501, detail="Not implemented")
+@app.put("/subscriptions/{subscription_id}", response_model=SubscriptionRead, responses=CONDITIONAL_PUT_RESPONSES)
+async def update_subscription(
+    subscription_id: UUID,
+    subscription: SubscriptionUpdate = Body(...),
+    if_match: Optional[str] = Header(None, description="Only update if the current ETag matches"),
+):
+    changes = await hash_password_change(subscription.model_dump(exclude_unset=True))
+    updated = await subscriptions.update(subscription_id, changes, if_match_precondition(if_match, "subscription_id"))
+    etag = entity_etag(updated.subscription_id, updated.updated_at)
+    return PydanticJSONResponse(updated, headers={"ETag": etag})
+
+@app.delete("/subscriptions/{subscription_id}", status_code=204)
+async def delete_subscription(subscription_id: UUID = Path(..., description="Subscription to delete's ID")):
+    await subscriptions.delete(subscription_id)
+
+# -----------------------------------------------------------------------------
+# Person / Address endpoints
+# -----------------------------------------------------------------------------
+
+# Person payloads embed addresses, but each distinct address is stored once
+# and shared; editing it through /addresses changes it for every resident.
+
+def set_fields(update) -> dict:
+    """Fields the client actually sent, as validated objects (nested models kept)."""
+    return {field: getattr(update, field) for field in update.model_fields_set}
+
+async def people_write(write, *args):
+    """Run a ``people`` write and return its result once the log has it, as
+    AsyncRepository does: off the event loop if it fsyncs inline."""
+    result = await anyio.to_thread.run_sync(write, *args) if people.blocking else write(*args)
+    if durability is not None:
+        await durability.synced()
+    return result
+
+@app.get("/persons", response_model=List[PersonRead])
+async def list_persons(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of persons to return"),
+    uni: Optional[str] = Query(None, description="Filter by exact UNI"),
+    email: Optional[Email] = Query(None, description="Filter by exact email (normalized like stored addresses)"),
+):
+    """List persons ordered by creation time, one page at a time."""
+    rows, next_key = people.page_persons({"uni": uni, "email": email}, after=decode_cursor(cursor), limit=limit)
+    return PydanticJSONResponse(rows, headers=page_headers(request, next_key))
+
+@app.post("/persons", response_model=PersonRead, status_code=201)
+async def create_person(person: PersonCreate):
+    """Create a person; embedded addresses identical to stored ones are linked, not copied."""
+    created = await people_write(people.add_person, person)
+    etag = entity_etag(created.id, created.updated_at)
+    return PydanticJSONResponse(created, status_code=201, headers={"ETag": etag})
+
+@app.get("/persons/{person_id}", response_model=PersonRead, responses=CONDITIONAL_GET_RESPONSES)
+async def get_person(
+    person_id: UUID = Path(..., description="Person ID"),
+    if_none_match: Optional[str] = Header(None),
+):
+    person = people.require_person(person_id)
+    etag = entity_etag(person.id, person.updated_at)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    return PydanticJSONResponse(person, headers={"ETag": etag})
+
+@app.put("/persons/{person_id}", response_model=PersonRead, responses=CONDITIONAL_PUT_RESPONSES)
+async def update_person(
+    person_id: UUID,
+    update: PersonUpdate,
+    if_match: Optional[str] = Header(None, description="Only update if the current ETag matches"),
+):
+    """Partially update a person; ``addresses``, if given, replaces the whole list."""
+    updated = await people_write(
+        people.update_person, person_id, set_fields(update), if_match_precondition(if_match, "id")
+    )
+    etag = entity_etag(updated.id, updated.updated_at)
+    return PydanticJSONResponse(updated, headers={"ETag": etag})
+
+@app.delete("/persons/{person_id}", status_code=204)
+async def delete_person(person_id: UUID):
+    await people_write(people.delete_person, person_id)
+
+@app.get("/addresses", response_model=List[AddressRead])
+async def list_addresses(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of addresses to return"),
+    city: Optional[str] = Query(None, description="Filter by exact city"),
+    postal_code: Optional[str] = Query(None, description="Filter by exact postal code"),
+    country: Optional[str] = Query(None, description="Filter by exact country"),
+):
+    """List stored addresses ordered by creation time, one page at a time."""
+    filters = {"city": city, "postal_code": postal_code, "country": country}
+    rows, next_key = people.page_addresses(filters, after=decode_cursor(cursor), limit=limit)
+    return PydanticJSONResponse(rows, headers=page_headers(request, next_key))
+
+@app.post(
+    "/addresses",
+    response_model=AddressRead,
+    status_code=201,
+    responses={200: {"model": AddressRead, "description": "An identical address already exists; it is returned."}},
+)
+async def create_address(address: AddressCreate):
+    """Store an address, or return the existing one with the same content."""
+    stored, created = await people_write(people.add_address, address)
+    etag = entity_etag(stored.id, stored.updated_at)
+    return PydanticJSONResponse(stored, status_code=201 if created else 200, headers={"ETag": etag})
+
+@app.get("/addresses/{address_id}", response_model=AddressRead, responses=CONDITIONAL_GET_RESPONSES)
+async def get_address(
+    address_id: UUID = Path(..., description="Address ID"),
+    if_none_match: Optional[str] = Header(None),
+):
+    address = people.require_address(address_id)
+    etag = entity_etag(address.id, address.updated_at)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    return PydanticJSONResponse(address, headers={"ETag": etag})
+
+@app.get("/addresses/{address_id}/persons", response_model=List[PersonRead])
+async def list_address_residents(address_id: UUID = Path(..., description="Address ID")):
+    """Everyone who lives at this address."""
+    return PydanticJSONResponse(people.residents(address_id))
+
+@app.put("/addresses/{address_id}", response_model=AddressRead, responses=CONDITIONAL_PUT_RESPONSES)
+async def update_address(
+    address_id: UUID,
+    update: AddressUpdate,
+    if_match: Optional[str] = Header(None, description="Only update if the current ETag matches"),
+):
+    """Partially update an address for every person linked to it."""
+    changes = update.model_dump(exclude_unset=True)
+    updated = await people_write(people.update_address, address_id, changes, if_match_precondition(if_match, "id"))
+    etag = entity_etag(updated.id, updated.updated_at)
+    return PydanticJSONResponse(updated, headers={"ETag": etag})
+
+@app.delete("/addresses/{address_id}", status_code=204, responses={409: {"description": "Address still in use"}})
+async def delete_address(address_id: UUID):
+    await people_write(people.delete_address, address_id)
+
+# -----------------------------------------------------------------------------
+# Search
+# -----------------------------------------------------------------------------
 
-@app.put("/subscriptions/{subscription_id}", response_model=SubscriptionRead)
-def update_subscription(subscription_id: UUID, subscription: SubscriptionUpdate = Body(...)):
-    raise HTTPException(status_code=501, detail="Not implemented")
+@app.get("/search", response_model=SearchResults)
+async def search_entities(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find; partial words and small typos match"),
+    type: Optional[Literal["user", "subscription"]] = Query(None, description="Only search this kind of entity"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of hits to return"),
+):
+    """Users by first/last name or email, subscriptions by member name or username, best first.
 
-@app.delete("/subscriptions/{subscription_id}")
-def delete_subscription(subscription_id: UUID = Path(..., description="Subscription to delete's ID")):
-    raise HTTPException(status_code=501, detail="Not implemented")
+    Runs within ``SEARCH_BUDGET_MS``; ``complete`` is false if it had to stop early.
+    """
+    # Off the event loop: a broad query may use its whole budget.
+    matches, complete = await anyio.to_thread.run_sync(search.search, q, [type] if type else None, limit)
+    hits = []
+    for match in matches:
+        item = await SEARCHABLE[match.kind].get(match.key)
+        if item is None:  # deleted through another worker
+            search.forget(match.kind, match.key)
+            continue
+        hits.append(SearchHit.model_construct(type=match.kind, score=match.score, item=item))
+    return PydanticJSONResponse(SearchResults.model_construct(query=q, complete=complete, hits=hits))
 
 # -----------------------------------------------------------------------------
 # Root
@@ -93,6 +654,7 @@ def root():
 # Entrypoint for `python main.py`
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
-    import uvicorn
+    from framework.server import serve
 
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
+    # WEB_CONCURRENCY workers (default: CPU count); RELOAD=1 for development.
+    serve("main:app", host="0.0.0.0", port=port)
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import math
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Set, Tuple
+
+from starlette.routing import BaseRoute, WebSocketRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Load-balancer probes and scrapes must keep working while the app sheds load.
+DEFAULT_EXEMPT_PATHS = ("/health", "/metrics")
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+async def _reject(send: Send, status: int, detail: str, retry_after: float) -> None:
+    body = ('{"detail":"%s"}' % detail).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _exempt(scope: Scope, prefixes: Iterable[str]) -> bool:
+    path = scope["path"]
+    return any(path == p or path.startswith(p + "/") for p in prefixes)
+
+
+class TokenBuckets:
+    """Token buckets keyed by an arbitrary hashable, refilled lazily on access.
+
+    Each bucket is a two-slot list ``[tokens, last_refill]`` in one dict, so
+    a check is a dict lookup and a little arithmetic. Buckets are only
+    touched from the event loop, which serialises access without a lock.
+    When ``max_keys`` is reached the least recently used bucket is dropped;
+    a dropped client simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        self._buckets: Dict[object, List[float]] = {}
+
+    def take(self, key: object, now: Optional[float] = None) -> float:
+        """Take one token for ``key``; return 0.0 on success, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.pop(key, None)  # re-inserted below: dict order doubles as LRU order
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                del self._buckets[next(iter(self._buckets))]
+            bucket = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        self._buckets[key] = bucket
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# (path regex, template, methods or None for any), in declaration order.
+_Candidate = Tuple[Pattern[str], str, Optional[Set[str]]]
+
+
+class RouteTemplates:
+    """Resolves a request to its route template (/users/{user_id}) without the router.
+
+    Built once from the app's routes. A path without parameters is a dict
+    lookup per method, pointing at the route the router would pick for it
+    (the first that matches, in declaration order); otherwise only the
+    routes with parameters are tried, in order, by their compiled regex.
+    """
+
+    def __init__(self, routes: Sequence[BaseRoute]):
+        ordered: List[_Candidate] = []
+        literal: List[_Candidate] = []
+        self._patterns: List[_Candidate] = []
+        for route in routes:
+            if isinstance(route, WebSocketRoute) or not hasattr(route, "path_regex"):
+                continue
+            candidate = (route.path_regex, route.path_format, getattr(route, "methods", None))
+            ordered.append(candidate)
+            if route.param_convertors or candidate[2] is None:
+                self._patterns.append(candidate)
+            else:
+                literal.append(candidate)
+        self._literal: Dict[Tuple[str, str], str] = {}
+        for _, path, methods in literal:
+            for method in methods:
+                self._literal.setdefault((method, path), self._scan(ordered, method, path) or path)
+
+    @staticmethod
+    def _scan(candidates: List[_Candidate], method: str, path: str) -> Optional[str]:
+        for regex, template, methods in candidates:
+            if (methods is None or method in methods) and regex.match(path):
+                return template
+        return None
+
+    def resolve(self, method: str, path: str) -> Optional[str]:
+        """The template of the route serving ``method path``, or None if none does."""
+        template = self._literal.get((method, path))
+        return template if template is not None else self._scan(self._patterns, method, path)
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware enforcing token-bucket limits per client and per client+route.
+
+    ``client_rate`` requests/second (with ``client_burst``) apply to each
+    client across the whole API; ``route_rate``/``route_burst`` apply to each
+    client on each route template, so one hot endpoint cannot eat a client's
+    whole budget. A rate of 0 disables that limit. Clients are identified by
+    peer address, or by the first ``X-Forwarded-For`` hop when
+    ``trust_forwarded`` is set (only behind a proxy that overwrites it).
+    Over-limit requests get 429 with ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        client_rate: float = 0.0,
+        client_burst: float = 0.0,
+        route_rate: float = 0.0,
+        route_burst: float = 0.0,
+        trust_forwarded: bool = False,
+        exempt_paths: Tuple[str, ...] = DEFAULT_EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.client_buckets = TokenBuckets(client_rate, client_burst or client_rate) if client_rate > 0 else None
+        self.route_buckets = TokenBuckets(route_rate, route_burst or route_rate) if route_rate > 0 else None
+        self.trust_forwarded = trust_forwarded
+        self.exempt_paths = exempt_paths
+        self._templates: Optional[RouteTemplates] = None
+
+    @classmethod
+    def options_from_env(cls) -> dict:
+        return {
+            "client_rate": _env_float("RATE_LIMIT_CLIENT_RPS", 0),
+            "client_burst": _env_float("RATE_LIMIT_CLIENT_BURST", 0),
+            "route_rate": _env_float("RATE_LIMIT_ROUTE_RPS", 0),
+            "route_burst": _env_float("RATE_LIMIT_ROUTE_BURST", 0),
+            "trust_forwarded": os.environ.get("RATE_LIMIT_TRUST_FORWARDED", "0") not in ("", "0"),
+        }
+
+    def _client(self, scope: Scope) -> str:
+        if self.trust_forwarded:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.split(b",", 1)[0].strip().decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _route(self, scope: Scope) -> str:
+        # Runs before the router, so resolve the route here to key buckets by
+        # template (/users/{user_id}) rather than raw path. Routes are all
+        # declared by the first request, so the table is built then.
+        path = scope["path"]
+        if "app" not in scope:
+            return path
+        if self._templates is None:
+            self._templates = RouteTemplates(scope["app"].routes)
+        root = scope.get("root_path", "")
+        if root and path.startswith(root):
+            path = path[len(root):]
+        return self._templates.resolve(scope["method"], path) or scope["path"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _exempt(scope, self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+        client = self._client(scope)
+        now = time.monotonic()
+        wait = 0.0
+        if self.client_buckets is not None:
+            wait = self.client_buckets.take(client, now)
+        if not wait and self.route_buckets is not None:
+            wait = self.route_buckets.take((client, scope["method"], self._route(scope)), now)
+        if wait:
+            await _reject(send, 429, "Rate limit exceeded", wait)
+            return
+        await self.app(scope, receive, send)
+
+
+def _request_start(scope: Scope) -> Optional[float]:
+    """Unix time from an ``X-Request-Start`` header set by the proxy, if present.
+
+    Accepts the common ``t=<value>`` form and a bare value, in seconds,
+    milliseconds or microseconds.
+    """
+    for name, value in scope["headers"]:
+        if name == b"x-request-start":
+            raw = value.decode("latin-1").strip()
+            if raw.startswith("t="):
+                raw = raw[2:]
+            try:
+                stamp = float(raw)
+            except ValueError:
+                return None
+            while stamp > 1e11:  # ms or us since the epoch
+                stamp /= 1000
+            return stamp
+    return None
+
+
+class ShedMetrics:
+    """Requests refused by :class:`LoadShedMiddleware`, by reason, for ``/metrics``.
+
+    Passed in by the app (the middleware itself is built by Starlette, out
+    of reach); plain ints, only changed on the event loop.
+    """
+
+    REASONS = ("in_flight", "queue_time")
+
+    def __init__(self) -> None:
+        self.shed: Dict[str, int] = dict.fromkeys(self.REASONS, 0)
+        self.in_flight = 0
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP http_requests_shed_total Requests refused with 503 before reaching a route, by reason.",
+            "# TYPE http_requests_shed_total counter",
+        ]
+        lines += [f'http_requests_shed_total{{reason="{reason}"}} {n}' for reason, n in self.shed.items()]
+        lines += [
+            "# HELP http_requests_in_flight Requests admitted and not yet answered.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class LoadShedMiddleware:
+    """Pure ASGI middleware that refuses work early instead of queueing it.
+
+    Returns 503 with ``Retry-After`` when ``max_in_flight`` requests are
+    already being served by this worker, or when the proxy's
+    ``X-Request-Start`` header shows the request already waited longer than
+    ``max_queue_seconds`` before reaching us (it would likely time out on
+    the client anyway). Either limit is disabled when 0. The in-flight and
+    shed counts live in ``metrics`` (see :class:`ShedMetrics`).
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_in_flight: int = 0,
+        max_queue_seconds: float = 0.0,
+        exempt_paths: Tuple[str, ...] = DEFAULT_EXEMPT_PATHS,
+        metrics: Optional[ShedMetrics] = None,
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.max_queue_seconds = max_queue_seconds
+        self.exempt_paths = exempt_paths
+        self.metrics = metrics if metrics is not None else ShedMetrics()
+
+    @classmethod
+    def options_from_env(cls) -> dict:
+        return {
+            "max_in_flight": int(os.environ.get("SHED_MAX_IN_FLIGHT", 1024)),
+            "max_queue_seconds": _env_float("SHED_MAX_QUEUE_MS", 0) / 1000,
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _exempt(scope, self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+        metrics = self.metrics
+        if self.max_in_flight and metrics.in_flight >= self.max_in_flight:
+            metrics.shed["in_flight"] += 1
+            await _reject(send, 503, "Server overloaded, too many requests in flight", 1)
+            return
+        if self.max_queue_seconds:
+            started = _request_start(scope)
+            if started is not None and time.time() - started > self.max_queue_seconds:
+                metrics.shed["queue_time"] += 1
+                await _reject(send, 503, "Server overloaded, request queued too long", 1)
+                return
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            metrics.in_flight -= 1
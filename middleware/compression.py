@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import os
+import re
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import anyio
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:  # optional: pip install zstandard
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+# text/event-stream must reach the client event by event, unbuffered.
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+class _Stream:
+    """Incremental compressor with a codec-independent interface.
+
+    ``write(data)`` returns whatever compressed bytes are ready and flushes
+    so the client can decode everything sent so far; ``finish()`` returns
+    the trailer.
+    """
+
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes], finish: Callable[[], bytes]):
+        self._compress = compress
+        self._flush = flush
+        self._finish = finish
+
+    def write(self, data: bytes) -> bytes:
+        return self._compress(data) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+    def whole(self, data: bytes) -> bytes:
+        return self._compress(data) + self._finish()
+
+
+def _gzip(level: int) -> _Stream:
+    c = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    return _Stream(c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush)
+
+
+def _brotli(level: int) -> _Stream:
+    c = brotli.Compressor(quality=level)
+    return _Stream(c.process, c.flush, c.finish)
+
+
+def _zstd(level: int) -> _Stream:
+    c = zstandard.ZstdCompressor(level=level).compressobj()
+    return _Stream(c.compress, lambda: c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), c.flush)
+
+
+# Server preference order, with (per-response, precompressed) levels: cheap
+# levels for bodies compressed on every request, maximum ones for payloads
+# compressed once.
+ENCODINGS: Dict[str, Tuple[Callable[[int], _Stream], int, int]] = {"gzip": (_gzip, 6, 9)}
+if zstandard is not None:
+    ENCODINGS = {"zstd": (_zstd, 3, 19), **ENCODINGS}
+if brotli is not None:
+    ENCODINGS = {"br": (_brotli, 4, 11), **ENCODINGS}
+
+
+# A compressed body is a different representation from the uncompressed one,
+# so it carries its own ETag: the app's tag with "-<coding>" inside the quotes.
+_ENCODED_ETAG = re.compile(b'-(?:' + b"|".join(re.escape(c.encode()) for c in ENCODINGS) + b')"')
+_CONDITIONAL_HEADERS = (b"if-match", b"if-none-match")
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """ETag for the ``coding``-compressed form of a body tagged ``etag``."""
+    return f'{etag[:-1]}-{coding}"' if etag.endswith('"') else etag
+
+
+def _decode_conditions(scope: Scope) -> Scope:
+    """Map encoded ETags in ``If-Match``/``If-None-Match`` back to the app's own
+    tags, so its precondition checks hold whichever coding the client got."""
+    headers = [
+        (name, _ENCODED_ETAG.sub(b'"', value)) if name in _CONDITIONAL_HEADERS else (name, value)
+        for name, value in scope["headers"]
+    ]
+    return scope if headers == scope["headers"] else {**scope, "headers": headers}
+
+
+def negotiate(accept_encoding: Optional[str], available: Tuple[str, ...]) -> Optional[str]:
+    """Pick the content coding for an ``Accept-Encoding`` header (RFC 9110 12.5.3).
+
+    Among codings the client accepts with the highest q-value, the earliest
+    in ``available`` wins. ``None`` means send the body as is.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(EXCLUDED_TYPES)
+    )
+
+
+def _vary_on_encoding(send: Send) -> Send:
+    """Wrap ``send`` so uncompressed but compressible responses still carry
+    ``Vary: Accept-Encoding``; shared caches must not hand them to clients
+    that asked for a compressed copy."""
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start" and _compressible(Headers(raw=message["headers"])):
+            MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+        await send(message)
+    return wrapped
+
+
+class Precompressed:
+    """Fixed payloads compressed once, at maximum level, in every available coding.
+
+    Served directly by :class:`PrecompressedMiddleware` for exact path
+    matches, so neither the body nor its compressed forms are rebuilt per
+    request. Payloads registered with :meth:`add_lazy` are built on their
+    first request, in a worker thread, rather than at startup.
+    """
+
+    def __init__(self):
+        self._payloads: Dict[str, Tuple[bytes, Dict[str, bytes]]] = {}
+        self._factories: Dict[str, Tuple[Callable[[], bytes], str]] = {}
+        self._lock: Optional[anyio.Lock] = None
+
+    def add(self, path: str, body: bytes, media_type: str) -> None:
+        encoded = {name: make(level).whole(body) for name, (make, _, level) in ENCODINGS.items()}
+        self._payloads[path] = (media_type.encode("latin-1"), {"identity": body, **encoded})
+
+    def add_lazy(self, path: str, build: Callable[[], bytes], media_type: str) -> None:
+        self._factories[path] = (build, media_type)
+
+    async def get(self, path: str) -> Optional[Tuple[bytes, Dict[str, bytes]]]:
+        payload = self._payloads.get(path)
+        if payload is not None or path not in self._factories:
+            return payload
+        if self._lock is None:
+            self._lock = anyio.Lock()
+        async with self._lock:  # concurrent first requests build it once
+            if path not in self._payloads:
+                build, media_type = self._factories[path]
+                await anyio.to_thread.run_sync(lambda: self.add(path, build(), media_type))
+        return self._payloads[path]
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._payloads or path in self._factories
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses with gzip, brotli or zstd.
+
+    The coding is negotiated from ``Accept-Encoding`` (brotli and zstd only
+    when their optional packages are installed). Bodies under
+    ``minimum_size`` bytes go out as is; streamed responses are buffered
+    only until they reach ``minimum_size`` and are then compressed chunk by
+    chunk, flushing after each so clients can decode NDJSON line by line.
+    Bodies over ``offload_size`` are compressed in a worker thread (all
+    three codecs release the GIL) so large pages do not stall the event loop.
+    A compressed body's ``ETag`` gets a coding suffix (see :func:`encoded_etag`).
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, offload_size: int = 256 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.available = tuple(ENCODINGS)
+
+    @classmethod
+    def options_from_env(cls) -> dict:
+        return {
+            "minimum_size": int(os.environ.get("COMPRESSION_MIN_BYTES", 1024)),
+            "offload_size": int(os.environ.get("COMPRESSION_OFFLOAD_BYTES", 256 * 1024)),
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        coding = negotiate(request_headers.get("accept-encoding"), self.available)
+        scope = _decode_conditions(scope)
+        if coding is None:
+            await self.app(scope, receive, _vary_on_encoding(send))
+            return
+        # A 304 answers with the tag the client holds, encoded or not.
+        encoded_match = f'-{coding}"' in request_headers.get("if-none-match", "")
+        await _Responder(self, coding, encoded_match)(scope, receive, send)
+
+    async def compress(self, stream: _Stream, data: bytes, final: bool) -> bytes:
+        fn = stream.whole if final else stream.write
+        if len(data) >= self.offload_size:
+            return await anyio.to_thread.run_sync(fn, data)
+        return fn(data)
+
+
+class PrecompressedMiddleware:
+    """Pure ASGI middleware answering GET/HEAD for :class:`Precompressed` paths.
+
+    Installed inside the admission middlewares, so these responses are rate
+    limited and shed like any other; :class:`CompressionMiddleware` further
+    out passes them through, since they already carry ``Content-Encoding``
+    (or are the identity form it would send as is).
+    """
+
+    def __init__(self, app: ASGIApp, payloads: Precompressed):
+        self.app = app
+        self.payloads = payloads
+        self.available = tuple(ENCODINGS)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope["path"] not in self.payloads:
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding"), self.available)
+        media_type, bodies = await self.payloads.get(scope["path"])
+        body = bodies[coding or "identity"]
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"content-type", media_type),
+            (b"content-length", str(len(body)).encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if coding is not None:
+            headers.append((b"content-encoding", coding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+
+class _Responder:
+    """Per-request state: holds back ``http.response.start`` until the body
+    shows whether compressing is worthwhile."""
+
+    def __init__(self, middleware: CompressionMiddleware, coding: str, encoded_match: bool = False):
+        self.middleware = middleware
+        self.coding = coding
+        self.encoded_match = encoded_match
+        self.start: Optional[Message] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.stream: Optional[_Stream] = None
+        self.passthrough = False
+        self.started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.middleware.app(scope, receive, self.on_send)
+
+    async def on_send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start = message
+            self.passthrough = message["status"] in (204, 304) or not _compressible(headers)
+            if message["status"] == 304 and self.encoded_match and "etag" in headers:
+                MutableHeaders(raw=message["headers"])["ETag"] = encoded_etag(headers["etag"], self.coding)
+            if self.passthrough:
+                await self.send(message)
+            return
+        if self.passthrough:
+            await self.send(message)
+            return
+        if kind != "http.response.body":  # e.g. http.response.pathsend: leave it alone
+            if not self.started:
+                await self._send_start(compressed=False)
+                if self.buffer:
+                    await self.send({"type": "http.response.body", "body": b"".join(self.buffer), "more_body": True})
+                    self.buffer = []
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is not None:
+            data = await self.middleware.compress(self.stream, body, final=False) if body else b""
+            if not more_body:
+                data += self.stream.finish()
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if more_body and self.buffered < self.middleware.minimum_size:
+            return
+        data = b"".join(self.buffer)
+        self.buffer = []
+        if self.buffered < self.middleware.minimum_size:
+            await self._send_start(compressed=False)
+            await self.send({"type": "http.response.body", "body": data})
+            return
+        make, level, _ = ENCODINGS[self.coding]
+        self.stream = make(level)
+        if not more_body:
+            data = await self.middleware.compress(self.stream, data, final=True)
+            await self._send_start(compressed=True, length=len(data))
+            await self.send({"type": "http.response.body", "body": data})
+            return
+        data = await self.middleware.compress(self.stream, data, final=False)
+        await self._send_start(compressed=True)
+        await self.send({"type": "http.response.body", "body": data, "more_body": True})
+
+    async def _send_start(self, compressed: bool, length: Optional[int] = None) -> None:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if compressed:
+            headers["Content-Encoding"] = self.coding
+            if "etag" in headers:
+                headers["ETag"] = encoded_etag(headers["etag"], self.coding)
+            if length is None:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(length)
+        self.started = True
+        await self.send(self.start)
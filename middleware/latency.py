@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, Dict
+
+
+class LatencyWindow:
+    """Sliding window of the most recent request durations.
+
+    Recording is an O(1) deque append; percentiles are only computed when
+    asked for, so the cost lands on the (rare) reader, not on every request.
+    """
+
+    def __init__(self, size: int = 2048):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentiles(self, *quantiles: float) -> Dict[str, float]:
+        """Return ``{"p50": ms, ...}`` over the current window (nearest-rank)."""
+        samples = sorted(self._samples)
+        if not samples:
+            return {}
+        result = {"count": float(len(samples))}
+        for q in quantiles:
+            rank = max(1, math.ceil(q * len(samples)))
+            result[f"p{q * 100:g}"] = round(samples[rank - 1] * 1000, 3)
+        return result
+
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "[REDACTED]"
+DEFAULT_REDACT = ("password", "token", "secret")
+# Request headers that change what the app does; everything else (cookies,
+# authorization, user agents) stays out of the log.
+RECORDED_HEADERS = frozenset({"content-type", "accept", "accept-encoding", "if-match", "if-none-match"})
+
+
+def redact(value: Any, fields: FrozenSet[str]) -> Any:
+    """``value`` with every object member whose name contains one of ``fields`` replaced by ``[REDACTED]``."""
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if any(f in k.lower() for f in fields) else redact(v, fields)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(v, fields) for v in value]
+    return value
+
+
+class RequestLog:
+    """Append-only JSONL file of captured requests, written by a background thread.
+
+    :meth:`write` only appends the entry to an in-memory buffer, so the
+    request path never touches the disk or serializes JSON. A daemon thread
+    wakes every ``flush_interval`` seconds (or once ``batch`` entries are
+    waiting), encodes the buffer and appends it with one ``write``. When the
+    file would grow past ``max_bytes`` it is rotated like
+    ``logging.handlers.RotatingFileHandler``: ``path`` becomes ``path.1``,
+    ``path.1`` becomes ``path.2``, and so on up to ``backups`` files.
+
+    If the writer falls behind and ``max_buffer`` entries are waiting, new
+    entries are dropped and counted in ``dropped`` rather than growing
+    memory without bound.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 2**20,
+        backups: int = 5,
+        flush_interval: float = 1.0,
+        batch: int = 1000,
+        max_buffer: int = 50_000,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.batch = batch
+        self.max_buffer = max_buffer
+        self.written = 0
+        self.dropped = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestLog"]:
+        """The log at ``REQUEST_LOG_PATH``, or None (the default) when recording is off."""
+        path = os.environ.get("REQUEST_LOG_PATH", "")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_bytes=int(float(os.environ.get("REQUEST_LOG_MAX_MB", 64)) * 2**20),
+            backups=int(os.environ.get("REQUEST_LOG_BACKUPS", 5)),
+            flush_interval=float(os.environ.get("REQUEST_LOG_FLUSH_MS", 1000)) / 1000,
+        )
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        with self._cond:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append(entry)
+            if len(self._buffer) >= self.batch:
+                self._cond.notify()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Flush what is buffered and stop the writer."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._buffer) < self.batch:
+                    self._cond.wait(self.flush_interval)
+                entries, self._buffer = self._buffer, []
+                stopping = self._stopping
+            if entries:
+                try:
+                    self._append(entries)
+                except (OSError, TypeError, ValueError):
+                    logger.exception("Could not write %d recorded requests to %s", len(entries), self.path)
+            if stopping:
+                return
+
+    def _append(self, entries: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries).encode()
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self.written += len(entries)
+
+    def _rotate(self) -> None:
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+class RecordingMiddleware:
+    """Pure ASGI middleware that samples requests into a :class:`RequestLog`.
+
+    A sampled request (probability ``sample_rate``) is logged after its
+    response completes as one JSON object:
+    ``ts`` (wall clock at arrival), ``method``, ``path``, ``query``, the
+    request headers in ``RECORDED_HEADERS``, ``body``, ``status`` and
+    ``duration_ms``. A JSON body is logged parsed, with every member whose
+    name contains one of ``redact_fields`` replaced by ``[REDACTED]``. Any
+    other body, or one over ``max_body_bytes``, is left out and flagged
+    ``body_omitted``. The request body is passed through to the app
+    unchanged as it streams in.
+
+    Unsampled requests cost one ``random()`` call. ``benchmarks/replay.py``
+    plays the log back.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        log: Optional[RequestLog],
+        sample_rate: float = 0.01,
+        max_body_bytes: int = 64 * 1024,
+        redact_fields: Iterable[str] = DEFAULT_REDACT,
+    ):
+        self.app = app
+        self.log = log
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        self.redact_fields = frozenset(f.lower() for f in redact_fields)
+
+    @classmethod
+    def options_from_env(cls) -> dict:
+        return {
+            "sample_rate": float(os.environ.get("REQUEST_LOG_SAMPLE_RATE", 0.01)),
+            "max_body_bytes": int(os.environ.get("REQUEST_LOG_MAX_BODY_BYTES", 64 * 1024)),
+            "redact_fields": [
+                f.strip() for f in os.environ.get("REQUEST_LOG_REDACT", ",".join(DEFAULT_REDACT)).split(",") if f.strip()
+            ],
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.log is None or scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.time()
+        chunks: List[bytes] = []
+        size = 0
+        status = 500
+
+        async def receive_wrapper() -> Message:
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request" and size <= self.max_body_bytes:
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= self.max_body_bytes:
+                    chunks.append(body)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            entry = {
+                "ts": round(arrived, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "headers": {
+                    name.decode("latin-1"): value.decode("latin-1")
+                    for name, value in scope["headers"] if name.decode("latin-1") in RECORDED_HEADERS
+                },
+                "status": status,
+                "duration_ms": round(duration * 1000, 3),
+            }
+            self._add_body(entry, chunks, size)
+            self.log.write(entry)
+
+    def _add_body(self, entry: Dict[str, Any], chunks: List[bytes], size: int) -> None:
+        if not size:
+            return
+        if size > self.max_body_bytes:
+            entry["body_omitted"] = True
+            return
+        try:
+            entry["body"] = redact(json.loads(b"".join(chunks)), self.redact_fields)
+        except ValueError:
+            entry["body_omitted"] = True
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from framework.routing import RequestTimings, current_timings
+from middleware.latency import LatencyWindow
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in the style of HdrHistogram.
+
+    Every power-of-two octave between ``2**min_exp`` and ``2**max_exp``
+    seconds is split into ``sub_buckets`` equal-width buckets, so the
+    relative error stays bounded (25% with four sub-buckets) across six
+    orders of magnitude. Recording is one ``frexp`` and a list increment.
+    """
+
+    def __init__(self, sub_buckets: int = 4, min_exp: int = -17, max_exp: int = 6):
+        self.sub_buckets = sub_buckets
+        self.min_exp = min_exp
+        self.bounds: List[float] = [
+            2.0 ** e * (1 + i / sub_buckets) for e in range(min_exp, max_exp) for i in range(1, sub_buckets + 1)
+        ]
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def _index(self, seconds: float) -> int:
+        if seconds <= 0:
+            return 0
+        mantissa, exponent = math.frexp(seconds)  # seconds = mantissa * 2**exponent, mantissa in [0.5, 1)
+        octave = exponent - 1 - self.min_exp
+        sub = math.ceil((2 * mantissa - 1) * self.sub_buckets)
+        return min(max(octave * self.sub_buckets + sub - 1, 0), len(self.bounds))
+
+    def record(self, seconds: float) -> None:
+        self.counts[self._index(seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RouteMetrics:
+    """Per-route request counters and per-phase latency histograms.
+
+    Only touched from the event loop thread, so no locking. Routes are
+    labelled by their path template (``/users/{id}``), which keeps the
+    number of series bounded however many ids clients ask for.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self.requests: Counter = Counter()
+
+    def observe(self, method: str, route: str, status: int, total: float, phases: Dict[str, float]) -> None:
+        self.requests[(method, route, status)] += 1
+        for phase, seconds in (("total", total), *phases.items()):
+            key = (method, route, phase)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP http_requests_total HTTP requests by route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), n in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {n}')
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by route template and phase"
+            " (total, validation, handler, serialization).",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, phase), h in sorted(self.histograms.items()):
+            labels = f'method="{method}",route="{_label(route)}",phase="{phase}"'
+            cumulative = 0
+            for bound, n in zip(h.bounds, h.counts):
+                cumulative += n
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound:.9g}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {h.sum:.9g}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------------------------------
+# Sampling profiler
+# -----------------------------------------------------------------------------
+
+# Leaf frames in these modules mean the thread is parked, not working.
+_IDLE_MODULES = frozenset({"selectors", "threading", "queue"})
+
+
+def _folded(frame) -> Optional[str]:
+    names: List[str] = []
+    leaf = frame.f_globals.get("__name__")
+    if leaf in _IDLE_MODULES:
+        return None
+    while frame is not None:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class SamplingProfiler:
+    """Samples the stacks of selected threads from a background thread.
+
+    Stacks are returned in Brendan Gregg's folded format (``a;b;c count``),
+    which ``flamegraph.pl`` and speedscope read directly. Sampling is
+    wall-clock and process-wide, so concurrent requests on the same event
+    loop show up too; profile on a quiet instance.
+    """
+
+    def __init__(self, interval: float, include: Callable[[threading.Thread], bool]):
+        self.interval = interval
+        self.include = include
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread in threading.enumerate():
+                frame = frames.get(thread.ident)
+                if frame is None or thread is self._thread or not self.include(thread):
+                    continue
+                stack = _folded(frame)
+                if stack is not None:
+                    self.samples[f"{thread.name};{stack}"] += 1
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> bytes:
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common()).encode()
+
+
+# -----------------------------------------------------------------------------
+# Middleware
+# -----------------------------------------------------------------------------
+
+def _wants_profile(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value not in (b"", b"0")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", ["0"])[-1] not in ("", "0")
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware feeding :class:`RouteMetrics` (and optionally a
+    :class:`LatencyWindow`) with every HTTP request's timings.
+
+    Phase timings come from :class:`framework.routing.TimedRoute`; requests
+    that never reach an API route (404s, the docs pages) record only their
+    total time.
+
+    With ``profiling=True`` a request carrying ``?profile=1`` or an
+    ``X-Profile: 1`` header is run under :class:`SamplingProfiler` and
+    answered with its folded stacks instead of the normal body; the original
+    status is returned in ``X-Profiled-Status``. Leave profiling off in
+    production: it is a cheap way for any client to slow the process down.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        metrics: RouteMetrics,
+        window: Optional[LatencyWindow] = None,
+        profiling: bool = False,
+        profile_interval: float = 0.001,
+    ):
+        self.app = app
+        self.metrics = metrics
+        self.window = window
+        self.profiling = profiling
+        self.profile_interval = profile_interval
+        self._route_names: Optional[Dict[Callable, str]] = None
+
+    @classmethod
+    def options_from_env(cls) -> dict:
+        return {
+            "profiling": os.environ.get("PROFILING_ENABLED", "0") not in ("", "0"),
+            "profile_interval": float(os.environ.get("PROFILE_INTERVAL_MS", 1)) / 1000,
+        }
+
+    def _route_of(self, scope: Scope, timings: RequestTimings) -> str:
+        if timings.route is not None:
+            return timings.route
+        # Plain Starlette routes (openapi.json, /docs) are not TimedRoutes;
+        # name them by the endpoint the router matched.
+        if self._route_names is None and "app" in scope:
+            self._route_names = {
+                getattr(r, "endpoint", None): getattr(r, "path_format", None) for r in scope["app"].routes
+            }
+        return (self._route_names or {}).get(scope.get("endpoint")) or UNMATCHED_ROUTE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.profiling and _wants_profile(scope):
+            await self._profiled(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            total = time.perf_counter() - started
+            current_timings.reset(token)
+            self.metrics.observe(scope["method"], self._route_of(scope, timings), status, total, timings.phases())
+            if self.window is not None:
+                self.window.record(total)
+
+    async def _profiled(self, scope: Scope, receive: Receive, send: Send) -> None:
+        loop_thread = threading.get_ident()
+        status = 500
+
+        async def swallow(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        def include(thread: threading.Thread) -> bool:
+            # The event loop plus the threadpool that runs sync endpoints
+            # and blocking storage calls.
+            return thread.ident == loop_thread or thread.name.startswith("AnyIO worker")
+
+        started = time.perf_counter()
+        with SamplingProfiler(self.profile_interval, include) as profiler:
+            await self.app(scope, receive, swallow)
+        elapsed = time.perf_counter() - started
+        body = profiler.folded()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(status).encode()),
+                (b"x-profile-seconds", f"{elapsed:.6f}".encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -5,6 +5,8 @@ from uuid import UUID, uuid4
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+from .validation import not_null
+
 
 class AddressBase(BaseModel):
     id: UUID = Field(
@@ -90,6 +92,8 @@ class AddressUpdate(BaseModel):
         None, description="Country name or ISO label.", json_schema_extra={"example": "USA"}
     )
 
+    _required = not_null("street", "city", "country")
+
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Generic, List, Optional, TypeVar
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+EntityT = TypeVar("EntityT", bound=BaseModel)
+
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request array.")
+    status: int = Field(
+        ...,
+        description="Per-item HTTP-style status. 424 marks items that were valid "
+                    "but rolled back because another item in the batch failed.",
+        json_schema_extra={"example": 201},
+    )
+    id: Optional[UUID] = Field(
+        None,
+        description="ID of the affected entity, when known.",
+        json_schema_extra={"example": "00000000-0000-8999-5999-000000000000"},
+    )
+    error: Optional[str] = Field(None, description="Why the item failed.")
+
+
+class BatchResult(BaseModel):
+    applied: bool = Field(..., description="True if every item was applied; batches are all-or-nothing.")
+    results: List[BatchItemResult] = Field(default_factory=list)
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "applied": True,
+                    "results": [
+                        {"index": 0, "status": 201, "id": "00000000-0000-8999-5999-000000000000", "error": None}
+                    ],
+                }
+            ]
+        }
+    }
+
+
+class BatchGetResult(BaseModel, Generic[EntityT]):
+    found: List[EntityT] = Field(
+        default_factory=list, description="Entities that exist, in the order their IDs were requested."
+    )
+    missing: List[UUID] = Field(
+        default_factory=list,
+        description="Requested IDs with no entity, in request order.",
+        json_schema_extra={"example": ["00000000-0000-8999-5999-000000000000"]},
+    )
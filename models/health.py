@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 
 class Health(BaseModel):
     status: int = Field(description="Numeric status code (e.g., 200 for OK)")
@@ -8,6 +8,10 @@ class Health(BaseModel):
     ip_address: str = Field(description="IP address of the responding service")
     echo: str | None = Field(default=None, description="Optional echo (query param)")
     path_echo: str | None = Field(default=None, description="Echo from path param (/health/{path_echo})")
+    stores: Dict[str, int] | None = Field(default=None, description="Row count per store (deep checks only)")
+    latency_ms: Dict[str, float] | None = Field(
+        default=None, description="Recent request latency percentiles in ms (deep checks only)"
+    )
 
     # Pydantic v2 style
     model_config = {
@@ -18,7 +22,9 @@ class Health(BaseModel):
                 "timestamp": "2025-09-02T12:34:56Z",
                 "ip_address": "192.168.1.10",
                 "echo": "Hello from query",
-                "path_echo": "Hello from path"
+                "path_echo": "Hello from path",
+                "stores": {"users": 120, "subscriptions": 340},
+                "latency_ms": {"count": 2048, "p50": 0.41, "p95": 1.8, "p99": 4.2}
             }
         }
     }
\ No newline at end of file
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from typing import List, Literal, Union
+
+from pydantic import BaseModel, Field
+
+from .subscription import SubscriptionRead
+from .user import UserRead
+
+
+class SearchHit(BaseModel):
+    type: Literal["user", "subscription"] = Field(..., description="Kind of entity matched.")
+    score: float = Field(
+        ...,
+        description="Relevance: 1.0 when every query word exactly matches a top-weighted field; "
+                    "prefix and fuzzy (typo-tolerant) matches score lower.",
+        json_schema_extra={"example": 0.95},
+    )
+    item: Union[UserRead, SubscriptionRead] = Field(..., description="The matched entity.")
+
+
+class SearchResults(BaseModel):
+    query: str = Field(..., json_schema_extra={"example": "alli cam"})
+    complete: bool = Field(
+        ...,
+        description="False if the search ran out of its latency budget (or the index was still "
+                    "being built) and the hits are the best found so far.",
+    )
+    hits: List[SearchHit] = Field(default_factory=list)
@@ -5,6 +5,8 @@ from uuid import UUID, uuid4
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+from .validation import not_null
+
 
 class SubscriptionBase(BaseModel):
     subscription_id: str = Field(
@@ -90,6 +92,8 @@ class SubscriptionUpdate(BaseModel):
         None, description="Member gender.", json_schema_extra={"example": "M"}
     )
 
+    _required = not_null("service", "member_name", "username", "password")
+
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -108,6 +112,11 @@ class SubscriptionUpdate(BaseModel):
 
 class SubscriptionRead(SubscriptionBase):
     """Server representation returned to clients."""
+    password: str = Field(
+        ...,
+        exclude=True,
+        description="scrypt hash of the member password; stored, never serialized.",
+    )
     subscription_id: UUID = Field(
         default_factory=uuid4,
         description="Server-generated Subscription ID.",
@@ -132,7 +141,6 @@ class SubscriptionRead(SubscriptionBase):
                     "service": "Hulu",
                     "member_name": "Allison Cameron",
                     "username": "allisonxcameron",
-                    "password": "password9",
                     "gender": "F",
                     "created_at": "2025-01-15T10:20:30Z",
                     "updated_at": "2025-01-16T12:00:00Z",
@@ -141,3 +149,20 @@ class SubscriptionRead(SubscriptionBase):
         }
     }
 
+
+
+class SubscriptionBatchUpdate(SubscriptionUpdate):
+    """One entry of a batch update; identifies the subscription in the body."""
+    subscription_id: UUID = Field(
+        ...,
+        description="ID of the subscription to update.",
+        json_schema_extra={"example": "00000000-0000-8999-5999-000000000000"},
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {"subscription_id": "00000000-0000-8999-5999-000000000000", "service": "Spotify"},
+            ]
+        }
+    }
@@ -1,14 +1,11 @@
 from __future__ import annotations
 
-from typing import Optional, List, Annotated
+from typing import Optional
 from uuid import UUID, uuid4
 from datetime import date, datetime
-from pydantic import BaseModel, Field, EmailStr, StringConstraints
+from pydantic import BaseModel, Field
 
-from .address import AddressBase
-
-# Columbia UNI: 2–3 lowercase letters + 1–4 digits (e.g., abc1234)
-UNIType = Annotated[str, StringConstraints(pattern=r"^[a-z]{2,3}\d{1,4}$")]
+from .validation import Email, not_null
 
 
 class UserBase(BaseModel):
@@ -27,7 +24,7 @@ class UserBase(BaseModel):
         description="Family name.",
         json_schema_extra={"example": "Cameron"},
     )
-    email: EmailStr = Field(
+    email: Email = Field(
         ...,
         description="Primary email address.",
         json_schema_extra={"example": "acameron@example.com"},
@@ -95,12 +92,13 @@ class UserUpdate(BaseModel):
     """Partial update for a Person; supply only fields to change."""
     first_name: Optional[str] = Field(None, json_schema_extra={"example": "Gregory"})
     last_name: Optional[str] = Field(None, json_schema_extra={"example": "House"})
-    email: Optional[EmailStr] = Field(None, json_schema_extra={"example": "ghouse@princetonplainsborough.com"})
+    email: Optional[Email] = Field(None, json_schema_extra={"example": "ghouse@princetonplainsborough.com"})
     username: Optional[str] = Field(None, json_schema_extra={"example": "house"})
     password: Optional[str] = Field(None, json_schema_extra={"example": "monsterTRUCKS!!"})
     birth_date: Optional[date] = Field(None, json_schema_extra={"example": "1815-12-10"})
     gender: Optional[str] = Field(None, json_schema_extra={"example": "M"})
-    
+
+    _required = not_null("first_name", "last_name", "email", "username", "password")
 
     model_config = {
         "json_schema_extra": {
@@ -114,6 +112,11 @@ class UserUpdate(BaseModel):
 
 class UserRead(UserBase):
     """Server representation returned to clients."""
+    password: str = Field(
+        ...,
+        exclude=True,
+        description="scrypt hash of the user's password; stored, never serialized.",
+    )
     id: UUID = Field(
         default_factory=uuid4,
         description="Server-generated User ID.",
@@ -138,7 +141,6 @@ class UserRead(UserBase):
                     "service": "Hulu",
                     "member_name": "Allison Cameron",
                     "username": "allisonxcameron",
-                    "password": "password9",
                     "gender": "F",
                     "created_at": "2025-01-15T10:20:30Z",
                     "updated_at": "2025-01-16T12:00:00Z",
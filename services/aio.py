@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import functools
+import os
+from datetime import datetime
+from typing import (
+    TYPE_CHECKING, Any, Callable, Dict, Generic, Hashable, List, Mapping, Optional, Sequence, Tuple, TypeVar,
+)
+
+import anyio
+from anyio import CapacityLimiter
+
+from services.pagination import SortKey
+from services.repository import BatchOutcome, ModelT, Precondition, Repository
+
+if TYPE_CHECKING:
+    from services.durability import DurableStore
+
+T = TypeVar("T")
+
+# Storage calls get their own thread budget so a slow disk cannot starve the
+# default threadpool that FastAPI uses for sync endpoints and file I/O.
+STORAGE_THREADS = int(os.environ.get("STORAGE_THREADS", 16))
+
+_limiter: Optional[CapacityLimiter] = None
+
+
+def storage_limiter() -> CapacityLimiter:
+    # Created lazily: a CapacityLimiter binds to the running event loop.
+    global _limiter
+    if _limiter is None:
+        _limiter = CapacityLimiter(STORAGE_THREADS)
+    return _limiter
+
+
+class AsyncRepository(Generic[ModelT]):
+    """Awaitable facade over a :class:`~services.repository.Repository`.
+
+    Non-blocking backends (the in-memory store) are called inline on the
+    event loop, so an ``async def`` handler serves a request without any
+    thread hop. Blocking backends (SQLite) are run on a bounded pool of
+    worker threads. The wrapped repository stays reachable as ``sync`` for
+    code that already runs in a thread, such as streaming exports.
+
+    With a ``durable`` store (see ``services.durability``) writes return
+    only once the write-ahead log has them on disk, as its fsync policy
+    defines; the wait is a future, not a thread.
+    """
+
+    def __init__(self, repo: Repository[ModelT], durable: Optional["DurableStore"] = None):
+        self.sync = repo
+        self.durable = durable
+
+    @property
+    def entity(self) -> str:
+        return self.sync.entity
+
+    async def _call(self, fn: Callable[..., T], *args: Any) -> T:
+        if not self.sync.blocking:
+            return fn(*args)
+        return await anyio.to_thread.run_sync(functools.partial(fn, *args), limiter=storage_limiter())
+
+    async def _write(self, fn: Callable[..., T], *args: Any) -> T:
+        result = await self._call(fn, *args)
+        if self.durable is not None:
+            await self.durable.synced()
+        return result
+
+    # -- reads ---------------------------------------------------------------
+
+    async def count(self) -> int:
+        return await self._call(len, self.sync)
+
+    async def get(self, key) -> Optional[ModelT]:
+        return await self._call(self.sync.get, key)
+
+    async def version(self, key) -> Optional[datetime]:
+        return await self._call(self.sync.version, key)
+
+    async def get_many(self, keys: Sequence[Any]) -> List[Optional[ModelT]]:
+        return await self._call(self.sync.get_many, keys)
+
+    async def require(self, key) -> ModelT:
+        return await self._call(self.sync.require, key)
+
+    async def get_by(self, field: str, value: Hashable) -> Optional[ModelT]:
+        return await self._call(self.sync.get_by, field, value)
+
+    async def find_by(self, field: str, value: Hashable) -> List[ModelT]:
+        return await self._call(self.sync.find_by, field, value)
+
+    async def page(
+        self,
+        filters: Mapping[str, Hashable],
+        after: Optional[SortKey] = None,
+        limit: int = 50,
+    ) -> Tuple[List[ModelT], Optional[SortKey]]:
+        return await self._call(self.sync.page, filters, after, limit)
+
+    # -- writes --------------------------------------------------------------
+
+    async def add(self, item: ModelT) -> ModelT:
+        return await self._write(self.sync.add, item)
+
+    async def update(self, key, changes: Dict[str, Any], precondition: Optional[Precondition] = None) -> ModelT:
+        return await self._write(self.sync.update, key, changes, precondition)
+
+    async def delete(self, key) -> ModelT:
+        return await self._write(self.sync.delete, key)
+
+    async def add_many(self, items: Sequence[ModelT]) -> Tuple[bool, List[BatchOutcome]]:
+        return await self._write(self.sync.add_many, items)
+
+    async def update_many(self, changes: Sequence[Tuple[Any, Dict[str, Any]]]) -> Tuple[bool, List[BatchOutcome]]:
+        return await self._write(self.sync.update_many, changes)
+
+    async def delete_many(self, keys: Sequence[Any]) -> Tuple[bool, List[BatchOutcome]]:
+        return await self._write(self.sync.delete_many, keys)
+
+    def close(self) -> None:
+        self.sync.close()
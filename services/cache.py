@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from services.repository import Repository
+from services.singleflight import SingleFlight
+
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("RESPONSE_CACHE_ENTRIES", 50_000))
+
+T = TypeVar("T")
+
+# (ETag, serialized JSON body)
+CachedResponse = Tuple[str, bytes]
+
+_COUNTER_MAX = 15
+_HALVE = bytes(i >> 1 for i in range(256))
+_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+_MASK64 = (1 << 64) - 1
+
+
+class FrequencySketch:
+    """Approximate, aging access counts (a count-min sketch with 4-bit-range counters).
+
+    Four counters per key, each in its own row; the estimate is the
+    smallest. After ``10 * capacity`` increments every counter is halved, so
+    the sketch tracks recent popularity rather than all-time totals. The
+    halving is one ``bytes.translate`` over the table.
+    """
+
+    def __init__(self, capacity: int):
+        width = 16
+        while width < capacity:
+            width <<= 1
+        self._width = width
+        self._mask = width - 1
+        self._table = bytearray(4 * width)
+        self._sample = 10 * max(capacity, 1)
+        self._additions = 0
+
+    def _slots(self, key: Hashable) -> Tuple[int, int, int, int]:
+        h = hash(key) & _MASK64
+        w, m = self._width, self._mask
+        return (
+            ((h ^ _SEEDS[0]) * _SEEDS[1] & _MASK64) >> 40 & m,
+            w + (((h ^ _SEEDS[1]) * _SEEDS[2] & _MASK64) >> 40 & m),
+            2 * w + (((h ^ _SEEDS[2]) * _SEEDS[3] & _MASK64) >> 40 & m),
+            3 * w + (((h ^ _SEEDS[3]) * _SEEDS[0] & _MASK64) >> 40 & m),
+        )
+
+    def increment(self, key: Hashable) -> None:
+        table = self._table
+        for slot in self._slots(key):
+            if table[slot] < _COUNTER_MAX:
+                table[slot] += 1
+        self._additions += 1
+        if self._additions >= self._sample:
+            self._table = bytearray(table.translate(_HALVE))
+            self._additions //= 2
+
+    def frequency(self, key: Hashable) -> int:
+        table = self._table
+        return min(table[slot] for slot in self._slots(key))
+
+
+class ResponseCache:
+    """Serialized single-entity responses, keyed by ID: the ETag plus JSON body.
+
+    A hit skips the store read and pydantic serialization entirely. Entries
+    are dropped by the repository's change notifications (see
+    :meth:`attach`), so every update or delete, single or batch, through any
+    route, invalidates the entity's entry.
+
+    Eviction is W-TinyLFU: new entries enter a small LRU window; what falls
+    out of the window joins the main LRU only if the
+    :class:`FrequencySketch` says it is used more often than the main
+    segment's least recently used entry, which would otherwise be evicted.
+    A scan of one-off IDs therefore cannot flush the hot set.
+
+    A read that misses takes a :meth:`lease` before reading the store and
+    passes it to :meth:`fill`. A write to that ID in between revokes the
+    lease, and the (possibly stale) body is not cached. This matters when
+    the store is read in a worker thread (SQLite).
+
+    With ``coalesce=True`` concurrent misses for the same ID share one load
+    and render (see ``services.singleflight``); a write to the ID detaches
+    the shared load, so callers arriving after it read afresh. Only worth it
+    when loading awaits something: an inline in-memory read cannot overlap
+    with another.
+
+    Notifications only cover writes made in this process. When other
+    processes write the same store (SQLite behind several workers, or any
+    other client of the file), pass ``revalidate``: it returns the stored
+    row's current ETag, or ``None`` once the row is gone. Every hit is then
+    checked against it, a cheap version read instead of a full load and
+    render, and a stale entry is dropped and reloaded.
+
+    ``capacity=0`` disables caching; lookups then always miss.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int = RESPONSE_CACHE_ENTRIES,
+        window: float = 0.01,
+        coalesce: bool = False,
+        revalidate: Optional[Callable[[UUID], Awaitable[Optional[str]]]] = None,
+    ):
+        self.name = name
+        self.revalidate = revalidate
+        self.flights: Optional[SingleFlight[CachedResponse]] = SingleFlight() if coalesce else None
+        self.capacity = capacity
+        self._window_size = max(1, int(capacity * window)) if capacity else 0
+        self._main_size = capacity - self._window_size
+        self._window: "OrderedDict[UUID, CachedResponse]" = OrderedDict()
+        self._main: "OrderedDict[UUID, CachedResponse]" = OrderedDict()
+        self._leases: Dict[UUID, object] = {}
+        self._sketch = FrequencySketch(capacity)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def attach(self, repo: Repository) -> None:
+        """Invalidate on every write ``repo`` commits."""
+        repo.subscribe(self.on_change)
+
+    def __len__(self) -> int:
+        return len(self._window) + len(self._main)
+
+    def get(self, key: UUID) -> Optional[CachedResponse]:
+        with self._lock:
+            if self.capacity:
+                self._sketch.increment(key)
+            for segment in (self._main, self._window):
+                value = segment.get(key)
+                if value is not None:
+                    segment.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    async def get_or_load(
+        self, key: UUID, load: Callable[[UUID], Awaitable[T]], render: Callable[[T], CachedResponse]
+    ) -> CachedResponse:
+        """The cached response for ``key``, or ``render(await load(key))``, cached under a lease."""
+        cached = self.get(key)
+        if cached is not None:
+            if self.revalidate is None or await self.revalidate(key) == cached[0]:
+                return cached
+            self.stale += 1
+            self.invalidate(key)
+        if self.flights is None:
+            return await self._load(key, load, render)
+        return await self.flights.do(key, lambda: self._load(key, load, render))
+
+    async def _load(
+        self, key: UUID, load: Callable[[UUID], Awaitable[T]], render: Callable[[T], CachedResponse]
+    ) -> CachedResponse:
+        lease = self.lease(key)
+        try:
+            item = await load(key)
+        except BaseException:
+            self.release(key, lease)
+            raise
+        return self.fill(key, lease, render(item))
+
+    def lease(self, key: UUID) -> object:
+        token = object()
+        with self._lock:
+            self._leases[key] = token
+        return token
+
+    def fill(self, key: UUID, lease: object, value: CachedResponse) -> CachedResponse:
+        """Cache ``value`` for ``key`` unless it was written since ``lease`` was taken; returns ``value``."""
+        with self._lock:
+            if self._leases.get(key) is not lease:
+                return value
+            del self._leases[key]
+            if not self.capacity or key in self._main:
+                return value
+            self._window[key] = value
+            self._window.move_to_end(key)
+            if len(self._window) > self._window_size:
+                self._admit(*self._window.popitem(last=False))
+        return value
+
+    def _admit(self, key: UUID, value: CachedResponse) -> None:
+        if len(self._main) < self._main_size:
+            self._main[key] = value
+            return
+        if not self._main:
+            return
+        victim = next(iter(self._main))
+        if self._sketch.frequency(key) > self._sketch.frequency(victim):
+            del self._main[victim]
+            self._main[key] = value
+            self.evictions += 1
+        else:
+            self.rejections += 1
+
+    def release(self, key: UUID, lease: object) -> None:
+        """Give up ``lease`` without filling (the load failed)."""
+        with self._lock:
+            if self._leases.get(key) is lease:
+                del self._leases[key]
+
+    def invalidate(self, key: UUID) -> None:
+        if self.flights is not None:
+            self.flights.forget(key)
+        with self._lock:
+            self._leases.pop(key, None)
+            if self._window.pop(key, None) is not None or self._main.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def on_change(self, key: UUID, item: Optional[BaseModel]) -> None:
+        self.invalidate(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._window.clear()
+            self._main.clear()
+            self._leases.clear()
+
+
+def render_prometheus(caches: Iterable[ResponseCache]) -> str:
+    """Hit/miss/eviction counters and sizes in Prometheus text format."""
+    caches = list(caches)
+    counters = (
+        ("hits", "Lookups answered from the cache."),
+        ("misses", "Lookups that had to read the store."),
+        ("evictions", "Entries evicted to admit a more frequently used one."),
+        ("rejections", "Entries not admitted: used less often than the eviction candidate."),
+        ("invalidations", "Entries dropped because the entity was written."),
+        ("stale", "Hits found out of date on revalidation (written by another process)."),
+    )
+    lines = []
+    for counter, help_text in counters:
+        lines += [f"# HELP response_cache_{counter}_total {help_text}", f"# TYPE response_cache_{counter}_total counter"]
+        lines += [f'response_cache_{counter}_total{{cache="{c.name}"}} {getattr(c, counter)}' for c in caches]
+    lines += ["# HELP response_cache_entries Entries currently cached.", "# TYPE response_cache_entries gauge"]
+    lines += [f'response_cache_entries{{cache="{c.name}"}} {len(c)}' for c in caches]
+    coalescing = [c for c in caches if c.flights is not None]
+    if coalescing:
+        lines += [
+            "# HELP response_cache_loads_total Store reads made for misses (one per coalesced group).",
+            "# TYPE response_cache_loads_total counter",
+        ]
+        lines += [f'response_cache_loads_total{{cache="{c.name}"}} {c.flights.calls}' for c in coalescing]
+        lines += [
+            "# HELP response_cache_coalesced_total Misses that joined a read already in flight for the same ID.",
+            "# TYPE response_cache_coalesced_total counter",
+        ]
+        lines += [f'response_cache_coalesced_total{{cache="{c.name}"}} {c.flights.coalesced}' for c in coalescing]
+    return "\n".join(lines) + "\n"
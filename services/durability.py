@@ -0,0 +1,566 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import weakref
+import zlib
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from services.records import Record
+from services.repository import BatchListener, IndexedRepository, Repository
+
+logger = logging.getLogger(__name__)
+
+_instances: "weakref.WeakSet[DurableStore]" = weakref.WeakSet()
+
+# always   -- write and fsync each record before the write returns
+# batch    -- group commit: one fsync covers every record appended meanwhile;
+#             async writers are acknowledged once their record is on disk
+# interval -- fsync in the background every WAL_FSYNC_INTERVAL_MS; writers
+#             do not wait, so a power loss can drop that much
+# none     -- hand records to the OS and never fsync (survives a process
+#             crash, not a power loss)
+FSYNC_POLICIES = ("always", "batch", "interval", "none")
+
+# Off unless a deployment names the directory; it belongs to one process.
+WAL_DIR = os.environ.get("WAL_DIR", "")
+
+_WAL_MAGIC = b"APPWAL1\n"
+_SNAPSHOT_MAGIC = b"APPSNAP1\n"
+_FRAME = struct.Struct("<II")  # payload length, crc32 of payload
+_SEGMENT = re.compile(r"wal-(\d+)\.log$")
+_SNAPSHOT = re.compile(r"snapshot-(\d+)\.snap$")
+SNAPSHOT_CHUNK = 2000  # records per snapshot frame
+
+_fsync = getattr(os, "fdatasync", os.fsync)
+
+
+class RecoveryError(RuntimeError):
+    """The log or a snapshot is damaged somewhere other than a torn tail."""
+
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(data, start: int) -> Iterator[Tuple[int, bytes]]:
+    """``(end_offset, payload)`` for each intact frame; stops at the first torn or corrupt one."""
+    pos, size = start, len(data)
+    while pos + _FRAME.size <= size:
+        length, crc = _FRAME.unpack_from(data, pos)
+        end = pos + _FRAME.size + length
+        if end > size:
+            return
+        payload = data[pos + _FRAME.size:end]
+        if zlib.crc32(payload) != crc:
+            return
+        yield end, payload
+        pos = end
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# -----------------------------------------------------------------------------
+# Write-ahead log
+# -----------------------------------------------------------------------------
+
+class WriteAheadLog:
+    """Append-only log segment with group commit.
+
+    :meth:`append` only frames the record and queues it (except under
+    ``always``, which writes and fsyncs inline). A flusher thread writes
+    everything queued with one ``write`` and, per the fsync policy, one
+    ``fdatasync``; records appended while it is busy form the next group, so
+    the number of fsyncs per second stays flat as the write rate grows.
+
+    Records are numbered (LSNs); :meth:`synced` lets an ``async`` writer wait
+    until everything appended so far is durable without holding a thread.
+
+    Moving to a new segment is split so the cut itself costs no I/O: the
+    segment file is made (and fsynced) beforehand with :meth:`create`,
+    :meth:`cut` only swaps queues, and the old segment is written out,
+    fsynced and closed by whichever I/O comes next, or by :meth:`finish_cut`.
+    If a write or fsync fails the log stops accepting the claim that
+    anything is durable: every later :meth:`synced` raises.
+    """
+
+    def __init__(self, path: str, header: bytes, policy: str = "batch", interval: float = 0.1):
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown WAL fsync policy {policy!r}; expected one of {', '.join(FSYNC_POLICIES)}")
+        self.policy = policy
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # the fd: flusher writes vs rotate()
+        self._pending: List[bytes] = []
+        self._appended = 0
+        self._synced = 0
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+        self._failed: Optional[BaseException] = None
+        self._closing = False
+        self._cut: Optional[Tuple[int, List[bytes], int]] = None  # new fd, old segment's last frames, LSN
+        self._fd = self.create(path, header)
+        self._thread = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def create(path: str, header: bytes) -> int:
+        """Create and fsync a segment holding just ``header``; returns its descriptor."""
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o600)
+        _write_all(fd, _WAL_MAGIC + _frame(header))
+        _fsync(fd)
+        _fsync_dir(os.path.dirname(path) or ".")
+        return fd
+
+    def append(self, payload: bytes) -> int:
+        frame = _frame(payload)
+        if self.policy == "always":
+            with self._io_lock:
+                self._finish_cut()
+                with self._cond:
+                    self._check()
+                    self._write([frame], sync=True)
+                    self._appended += 1
+                    self._synced = self._appended
+                    return self._appended
+        with self._cond:
+            self._check()
+            self._pending.append(frame)
+            self._appended += 1
+            self._cond.notify()
+            return self._appended
+
+    def _check(self) -> None:
+        if self._failed is not None:
+            raise OSError("write-ahead log failed; writes are no longer durable") from self._failed
+
+    async def synced(self) -> None:
+        """Return once every record appended so far is durable (``batch`` only)."""
+        if self.policy != "batch":
+            self._check()
+            return
+        with self._cond:
+            self._check()
+            lsn = self._appended
+            if lsn <= self._synced:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((lsn, future))
+        await future
+
+    def cut(self, fd: int) -> None:
+        """Send every record appended from now on to ``fd`` (from :meth:`create`); no I/O."""
+        with self._cond:
+            self._cut = (fd, self._pending, self._appended)
+            self._pending = []
+
+    def finish_cut(self) -> None:
+        """Write out, fsync and close the segment before the last :meth:`cut`, if not done yet."""
+        with self._io_lock:
+            self._finish_cut()
+
+    def _finish_cut(self) -> None:
+        # Caller holds _io_lock.
+        with self._cond:
+            cut, self._cut = self._cut, None
+        if cut is None:
+            return
+        fd, frames, upto = cut
+        self._write(frames, sync=True)
+        os.close(self._fd)
+        self._fd = fd
+        self._mark_synced(upto)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        with self._io_lock:
+            if self._cut is not None:
+                os.close(self._cut[0])
+            os.close(self._fd)
+
+    def _write(self, frames: List[bytes], sync: bool) -> None:
+        if frames:
+            _write_all(self._fd, b"".join(frames))
+        if sync:
+            _fsync(self._fd)
+
+    def _flush_loop(self) -> None:
+        timeout = self.interval if self.policy == "interval" else None
+        last_sync = time.monotonic()
+        dirty = False
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    if not self._cond.wait(timeout):
+                        break
+                closing = self._closing
+            with self._io_lock:  # not held while idle: finish_cut() needs it
+                try:
+                    self._finish_cut()
+                    with self._cond:
+                        batch, self._pending = self._pending, []
+                        upto = self._appended
+                    dirty = dirty or bool(batch)
+                    due = self.policy == "batch" or closing or time.monotonic() - last_sync >= self.interval
+                    sync = dirty and due and self.policy != "none"
+                    self._write(batch, sync)
+                except OSError as exc:
+                    logger.exception("Write-ahead log write failed")
+                    self._fail(exc)
+                    return
+            if sync:
+                dirty = False
+                last_sync = time.monotonic()
+            if not dirty:
+                self._mark_synced(upto)
+            if closing:
+                return
+
+    def _mark_synced(self, upto: int) -> None:
+        with self._cond:
+            self._synced = max(self._synced, upto)
+            ready = [f for lsn, f in self._waiters if lsn <= self._synced]
+            self._waiters = [(lsn, f) for lsn, f in self._waiters if lsn > self._synced]
+        for future in ready:
+            future.get_loop().call_soon_threadsafe(_resolve, future, None)
+
+    def _fail(self, exc: BaseException) -> None:
+        with self._cond:
+            self._failed = exc
+            waiters, self._waiters = self._waiters, []
+        for _, future in waiters:
+            future.get_loop().call_soon_threadsafe(_resolve, future, exc)
+
+
+def _resolve(future: asyncio.Future, exc: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if exc is None:
+        future.set_result(None)
+    else:
+        future.set_exception(OSError("write-ahead log failed; this write may not be durable"))
+
+
+# -----------------------------------------------------------------------------
+# Durable in-memory stores
+# -----------------------------------------------------------------------------
+
+class DurableStore:
+    """Keeps in-memory repositories across restarts: write-ahead log plus snapshots.
+
+    Every committed write reaches the log through the repositories' change
+    notifications, as the store's own compact record tuple
+    (``services.records``) rather than a model dump. Files in ``directory``:
+
+    * ``wal-N.log`` -- log segments, each a header naming every table's
+      record fields, then one CRC-framed entry per committed write. An
+      atomic batch is a single entry, so it replays all or nothing.
+    * ``snapshot-N.snap`` -- every row as it stood when segment N began,
+      in sort order, a few thousand records per frame.
+
+    After ``snapshot_every`` logged writes a background thread takes a
+    snapshot: under all store locks it switches the log to a new, already
+    created segment and shallow-copies each store's rows (records are
+    immutable), then, with the locks released, writes them out, fsyncs,
+    renames into place, and deletes the segments and snapshots it
+    supersedes.
+
+    Under the ``always`` policy every write fsyncs inline, so the stores
+    are marked ``blocking`` and their calls leave the event loop (see
+    ``services.aio``).
+
+    :meth:`open` recovers by mapping the newest snapshot into memory,
+    bulk-loading it, and replaying the segments after it. A torn frame at
+    the end of the last segment (a crash mid-write) is cut off; damage
+    anywhere else raises :class:`RecoveryError` rather than silently
+    dropping writes. A header whose fields differ from the current model
+    is mapped by name, with defaults for fields added since.
+
+    The directory is locked: one process owns it.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        repos: Dict[str, IndexedRepository],
+        policy: str = "batch",
+        interval: float = 0.1,
+        snapshot_every: int = 100_000,
+    ):
+        self.directory = directory
+        self.policy = policy
+        self.interval = interval
+        self.snapshot_every = snapshot_every
+        self._tables: List[Tuple[str, IndexedRepository]] = list(repos.items())
+        if policy == "always":
+            for repo in repos.values():
+                repo.blocking = True
+        self._header = json.dumps({"tables": [[name, list(repo.codec.fields)] for name, repo in self._tables]}).encode()
+        self._wal: Optional[WriteAheadLog] = None
+        self._segment = 0
+        self._since_snapshot = 0
+        self._snapshot_due = threading.Event()
+        self._snapshot_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_fd: Optional[int] = None
+        self.recovery: Dict[str, float] = {}
+        _instances.add(self)
+
+    @classmethod
+    def from_env(cls, repos: Dict[str, Repository]) -> Optional["DurableStore"]:
+        """The configured store for the in-memory ones among ``repos``, or None
+        when ``WAL_DIR`` is empty or none of them is in memory."""
+        in_memory = {name: r for name, r in repos.items() if isinstance(r, IndexedRepository)}
+        if not WAL_DIR or not in_memory:
+            return None
+        return cls(
+            WAL_DIR,
+            in_memory,
+            policy=os.environ.get("WAL_FSYNC", "batch"),
+            interval=float(os.environ.get("WAL_FSYNC_INTERVAL_MS", 100)) / 1000,
+            snapshot_every=int(os.environ.get("WAL_SNAPSHOT_RECORDS", 100_000)),
+        )
+
+    @staticmethod
+    def configured() -> bool:
+        """Whether this process has built a store, so it must be the only process serving it."""
+        return bool(_instances)
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(self.directory, "LOCK"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._lock_fd)
+            raise RuntimeError(f"WAL directory {self.directory!r} is in use by another process") from None
+        self.recover()
+        self._since_snapshot = self.recovery["replayed_records"]
+        if self._since_snapshot >= self.snapshot_every:
+            self._snapshot_due.set()
+        self._segment += 1
+        self._wal = WriteAheadLog(self._segment_path(self._segment), self._header, self.policy, self.interval)
+        for index, (_, repo) in enumerate(self._tables):
+            repo.subscribe_batches(self._listener(index, repo))
+        self._thread = threading.Thread(target=self._snapshot_loop, name="wal-snapshots", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._snapshot_due.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._wal is not None:
+            self._wal.close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+
+    async def synced(self) -> None:
+        """Wait until every write made so far is durable under the fsync policy."""
+        if self._wal is not None:
+            await self._wal.synced()
+
+    # -- logging -------------------------------------------------------------
+
+    def _listener(self, index: int, repo: IndexedRepository) -> BatchListener:
+        encode = repo.codec.encode
+
+        def on_change(changes: List[Tuple[UUID, Optional[BaseModel]]]) -> None:
+            values = [key.int if item is None else encode(item) for key, item in changes]
+            self._wal.append(json.dumps([index, *values], separators=(",", ":")).encode())
+            self._since_snapshot += len(values)
+            if self._since_snapshot >= self.snapshot_every:
+                self._snapshot_due.set()
+
+        return on_change
+
+    def _segment_path(self, n: int) -> str:
+        return os.path.join(self.directory, f"wal-{n:08d}.log")
+
+    def _snapshot_path(self, n: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{n:08d}.snap")
+
+    def _files(self, pattern: re.Pattern) -> List[int]:
+        return sorted(int(m.group(1)) for m in map(pattern.match, os.listdir(self.directory)) if m)
+
+    # -- snapshots -----------------------------------------------------------
+
+    def _snapshot_loop(self) -> None:
+        while True:
+            self._snapshot_due.wait()
+            if self._stop.is_set():
+                return
+            self._snapshot_due.clear()
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("Snapshot failed; the log keeps growing until one succeeds")
+
+    def snapshot(self) -> None:
+        with self._snapshot_lock:
+            started = time.perf_counter()
+            segment = self._segment + 1
+            fd = WriteAheadLog.create(self._segment_path(segment), self._header)
+            # Writes pause only for the cut itself: no I/O, just queue swaps
+            # and shallow copies. The old segment is finished and the rows
+            # are put in order after the locks are released.
+            with ExitStack() as stack:
+                for _, repo in self._tables:
+                    stack.enter_context(repo.lock)
+                self._wal.cut(fd)
+                self._segment = segment
+                self._since_snapshot = 0
+                cuts = [repo.cut() for _, repo in self._tables]
+            self._wal.finish_cut()
+            cut = [repo.records(c) for (_, repo), c in zip(self._tables, cuts)]
+            path = self._snapshot_path(segment)
+            with open(path + ".tmp", "wb") as f:
+                f.write(_SNAPSHOT_MAGIC + _frame(self._header))
+                for index, records in enumerate(cut):
+                    for i in range(0, len(records), SNAPSHOT_CHUNK):
+                        chunk = records[i:i + SNAPSHOT_CHUNK]
+                        f.write(_frame(json.dumps([index, chunk], separators=(",", ":")).encode()))
+                f.flush()
+                _fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            _fsync_dir(self.directory)
+            for n in self._files(_SEGMENT):
+                if n < segment:
+                    os.remove(self._segment_path(n))
+            for n in self._files(_SNAPSHOT):
+                if n < segment:
+                    os.remove(self._snapshot_path(n))
+            logger.info(
+                "Snapshot %d: %d records in %.2fs", segment, sum(map(len, cut)), time.perf_counter() - started
+            )
+
+    # -- recovery ------------------------------------------------------------
+
+    def recover(self) -> None:
+        started = time.perf_counter()
+        snapshots = self._files(_SNAPSHOT)
+        segments = self._files(_SEGMENT)
+        base = snapshots[-1] if snapshots else 0
+        if base:
+            self._load_snapshot(self._snapshot_path(base))
+        loaded = time.perf_counter()
+        replayed = 0
+        tail = [n for n in segments if n >= base]
+        for n in tail:
+            replayed += self._replay(self._segment_path(n), last=n == tail[-1])
+        self._segment = max([base, *segments])
+        self.recovery = {
+            "snapshot_seconds": round(loaded - started, 3),
+            "replay_seconds": round(time.perf_counter() - loaded, 3),
+            "replayed_records": replayed,
+            "rows": sum(len(repo) for _, repo in self._tables),
+        }
+        if base or segments:
+            logger.info("Recovered from %s: %s", self.directory, self.recovery)
+
+    def _adapters(self, header: bytes, path: str) -> List[Tuple[IndexedRepository, Callable[[list], Record]]]:
+        """Per table index in ``header``: the store and how to turn a logged record into a current one."""
+        repos = dict(self._tables)
+        adapters = []
+        for name, fields in json.loads(header)["tables"]:
+            if name not in repos:
+                raise RecoveryError(f"{path}: unknown table {name!r}")
+            adapters.append((repos[name], _adapter(repos[name], fields)))
+        return adapters
+
+    def _load_snapshot(self, path: str) -> None:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                raise RecoveryError(f"{path} is not a snapshot")
+            frames = _read_frames(data, len(_SNAPSHOT_MAGIC))
+            header = next(frames, None)
+            if header is None:
+                raise RecoveryError(f"{path}: damaged header")
+            adapters = self._adapters(header[1], path)
+            end = header[0]
+            batches: Dict[int, List[Record]] = {}
+            for end, payload in frames:
+                index, chunk = json.loads(payload)
+                convert = adapters[index][1]
+                batches.setdefault(index, []).extend(convert(r) for r in chunk)
+            if end != len(data):
+                raise RecoveryError(f"{path}: damaged at byte {end}")
+        for index, records in batches.items():
+            adapters[index][0].load(records)
+
+    def _replay(self, path: str, last: bool) -> int:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(_WAL_MAGIC)] != _WAL_MAGIC:
+            raise RecoveryError(f"{path} is not a write-ahead log")
+        frames = _read_frames(data, len(_WAL_MAGIC))
+        header = next(frames, None)
+        if header is None:
+            if last:  # crashed while creating the segment
+                os.remove(path)
+                return 0
+            raise RecoveryError(f"{path}: damaged header")
+        adapters = self._adapters(header[1], path)
+        end, count = header[0], 0
+        for end, payload in frames:
+            index, *values = json.loads(payload)
+            repo, convert = adapters[index]
+            for value in values:
+                if isinstance(value, int):
+                    repo.forget(value)
+                else:
+                    repo.restore(convert(value))
+            count += len(values)
+        if end != len(data):
+            if not last:
+                raise RecoveryError(f"{path}: damaged at byte {end}")
+            logger.warning("Discarding torn tail of %s (%d bytes)", path, len(data) - end)
+            os.truncate(path, end)
+        return count
+
+
+def _adapter(repo: IndexedRepository, fields: Sequence[str]) -> Callable[[list], Record]:
+    codec = repo.codec
+    current = codec.fields
+    if tuple(fields) == current:
+        return codec.adopt
+    position = {f: i for i, f in enumerate(fields)}
+    sources: List[Tuple[bool, object]] = []
+    for field in current:
+        if field in position:
+            sources.append((True, position[field]))
+            continue
+        info = codec.model.model_fields[field]
+        if info.is_required():
+            raise RecoveryError(f"{repo.entity}.{field} is required but missing from the log")
+        sources.append((False, codec.encode_value(field, info.get_default(call_default_factory=True))))
+    return lambda values: codec.adopt(values[s] if logged else s for logged, s in sources)
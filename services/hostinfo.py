@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HostInfoProvider:
+    """Caches this host's name and IP address, refreshing them in the background.
+
+    Resolving ``gethostbyname(gethostname())`` can block on DNS, so request
+    handlers only ever read the cached values; a daemon thread re-resolves
+    every ``ttl`` seconds and keeps the last good answer if a lookup fails.
+    """
+
+    def __init__(self, ttl: float = 60.0, fallback_ip: str = "127.0.0.1"):
+        self.ttl = ttl
+        self.hostname: str = "localhost"
+        self.ip_address: str = fallback_ip
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> None:
+        try:
+            hostname = socket.gethostname()
+            ip_address = socket.gethostbyname(hostname)
+        except OSError as exc:
+            logger.warning("Host info refresh failed, keeping %s: %s", self.ip_address, exc)
+            return
+        # Two independent attribute stores; readers never see a torn value.
+        self.hostname = hostname
+        self.ip_address = ip_address
+
+    def start(self) -> None:
+        """Resolve once, then keep refreshing on a daemon thread until :meth:`stop`."""
+        if self._thread is not None:
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hostinfo-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl):
+            self.refresh()
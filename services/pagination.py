@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from uuid import UUID
+
+# Keyset position of a row: rows are ordered by (created_at, id).
+SortKey = Tuple[datetime, UUID]
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_micros(value: datetime) -> int:
+    """Naive-UTC datetime as integer microseconds since the epoch.
+
+    Independent of the host time zone, so values agree across workers.
+    """
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client-supplied cursor cannot be decoded."""
+
+
+def encode_cursor(sort_key: Optional[SortKey]) -> Optional[str]:
+    """Turn a sort key into an opaque, URL-safe cursor string."""
+    if sort_key is None:
+        return None
+    created_at, key = sort_key
+    raw = f"{created_at.isoformat()}|{key.hex}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[SortKey]:
+    """Inverse of :func:`encode_cursor`; ``None`` means start from the beginning."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, key = raw.split("|", 1)
+        sort_key = datetime.fromisoformat(created_at), UUID(hex=key)
+        # Stored times are naive UTC; an aware one cannot be compared with them.
+        if sort_key[0].tzinfo is not None:
+            raise ValueError("cursor time has a time zone")
+        to_micros(sort_key[0])
+        return sort_key
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, OverflowError) as exc:
+        raise InvalidCursorError(f"Invalid cursor {cursor!r}") from exc
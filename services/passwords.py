@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+SCHEME = "scrypt"
+
+
+@dataclass(frozen=True)
+class ScryptParams:
+    """scrypt cost parameters; memory use is roughly ``128 * n * r`` bytes."""
+    n: int = 2 ** 14
+    r: int = 8
+    p: int = 1
+    salt_bytes: int = 16
+    key_bytes: int = 32
+
+    @classmethod
+    def from_env(cls) -> "ScryptParams":
+        return cls(
+            n=int(os.environ.get("PASSWORD_SCRYPT_N", cls.n)),
+            r=int(os.environ.get("PASSWORD_SCRYPT_R", cls.r)),
+            p=int(os.environ.get("PASSWORD_SCRYPT_P", cls.p)),
+        )
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, key_bytes: int) -> bytes:
+    # maxmem must cover 128*n*r plus slack, or OpenSSL rejects larger n.
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, dklen=key_bytes, maxmem=256 * n * r + 1024 * 1024
+    )
+
+
+def hash_password(password: str, params: ScryptParams = ScryptParams()) -> str:
+    """Return ``scrypt$n$r$p$salt$hash``; parameters travel with the hash."""
+    salt = secrets.token_bytes(params.salt_bytes)
+    key = _scrypt(password, salt, params.n, params.r, params.p, params.key_bytes)
+    return f"{SCHEME}${params.n}${params.r}${params.p}${_b64(salt)}${_b64(key)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        scheme, n, r, p, salt, key = encoded.split("$")
+    except ValueError:
+        return False
+    if scheme != SCHEME:
+        return False
+    expected = _unb64(key)
+    actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p), len(expected))
+    return hmac.compare_digest(actual, expected)
+
+
+class PasswordHasher:
+    """Runs scrypt on a bounded process pool so hashing never blocks the event loop.
+
+    scrypt is deliberately CPU- and memory-hard and holds the GIL for part of
+    its run, so it is kept out of both the event loop and the threadpool.
+    ``workers`` caps the processes (default: CPU count); ``max_pending``
+    caps queued jobs so a burst of sign-ups waits here instead of piling up
+    inside the executor. ``workers=0`` hashes inline, for tests and tooling.
+    """
+
+    def __init__(self, params: Optional[ScryptParams] = None, workers: Optional[int] = None, max_pending: int = 256):
+        self.params = params or ScryptParams.from_env()
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_env(cls) -> "PasswordHasher":
+        workers = os.environ.get("PASSWORD_HASH_WORKERS")
+        return cls(
+            workers=None if workers is None else int(workers),
+            max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 256)),
+        )
+
+    def start(self) -> None:
+        if self.workers and self._executor is None:
+            # Imported here: multiprocessing is a measurable share of cold-start
+            # imports and is not needed with workers=0.
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn, not fork: the parent runs the event loop and helper threads.
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        self.start()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.params)
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        return list(await asyncio.gather(*(self.hash(p) for p in passwords)))
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        return await self._run(verify_password, password, encoded)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel, Field
+
+from models.address import AddressBase, AddressRead
+from models.person import PersonCreate, PersonRead
+from services.pagination import SortKey
+from services.repository import (
+    ConflictError,
+    EntitySpec,
+    InUseError,
+    IndexedRepository,
+    NotFoundError,
+    Precondition,
+    PreconditionFailedError,
+)
+
+ADDRESS_FIELDS = ("street", "city", "state", "postal_code", "country")
+
+# Normalised address content: what makes two addresses "the same place".
+AddressKey = Tuple[str, ...]
+
+
+class StoredPerson(BaseModel):
+    """A person as stored: addresses are referenced by ID, never embedded."""
+    id: UUID = Field(default_factory=uuid4)
+    uni: str
+    first_name: str
+    last_name: str
+    email: str
+    phone: Optional[str] = None
+    birth_date: Optional[date] = None
+    address_ids: Tuple[UUID, ...] = ()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+ADDRESSES = EntitySpec(
+    table="addresses",
+    entity="Address",
+    model=AddressRead,
+    key_field="id",
+    indexed_fields=("city", "postal_code", "country"),
+)
+
+PERSONS = EntitySpec(
+    table="persons",
+    entity="Person",
+    model=StoredPerson,
+    key_field="id",
+    unique_fields=("uni", "email"),
+)
+
+
+def address_key(address: Any) -> AddressKey:
+    """Case- and whitespace-insensitive identity of an address's content."""
+    return tuple(" ".join((getattr(address, f) or "").split()).casefold() for f in ADDRESS_FIELDS)
+
+
+class PeopleStore:
+    """Persons and their addresses, with each distinct address stored once.
+
+    Addresses live in their own repository keyed by ``AddressBase.id``;
+    persons store only the tuple of address IDs. Addresses arriving inside a
+    person payload are interned by content (:func:`address_key`), so two
+    persons at "123 Main St" share one address row whatever IDs the clients
+    sent. ``_residents`` maps each address to the persons referencing it, so
+    "who lives at X" is one dict lookup, and an address still in use cannot
+    be deleted. ``PersonRead`` objects are assembled only on the way out.
+
+    In memory; one lock covers both repositories so a person and the
+    addresses it introduces appear together. :attr:`tables` are the two
+    repositories for a write-ahead log (``services.durability``); a person
+    is written after the addresses it introduces, so a crash in between
+    leaves at worst an unreferenced address. After the log restores them,
+    :meth:`reindex` rebuilds the lookups derived from their rows.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.addresses: IndexedRepository[AddressRead] = IndexedRepository(ADDRESSES)
+        self.persons: IndexedRepository[StoredPerson] = IndexedRepository(PERSONS)
+        self._by_content: Dict[AddressKey, UUID] = {}
+        self._residents: Dict[UUID, Dict[UUID, None]] = {}  # address -> ordered set of persons
+
+    @property
+    def tables(self) -> Dict[str, IndexedRepository]:
+        return {ADDRESSES.table: self.addresses, PERSONS.table: self.persons}
+
+    @property
+    def blocking(self) -> bool:
+        """Whether writes may wait on I/O (a log that fsyncs inline); see ``Repository.blocking``."""
+        return self.addresses.blocking or self.persons.blocking
+
+    def reindex(self) -> None:
+        """Rebuild the content and resident lookups from the stored rows."""
+        with self._lock:
+            self._by_content = {address_key(a): a.id for a in self.addresses}
+            self._residents = {}
+            for person in self.persons.values():
+                self._link(person.id, person.address_ids)
+
+    # -- addresses -----------------------------------------------------------
+
+    def add_address(self, address: AddressBase) -> Tuple[AddressRead, bool]:
+        """Store ``address`` unless an identical one exists; returns ``(address, created)``."""
+        with self._lock:
+            existing = self._by_content.get(address_key(address))
+            if existing is not None:
+                return self.addresses.require(existing), False
+            stored = self.addresses.add(AddressRead.model_construct(**address.model_dump()))
+            self._by_content[address_key(stored)] = stored.id
+            return stored, True
+
+    def get_address(self, key: UUID) -> Optional[AddressRead]:
+        return self.addresses.get(key)
+
+    def require_address(self, key: UUID) -> AddressRead:
+        return self.addresses.require(key)
+
+    def page_addresses(
+        self, filters: Mapping[str, Hashable], after: Optional[SortKey] = None, limit: int = 50
+    ) -> Tuple[List[AddressRead], Optional[SortKey]]:
+        return self.addresses.page(filters, after=after, limit=limit)
+
+    def update_address(
+        self, key: UUID, changes: Dict[str, Any], precondition: Optional[Precondition] = None
+    ) -> AddressRead:
+        """Edit an address in place; every resident sees the change.
+
+        Fails with :class:`ConflictError` if the new content is identical to
+        another stored address.
+        """
+        with self._lock:
+            current = self.addresses.require(key)
+            if precondition is not None and not precondition(current):
+                raise PreconditionFailedError(ADDRESSES.entity, key)
+            new_key = address_key(current.model_copy(update=changes))
+            owner = self._by_content.get(new_key)
+            if owner is not None and owner != key:
+                raise ConflictError(ADDRESSES.entity, "id", owner)
+            updated = self.addresses.update(key, changes)
+            del self._by_content[address_key(current)]
+            self._by_content[new_key] = key
+            return updated
+
+    def delete_address(self, key: UUID) -> AddressRead:
+        with self._lock:
+            residents = self._residents.get(key)
+            if residents:
+                raise InUseError(ADDRESSES.entity, key, len(residents))
+            removed = self.addresses.delete(key)
+            del self._by_content[address_key(removed)]
+            return removed
+
+    def residents(self, key: UUID) -> List[PersonRead]:
+        """Everyone whose address list includes address ``key``."""
+        with self._lock:
+            self.addresses.require(key)
+            people = [self.persons.get(p) for p in self._residents.get(key, ())]
+        return self._read_many(people)
+
+    def _intern_all(self, addresses: Iterable[AddressBase]) -> Tuple[Tuple[UUID, ...], List[UUID]]:
+        """Resolve addresses to stored IDs; returns ``(ids, newly_created_ids)``.
+
+        Duplicates within one list collapse to a single reference. An address
+        whose client-chosen ID already names a *different* stored address is
+        a conflict rather than a silent overwrite.
+        """
+        ids: Dict[UUID, None] = {}
+        created: List[UUID] = []
+        try:
+            for address in addresses:
+                existing = self._by_content.get(address_key(address))
+                if existing is None and address.id in self.addresses:
+                    raise ConflictError(ADDRESSES.entity, "id", address.id)
+                stored, is_new = self.add_address(address)
+                if is_new:
+                    created.append(stored.id)
+                ids[stored.id] = None
+        except BaseException:
+            self._drop_addresses(created)
+            raise
+        return tuple(ids), created
+
+    def _drop_addresses(self, keys: Iterable[UUID]) -> None:
+        for key in keys:
+            removed = self.addresses.delete(key)
+            del self._by_content[address_key(removed)]
+
+    def _link(self, person: UUID, address_ids: Iterable[UUID]) -> None:
+        for a in address_ids:
+            self._residents.setdefault(a, {})[person] = None
+
+    def _unlink(self, person: UUID, address_ids: Iterable[UUID]) -> None:
+        for a in address_ids:
+            residents = self._residents.get(a)
+            if residents is not None:
+                residents.pop(person, None)
+                if not residents:
+                    del self._residents[a]
+
+    # -- persons -------------------------------------------------------------
+
+    def _read(self, stored: StoredPerson) -> PersonRead:
+        return self._read_many([stored])[0]
+
+    def _read_many(self, people: List[StoredPerson]) -> List[PersonRead]:
+        # Each distinct address is decoded once per call, however many of the
+        # returned persons share it.
+        cache: Dict[UUID, AddressRead] = {}
+
+        def address(key: UUID) -> AddressRead:
+            found = cache.get(key)
+            if found is None:
+                found = cache[key] = self.addresses.require(key)
+            return found
+
+        result = []
+        for stored in people:
+            fields = dict(stored.__dict__)
+            fields["addresses"] = [address(a) for a in fields.pop("address_ids")]
+            result.append(PersonRead.model_construct(**fields))
+        return result
+
+    def add_person(self, person: PersonCreate) -> PersonRead:
+        with self._lock:
+            address_ids, created = self._intern_all(person.addresses)
+            fields = person.model_dump(exclude={"addresses"})
+            try:
+                stored = self.persons.add(StoredPerson.model_construct(**fields, address_ids=address_ids))
+            except BaseException:
+                self._drop_addresses(created)
+                raise
+            self._link(stored.id, address_ids)
+            return self._read(stored)
+
+    def get_person(self, key: UUID) -> Optional[PersonRead]:
+        with self._lock:
+            stored = self.persons.get(key)
+            return None if stored is None else self._read(stored)
+
+    def require_person(self, key: UUID) -> PersonRead:
+        person = self.get_person(key)
+        if person is None:
+            raise NotFoundError(PERSONS.entity, key)
+        return person
+
+    def page_persons(
+        self, filters: Mapping[str, Hashable], after: Optional[SortKey] = None, limit: int = 50
+    ) -> Tuple[List[PersonRead], Optional[SortKey]]:
+        with self._lock:
+            rows, next_key = self.persons.page(filters, after=after, limit=limit)
+            return self._read_many(rows), next_key
+
+    def update_person(
+        self, key: UUID, changes: Dict[str, Any], precondition: Optional[Precondition] = None
+    ) -> PersonRead:
+        """Apply ``changes``; an ``addresses`` list replaces the person's whole set."""
+        changes = dict(changes)
+        addresses = changes.pop("addresses", None)
+        with self._lock:
+            current = self.persons.require(key)
+            created: List[UUID] = []
+            if addresses is not None:
+                changes["address_ids"], created = self._intern_all(addresses)
+            try:
+                updated = self.persons.update(key, changes, precondition)
+            except BaseException:
+                self._drop_addresses(created)
+                raise
+            if addresses is not None:
+                self._unlink(key, current.address_ids)
+                self._link(key, updated.address_ids)
+            return self._read(updated)
+
+    def delete_person(self, key: UUID) -> PersonRead:
+        with self._lock:
+            stored = self.persons.delete(key)
+            self._unlink(key, stored.address_ids)
+            return self._read(stored)
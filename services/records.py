@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import sys
+import typing
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, Type
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from services.pagination import EPOCH, SortKey, to_micros
+
+# A stored row: one slot per model field, in model field order.
+Record = Tuple[Any, ...]
+
+_KEY_BITS = 128
+_KEY_MASK = (1 << _KEY_BITS) - 1
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _base_type(annotation: Any) -> Any:
+    """``Optional[X]`` -> ``X``; anything else unchanged."""
+    if typing.get_origin(annotation) is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _codec_for(annotation: Any, intern: bool) -> Tuple[Optional[Callable], Optional[Callable]]:
+    base = _base_type(annotation)
+    if typing.get_origin(base) is tuple and typing.get_args(base) == (UUID, ...):
+        return (lambda v: tuple(k.int for k in v)), (lambda v: tuple(UUID(int=k) for k in v))
+    if not isinstance(base, type):
+        return None, None
+    # datetime before date: datetime is a date subclass.
+    if issubclass(base, UUID):
+        return (lambda v: v.int), (lambda v: UUID(int=v))
+    if issubclass(base, datetime):
+        return to_micros, _from_micros
+    if issubclass(base, date):
+        return date.toordinal, date.fromordinal
+    if issubclass(base, str) and intern:
+        return sys.intern, None
+    return None, None
+
+
+class RecordCodec:
+    """Converts pydantic models to flat tuples for storage and back.
+
+    A tuple has no per-instance ``__dict__`` or fields-set, and the slots
+    hold cheaper objects than the model's: UUIDs (alone or in a tuple)
+    become 128-bit ints, datetimes integer microseconds, dates ordinals,
+    and low-cardinality strings (gender, service, ...) are interned so
+    every row shares one copy. ``None`` passes through unchanged.
+
+    :meth:`decode` rebuilds the model with ``model_construct``: records only
+    ever come from validated models, so validation is skipped.
+    """
+
+    def __init__(self, model: Type[BaseModel], interned: Iterable[str] = ()):
+        interned = set(interned)
+        self.model = model
+        self.fields: Tuple[str, ...] = tuple(model.model_fields)
+        self.slots: Dict[str, int] = {f: i for i, f in enumerate(self.fields)}
+        codecs = [_codec_for(model.model_fields[f].annotation, f in interned) for f in self.fields]
+        self._encoders = tuple(enc for enc, _ in codecs)
+        self._decoders = tuple(dec for _, dec in codecs)
+        self._interned = tuple(i for i, enc in enumerate(self._encoders) if enc is sys.intern)
+
+    def encode(self, item: BaseModel) -> Record:
+        # __dict__ rather than model_dump(): keeps exclude=True fields (password).
+        values = item.__dict__
+        return tuple(
+            value if enc is None or value is None else enc(value)
+            for enc, value in zip(self._encoders, (values[f] for f in self.fields))
+        )
+
+    def adopt(self, values: Iterable[Any]) -> Record:
+        """A record read back from outside (e.g. JSON), with its low-cardinality strings interned again."""
+        record = list(values)
+        for i in self._interned:
+            if record[i] is not None:
+                record[i] = sys.intern(record[i])
+        return tuple(record)
+
+    def encode_value(self, field: str, value: Hashable) -> Hashable:
+        enc = self._encoders[self.slots[field]]
+        return value if enc is None or value is None else enc(value)
+
+    def decode_value(self, field: str, value: Any) -> Any:
+        dec = self._decoders[self.slots[field]]
+        return value if dec is None or value is None else dec(value)
+
+    def decode(self, record: Record) -> BaseModel:
+        return self.model.model_construct(**{
+            f: value if dec is None or value is None else dec(value)
+            for f, dec, value in zip(self.fields, self._decoders, record)
+        })
+
+
+def pack_sort_key(created_micros: int, key: int) -> int:
+    """``(created_at, key)`` as one int that sorts the same way as the pair."""
+    return (created_micros << _KEY_BITS) | key
+
+
+def pack(sort_key: SortKey) -> int:
+    created_at, key = sort_key
+    return pack_sort_key(to_micros(created_at), key.int)
+
+
+def unpack(packed: int) -> SortKey:
+    return _from_micros(packed >> _KEY_BITS), UUID(int=packed & _KEY_MASK)
+
+
+def key_of(packed: int) -> int:
+    return packed & _KEY_MASK
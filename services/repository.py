@@ -0,0 +1,642 @@
+from __future__ import annotations
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import (
+    Any, Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Type, TypeVar,
+    Union,
+)
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from models.subscription import SubscriptionRead
+from models.user import UserRead
+from services.pagination import SortKey
+from services.records import Record, RecordCodec, key_of, pack, pack_sort_key, unpack
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Per-item outcome of a batch write: the stored row, or the error that item hit.
+BatchOutcome = Union[ModelT, "RepositoryError"]
+
+# Checked against the current row, atomically with the write it guards.
+Precondition = Callable[[BaseModel], bool]
+
+# Told ``(key, row)`` after every committed write; ``row`` is None for a delete.
+ChangeListener = Callable[[UUID, Optional[BaseModel]], None]
+# Told every ``(key, row)`` of a committed write at once: one pair for a
+# single write, the whole batch for an atomic batch.
+BatchListener = Callable[[List[Tuple[UUID, Optional[BaseModel]]]], None]
+
+
+# -----------------------------------------------------------------------------
+# Errors
+# -----------------------------------------------------------------------------
+
+class RepositoryError(Exception):
+    """Base class for storage errors surfaced to the API layer."""
+
+
+class NotFoundError(RepositoryError):
+    def __init__(self, entity: str, key: Any):
+        super().__init__(f"{entity} {key} not found")
+        self.entity = entity
+        self.key = key
+
+
+class PreconditionFailedError(RepositoryError):
+    def __init__(self, entity: str, key: Any):
+        super().__init__(f"{entity} {key} was modified by another request")
+        self.entity = entity
+        self.key = key
+
+
+class ConflictError(RepositoryError):
+    def __init__(self, entity: str, field: str, value: Any):
+        super().__init__(f"{entity} with {field}={value!r} already exists")
+        self.entity = entity
+        self.field = field
+        self.value = value
+
+
+class InUseError(RepositoryError):
+    def __init__(self, entity: str, key: Any, references: int):
+        super().__init__(f"{entity} {key} is still referenced by {references} other record(s)")
+        self.entity = entity
+        self.key = key
+        self.references = references
+
+
+def next_updated_at(previous: datetime) -> datetime:
+    """Fresh ``updated_at`` that is strictly later than ``previous``.
+
+    ``updated_at`` doubles as the entity version behind ETags, so two writes
+    within the same clock tick must still produce distinct values.
+    """
+    now = datetime.utcnow()
+    return now if now > previous else previous + timedelta(microseconds=1)
+
+
+# -----------------------------------------------------------------------------
+# Storage interface
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class EntitySpec:
+    """Describes one stored entity: its model, primary key and indexed fields."""
+    table: str
+    entity: str
+    model: Type[BaseModel]
+    key_field: str
+    unique_fields: Tuple[str, ...] = ()
+    indexed_fields: Tuple[str, ...] = ()
+
+
+USERS = EntitySpec(
+    table="users",
+    entity="User",
+    model=UserRead,
+    key_field="id",
+    unique_fields=("username", "email"),
+    indexed_fields=("gender",),
+)
+
+SUBSCRIPTIONS = EntitySpec(
+    table="subscriptions",
+    entity="Subscription",
+    model=SubscriptionRead,
+    key_field="subscription_id",
+    indexed_fields=("username", "service", "gender"),
+)
+
+
+class Repository(ABC, Generic[ModelT]):
+    """Storage interface shared by every backend.
+
+    Rows are kept in ``(created_at, key)`` order for keyset pagination.
+    Unique fields back the uniqueness checks on create/update and, like the
+    non-unique indexed fields, may be used as equality filters in
+    :meth:`page`. Batch writes are all-or-nothing.
+
+    ``blocking`` tells async callers whether a call may wait on I/O and so
+    must be moved off the event loop (see ``services.aio``). ``shared``
+    tells them whether other processes may write the same rows: those
+    writes never reach this instance's listeners.
+
+    Secondary structures kept outside the store (the search index) follow
+    it through :meth:`subscribe`: listeners hear about every write made
+    through this instance once it is committed, in commit order, and about
+    none of a batch that was rolled back. :meth:`subscribe_batches` listeners
+    (the write-ahead log) hear about a batch as one unit instead.
+    """
+
+    blocking: bool = True
+    shared: bool = False
+
+    def __init__(self, spec: EntitySpec):
+        self.spec = spec
+        self._listeners: List[ChangeListener] = []
+        self._batch_listeners: List[BatchListener] = []
+
+    @property
+    def entity(self) -> str:
+        return self.spec.entity
+
+    @property
+    def key_field(self) -> str:
+        return self.spec.key_field
+
+    # -- reads ---------------------------------------------------------------
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    @abstractmethod
+    def get(self, key: UUID) -> Optional[ModelT]: ...
+
+    def get_many(self, keys: Sequence[UUID]) -> List[Optional[ModelT]]:
+        """The row for each of ``keys``, or ``None`` where there is none, in one lookup.
+
+        Backends override this with a single vectorized read; the result is
+        aligned with ``keys``, duplicates included.
+        """
+        return [self.get(key) for key in keys]
+
+    def version(self, key: UUID) -> Optional[datetime]:
+        """The stored row's ``updated_at``, or ``None`` when there is no row."""
+        item = self.get(key)
+        return None if item is None else item.updated_at
+
+    def require(self, key: UUID) -> ModelT:
+        item = self.get(key)
+        if item is None:
+            raise NotFoundError(self.entity, key)
+        return item
+
+    @abstractmethod
+    def get_by(self, field: str, value: Hashable) -> Optional[ModelT]:
+        """Look up the single row whose unique ``field`` equals ``value``."""
+
+    @abstractmethod
+    def find_by(self, field: str, value: Hashable) -> List[ModelT]:
+        """Return every row whose indexed ``field`` equals ``value``."""
+
+    @abstractmethod
+    def page(
+        self,
+        filters: Mapping[str, Hashable],
+        after: Optional[SortKey] = None,
+        limit: int = 50,
+    ) -> Tuple[List[ModelT], Optional[SortKey]]:
+        """Return up to ``limit`` rows matching ``filters`` that sort after ``after``.
+
+        The second element is the sort key to resume from, or ``None`` when
+        there are no further rows.
+        """
+
+    def iter_chunks(
+        self,
+        filters: Optional[Mapping[str, Hashable]] = None,
+        chunk_size: int = 500,
+    ) -> Iterator[List[ModelT]]:
+        """Yield every matching row in sort order, ``chunk_size`` rows at a time.
+
+        Each chunk is fetched as its own keyset page, so no lock or
+        transaction is held across chunks and rows written mid-export are
+        picked up if they sort after the current position.
+        """
+        after: Optional[SortKey] = None
+        while True:
+            rows, after = self.page(filters or {}, after=after, limit=chunk_size)
+            if rows:
+                yield rows
+            if after is None:
+                return
+
+    # -- writes --------------------------------------------------------------
+
+    @abstractmethod
+    def add(self, item: ModelT) -> ModelT: ...
+
+    @abstractmethod
+    def update(self, key: UUID, changes: Dict[str, Any], precondition: Optional[Precondition] = None) -> ModelT:
+        """Apply ``changes`` to the stored row and bump ``updated_at``.
+
+        If ``precondition`` rejects the current row, nothing is written and
+        :class:`PreconditionFailedError` is raised.
+        """
+
+    @abstractmethod
+    def delete(self, key: UUID) -> ModelT: ...
+
+    @abstractmethod
+    def add_many(self, items: Sequence[ModelT]) -> Tuple[bool, List[BatchOutcome]]:
+        """Insert all ``items`` or none of them. Returns ``(applied, outcomes)``."""
+
+    @abstractmethod
+    def update_many(self, changes: Sequence[Tuple[UUID, Dict[str, Any]]]) -> Tuple[bool, List[BatchOutcome]]:
+        """Apply every ``(key, changes)`` pair or none of them."""
+
+    @abstractmethod
+    def delete_many(self, keys: Sequence[UUID]) -> Tuple[bool, List[BatchOutcome]]:
+        """Delete every key or none of them."""
+
+    def close(self) -> None:
+        """Release backend resources (connections, file handles)."""
+
+    # -- change notification -------------------------------------------------
+
+    def subscribe(self, listener: ChangeListener) -> None:
+        self._listeners.append(listener)
+
+    def subscribe_batches(self, listener: BatchListener) -> None:
+        self._batch_listeners.append(listener)
+
+    def _notify(self, key: UUID, item: Optional[ModelT]) -> None:
+        for listener in self._listeners:
+            listener(key, item)
+        for batch_listener in self._batch_listeners:
+            batch_listener([(key, item)])
+
+    def _notify_batch(self, applied: bool, outcomes: List[BatchOutcome], deleted: bool = False) -> None:
+        if not applied:
+            return
+        changes = [(getattr(item, self.key_field), None if deleted else item) for item in outcomes]
+        for key, item in changes:
+            for listener in self._listeners:
+                listener(key, item)
+        for batch_listener in self._batch_listeners:
+            batch_listener(changes)
+
+
+# -----------------------------------------------------------------------------
+# Indexed in-memory repository
+# -----------------------------------------------------------------------------
+
+class IndexedRepository(Repository[ModelT]):
+    """Dict-backed store with hash indexes on selected model fields.
+
+    Unique indexes map a field value to a single key and back the uniqueness
+    checks on create/update; non-unique indexes map a value to the
+    ``(created_at, key)``-sorted list of rows carrying it. A global sorted list
+    in the same order backs keyset pagination, so a page costs a bisect plus
+    ``limit`` steps regardless of how many rows are stored. ``None`` values
+    are not indexed.
+
+    Rows are held as compact tuples (see ``services.records``) keyed by the
+    UUID's integer value, and sort keys as single packed ints shared between
+    the order list and the indexes; models are only built for rows a call
+    actually returns.
+
+    Every operation is a few dict/bisect steps under a short lock, so it is
+    safe to call straight from the event loop.
+    """
+
+    blocking = False
+
+    def __init__(self, spec: EntitySpec) -> None:
+        super().__init__(spec)
+        self._lock = threading.RLock()
+        self._codec = RecordCodec(spec.model, interned=spec.indexed_fields)
+        self._key_slot = self._codec.slots[spec.key_field]
+        self._created_slot = self._codec.slots["created_at"]
+        self._rows: Dict[int, Record] = {}
+        self._unique: Dict[str, Dict[Hashable, int]] = {f: {} for f in spec.unique_fields}
+        self._multi: Dict[str, Dict[Hashable, List[int]]] = {f: {} for f in spec.indexed_fields}
+        self._order: List[int] = []
+
+    # -- reads ---------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, UUID) and key.int in self._rows
+
+    def get(self, key: UUID) -> Optional[ModelT]:
+        record = self._rows.get(key.int)
+        return None if record is None else self._codec.decode(record)
+
+    def get_many(self, keys: Sequence[UUID]) -> List[Optional[ModelT]]:
+        rows = self._rows
+        with self._lock:  # one consistent view, even against a concurrent batch write
+            records = [rows.get(key.int) for key in keys]
+        decode = self._codec.decode
+        return [None if record is None else decode(record) for record in records]
+
+    def get_by(self, field: str, value: Hashable) -> Optional[ModelT]:
+        key = self._unique[field].get(self._codec.encode_value(field, value))
+        record = None if key is None else self._rows.get(key)
+        return None if record is None else self._codec.decode(record)
+
+    def find_by(self, field: str, value: Hashable) -> List[ModelT]:
+        if field in self._unique:
+            item = self.get_by(field, value)
+            return [] if item is None else [item]
+        with self._lock:
+            records = [self._rows[key_of(k)] for k in self._multi[field].get(self._codec.encode_value(field, value), ())]
+        return [self._codec.decode(r) for r in records]
+
+    def values(self) -> List[ModelT]:
+        with self._lock:
+            records = list(self._rows.values())
+        return [self._codec.decode(r) for r in records]
+
+    def __iter__(self) -> Iterator[ModelT]:
+        return iter(self.values())
+
+    def page(
+        self,
+        filters: Mapping[str, Hashable],
+        after: Optional[SortKey] = None,
+        limit: int = 50,
+    ) -> Tuple[List[ModelT], Optional[SortKey]]:
+        """The smallest candidate list among the filtered indexes drives the
+        scan; remaining filters are checked per row."""
+        slots = self._codec.slots
+        checks = [(slots[f], self._codec.encode_value(f, v)) for f, v in filters.items() if v is not None]
+        records: List[Record] = []
+        next_key: Optional[int] = None
+        with self._lock:
+            driver = self._candidates({f: v for f, v in filters.items() if v is not None})
+            start = 0 if after is None else bisect_right(driver, pack(after))
+            for pos in range(start, len(driver)):
+                record = self._rows[key_of(driver[pos])]
+                if all(record[slot] == v for slot, v in checks):
+                    if len(records) == limit:
+                        next_key = self._sort_key(records[-1])
+                        break
+                    records.append(record)
+        rows = [self._codec.decode(r) for r in records]
+        return rows, None if next_key is None else unpack(next_key)
+
+    def _candidates(self, filters: Mapping[str, Hashable]) -> List[int]:
+        best = self._order
+        for field, value in filters.items():
+            value = self._codec.encode_value(field, value) if field in self._codec.slots else value
+            if field in self._unique:
+                key = self._unique[field].get(value)
+                return [] if key is None else [self._sort_key(self._rows[key])]
+            if field not in self._multi:
+                raise ValueError(f"{self.entity} cannot be filtered by {field!r}")
+            bucket = self._multi[field].get(value, [])
+            if len(bucket) < len(best):
+                best = bucket
+        return best
+
+    # -- writes --------------------------------------------------------------
+
+    def add(self, item: ModelT) -> ModelT:
+        with self._lock:
+            self._insert(self._codec.encode(item))
+            self._notify(self._key(item), item)
+        return item
+
+    def _insert(self, record: Record) -> None:
+        key = record[self._key_slot]
+        with self._lock:
+            if key in self._rows:
+                raise ConflictError(self.entity, self.key_field, UUID(int=key))
+            self._check_unique(record, key)
+            self._rows[key] = record
+            sort_key = self._sort_key(record)
+            self._index(record, key, sort_key)
+            insort(self._order, sort_key)
+
+    def update(self, key: UUID, changes: Dict[str, Any], precondition: Optional[Precondition] = None) -> ModelT:
+        with self._lock:
+            updated = self._update(key, changes, precondition)
+            self._notify(key, updated)
+        return updated
+
+    def delete(self, key: UUID) -> ModelT:
+        with self._lock:
+            removed = self._delete(key)
+            self._notify(key, None)
+        return removed
+
+    def _update(self, key: UUID, changes: Dict[str, Any], precondition: Optional[Precondition] = None) -> ModelT:
+        with self._lock:
+            current = self._require_record(key)
+            before = self._codec.decode(current)
+            if precondition is not None and not precondition(before):
+                raise PreconditionFailedError(self.entity, key)
+            updated = before.model_copy(update={**changes, "updated_at": next_updated_at(before.updated_at)})
+            record = self._codec.encode(updated)
+            self._check_unique(record, key.int)
+            self._replace(key.int, current, record)
+        return updated
+
+    def _delete(self, key: UUID) -> ModelT:
+        with self._lock:
+            record = self._require_record(key)
+            self.forget(key.int)
+        return self._codec.decode(record)
+
+    def _require_record(self, key: UUID) -> Record:
+        record = self._rows.get(key.int)
+        if record is None:
+            raise NotFoundError(self.entity, key)
+        return record
+
+    # -- raw records (see services.durability) -------------------------------
+
+    @property
+    def codec(self) -> RecordCodec:
+        return self._codec
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Held by every write; hold it across :meth:`cut` for a cut consistent with other stores."""
+        return self._lock
+
+    def cut(self) -> Tuple[List[int], List[Record]]:
+        """The sort order and every record, as two C-level list copies: cheap enough to take under the lock."""
+        with self._lock:
+            return self._order.copy(), list(self._rows.values())
+
+    def records(self, cut: Optional[Tuple[List[int], List[Record]]] = None) -> List[Record]:
+        """Every stored record (of ``cut``, when given) in sort order, put in order without the lock."""
+        order, records = self.cut() if cut is None else cut
+        slot = self._key_slot
+        by_key = {record[slot]: record for record in records}
+        return [by_key[key_of(k)] for k in order]
+
+    def load(self, records: Iterable[Record]) -> None:
+        """Bulk-fill an empty store, building each index once at the end.
+
+        Listeners are not told: this restores state, it does not change it.
+        """
+        with self._lock:
+            if self._rows:
+                raise RuntimeError(f"{self.entity} store is not empty")
+            for record in records:
+                key = record[self._key_slot]
+                self._check_unique(record, key)
+                self._rows[key] = record
+                sort_key = self._sort_key(record)
+                slots = self._codec.slots
+                for field, index in self._unique.items():
+                    value = record[slots[field]]
+                    if value is not None:
+                        index[value] = key
+                for field, index in self._multi.items():
+                    value = record[slots[field]]
+                    if value is not None:
+                        index.setdefault(value, []).append(sort_key)
+                self._order.append(sort_key)
+            self._order.sort()
+            for index in self._multi.values():
+                for bucket in index.values():
+                    bucket.sort()
+
+    def restore(self, record: Record) -> None:
+        """Insert or replace ``record`` without telling listeners (log replay)."""
+        key = record[self._key_slot]
+        with self._lock:
+            current = self._rows.get(key)
+            if current is None:
+                self._insert(record)
+            else:
+                self._replace(key, current, record)
+
+    def forget(self, key: int) -> None:
+        """Remove the record with integer key ``key``, if any, without telling listeners."""
+        with self._lock:
+            record = self._rows.pop(key, None)
+            if record is not None:
+                sort_key = self._sort_key(record)
+                self._unindex(record, key, sort_key)
+                _remove_sorted(self._order, sort_key)
+
+    # -- atomic batches ------------------------------------------------------
+
+    def add_many(self, items: Sequence[ModelT]) -> Tuple[bool, List[BatchOutcome]]:
+        def step(item: ModelT):
+            self._insert(self._codec.encode(item))
+            return item, lambda: self._delete(self._key(item))
+        return self._apply_atomically([(lambda item=item: step(item)) for item in items])
+
+    def update_many(self, changes: Sequence[Tuple[UUID, Dict[str, Any]]]) -> Tuple[bool, List[BatchOutcome]]:
+        def step(key: UUID, fields: Dict[str, Any]):
+            before = self._require_record(key)
+            return self._update(key, fields), lambda: self._replace(key.int, self._rows[key.int], before)
+        return self._apply_atomically([(lambda k=k, f=f: step(k, f)) for k, f in changes])
+
+    def delete_many(self, keys: Sequence[UUID]) -> Tuple[bool, List[BatchOutcome]]:
+        def step(key: UUID):
+            record = self._rows.get(key.int)
+            removed = self._delete(key)
+            return removed, lambda: self._insert(record)
+        return self._apply_atomically([(lambda k=k: step(k)) for k in keys], deleted=True)
+
+    def _apply_atomically(
+        self, steps: Sequence[Callable[[], Tuple[ModelT, Callable[[], Any]]]], deleted: bool = False
+    ) -> Tuple[bool, List[BatchOutcome]]:
+        """Run ``steps`` in order under the store lock, all-or-nothing.
+
+        Every step is attempted so the caller can report all failing items,
+        not just the first. If any step fails, the successful ones are undone
+        in reverse order before the lock is released, so readers never observe
+        a partially applied batch. Returns ``(applied, outcomes)``.
+        """
+        outcomes: List[BatchOutcome] = []
+        undo: List[Callable[[], Any]] = []
+        with self._lock:
+            for step in steps:
+                try:
+                    result, revert = step()
+                except RepositoryError as exc:
+                    outcomes.append(exc)
+                else:
+                    outcomes.append(result)
+                    undo.append(revert)
+            applied = len(undo) == len(outcomes)
+            if not applied:
+                for revert in reversed(undo):
+                    revert()
+            self._notify_batch(applied, outcomes, deleted)
+        return applied, outcomes
+
+    def _replace(self, key: int, current: Record, record: Record) -> None:
+        """Swap ``current`` for ``record`` under the same key (same ``created_at``)."""
+        sort_key = self._sort_key(current)
+        self._unindex(current, key, sort_key)
+        self._rows[key] = record
+        self._index(record, key, sort_key)
+
+    # -- index maintenance ---------------------------------------------------
+
+    def _key(self, item: ModelT) -> UUID:
+        return getattr(item, self.key_field)
+
+    def _sort_key(self, record: Record) -> int:
+        return pack_sort_key(record[self._created_slot], record[self._key_slot])
+
+    def _check_unique(self, record: Record, key: int) -> None:
+        slots = self._codec.slots
+        for field, index in self._unique.items():
+            value = record[slots[field]]
+            owner = index.get(value) if value is not None else None
+            if owner is not None and owner != key:
+                raise ConflictError(self.entity, field, self._codec.decode_value(field, value))
+
+    def _index(self, record: Record, key: int, sort_key: int) -> None:
+        slots = self._codec.slots
+        for field, index in self._unique.items():
+            value = record[slots[field]]
+            if value is not None:
+                index[value] = key
+        for field, index in self._multi.items():
+            value = record[slots[field]]
+            if value is not None:
+                insort(index.setdefault(value, []), sort_key)
+
+    def _unindex(self, record: Record, key: int, sort_key: int) -> None:
+        slots = self._codec.slots
+        for field, index in self._unique.items():
+            value = record[slots[field]]
+            if value is not None and index.get(value) == key:
+                del index[value]
+        for field, index in self._multi.items():
+            value = record[slots[field]]
+            bucket = index.get(value) if value is not None else None
+            if bucket is not None:
+                _remove_sorted(bucket, sort_key)
+                if not bucket:
+                    del index[value]
+
+
+def _remove_sorted(keys: List[int], sort_key: int) -> None:
+    pos = bisect_left(keys, sort_key)
+    if pos < len(keys) and keys[pos] == sort_key:
+        del keys[pos]
+
+
+# -----------------------------------------------------------------------------
+# Backend selection
+# -----------------------------------------------------------------------------
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "memory")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "app.db")
+
+
+def create_repository(spec: EntitySpec, backend: Optional[str] = None) -> Repository:
+    """Build the repository for ``spec`` on the configured backend.
+
+    ``memory`` keeps rows in this process only (each uvicorn worker has its
+    own copy); ``sqlite`` stores them in ``SQLITE_PATH``, shared by every
+    worker on the host.
+    """
+    backend = backend or STORAGE_BACKEND
+    if backend == "memory":
+        return IndexedRepository(spec)
+    if backend == "sqlite":
+        from services.sqlite_store import SQLiteRepository
+        return SQLiteRepository(spec, SQLITE_PATH)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected 'memory' or 'sqlite'")
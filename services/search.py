@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from services.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[^\W_]+")
+
+# A posting list: the one document carrying a term (most names, usernames and
+# emails are unique), promoted to a set once a second document shares it.
+Postings = Union[int, Set[int]]
+
+# How a matching term scores, before the field weight is applied.
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.5  # plus up to 0.4 the more of the term the prefix covers
+FUZZY_SCORE = 0.6  # times trigram similarity
+
+# New terms kept beside the main sorted dictionary before a merge: at least
+# this many, or an eighth of the dictionary.
+TAIL_SIZE = 1024
+# Check the deadline every this many terms or documents.
+CHECK_EVERY = 256
+
+
+def normalize(text: str) -> str:
+    """Case-folded, accent-stripped form of ``text`` ("Zoë" -> "zoe")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: Optional[str]) -> Tuple[str, ...]:
+    """Distinct word tokens of ``text``, in order; "jane.doe@x.com" -> jane, doe, x, com."""
+    if not text:
+        return ()
+    return tuple(dict.fromkeys(_WORD.findall(normalize(text))))
+
+
+def trigrams(term: str) -> Set[str]:
+    """Padded character trigrams, so short terms and word starts still have some."""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _members(postings: Postings) -> Iterable[int]:
+    return (postings,) if isinstance(postings, int) else postings
+
+
+def _size(postings: Postings) -> int:
+    return 1 if isinstance(postings, int) else len(postings)
+
+
+def _contains(postings: Postings, doc: int) -> bool:
+    return postings == doc if isinstance(postings, int) else doc in postings
+
+
+class _Deadline:
+    def __init__(self, seconds: float):
+        self._at = time.perf_counter() + seconds
+        self.expired = False
+
+    def check(self) -> bool:
+        """True once the budget is spent (and from then on)."""
+        if not self.expired and time.perf_counter() >= self._at:
+            self.expired = True
+        return self.expired
+
+
+# -----------------------------------------------------------------------------
+# Per-field term dictionary
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class SearchField:
+    """A model field to index. ``fuzzy`` adds trigram (typo-tolerant) matching."""
+    name: str
+    weight: float = 1.0
+    fuzzy: bool = False
+
+
+class _FieldIndex:
+    """Inverted index over one field: term -> postings, plus prefix and trigram lookup.
+
+    Prefix lookups bisect a sorted term dictionary to the range of terms
+    starting with the prefix -- the same walk a trie makes, without a dict
+    per character, which at a million distinct usernames would dwarf the
+    rows themselves. New terms are appended to a tail run that is only
+    sorted when a query needs it and merged into the main run once it grows
+    past ``TAIL_SIZE`` or an eighth of it, so a bulk load costs one sort
+    rather than an O(n) insort per term. Terms whose postings went away are
+    skipped by lookups and dropped at the next merge.
+    """
+
+    def __init__(self, field: SearchField):
+        self.field = field
+        self.postings: Dict[str, Postings] = {}
+        self._sorted: List[str] = []
+        self._tail: List[str] = []
+        self._tail_sorted = True
+        self._trigrams: Optional[Dict[str, Set[str]]] = {} if field.fuzzy else None
+
+    def add(self, term: str, doc: int) -> None:
+        current = self.postings.get(term)
+        if current is None:
+            self.postings[term] = doc
+            self._tail.append(term)
+            self._tail_sorted = False
+            if self._trigrams is not None:
+                for gram in trigrams(term):
+                    self._trigrams.setdefault(gram, set()).add(term)
+        elif isinstance(current, int):
+            if current != doc:
+                self.postings[term] = {current, doc}
+        else:
+            current.add(doc)
+
+    def discard(self, term: str, doc: int) -> None:
+        current = self.postings.get(term)
+        if current is None:
+            return
+        if isinstance(current, int):
+            if current != doc:
+                return
+            del self.postings[term]
+            if self._trigrams is not None:
+                for gram in trigrams(term):
+                    terms = self._trigrams.get(gram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self._trigrams[gram]
+            return
+        current.discard(doc)
+        if len(current) == 1:
+            self.postings[term] = next(iter(current))
+
+    def _runs(self, merge: bool = False) -> Tuple[List[str], List[str]]:
+        if not self._tail_sorted:
+            self._tail.sort()
+            self._tail_sorted = True
+        if self._tail and (merge or len(self._tail) > max(TAIL_SIZE, len(self._sorted) // 8)):
+            # Two sorted runs: timsort merges them in linear time. A term
+            # deleted and re-added may sit in both; keep one copy.
+            live = self.postings
+            merged = [t for t in self._sorted if t in live]
+            merged.extend(t for t in self._tail if t in live)
+            merged.sort()
+            self._sorted = [t for i, t in enumerate(merged) if i == 0 or merged[i - 1] != t]
+            self._tail = []
+        return self._sorted, self._tail
+
+    def prefixed(self, prefix: str, limit: int) -> List[str]:
+        """Up to ``limit`` live terms that start with ``prefix``, other than ``prefix`` itself."""
+        found: Dict[str, None] = {}
+        for terms in self._runs():
+            pos = bisect_left(terms, prefix)
+            while pos < len(terms) and len(found) < limit and terms[pos].startswith(prefix):
+                term = terms[pos]
+                if term != prefix and term in self.postings:
+                    found[term] = None
+                pos += 1
+        return list(found)
+
+    def similar(self, term: str, min_similarity: float, deadline: _Deadline) -> List[Tuple[str, float]]:
+        """Terms whose trigram sets overlap ``term``'s by at least ``min_similarity`` (Jaccard)."""
+        if self._trigrams is None:
+            return []
+        grams = trigrams(term)
+        shared: Counter = Counter()
+        for i, gram in enumerate(grams):
+            if i % 4 == 3 and deadline.check():
+                break
+            shared.update(self._trigrams.get(gram, ()))
+        found = []
+        for candidate, common in shared.items():
+            if common < min_similarity * len(grams):
+                continue  # cannot reach min_similarity whatever its length
+            similarity = common / (len(grams) + len(trigrams(candidate)) - common)
+            if similarity >= min_similarity and candidate != term:
+                found.append((candidate, similarity))
+        return found
+
+
+# -----------------------------------------------------------------------------
+# Per-entity index
+# -----------------------------------------------------------------------------
+
+class SearchIndex:
+    """Ranked prefix/fuzzy search over selected text fields of one entity.
+
+    Documents are keyed by the row's UUID (as an int) and kept current by
+    :meth:`on_change`, which a :class:`~services.repository.Repository`
+    calls after every committed write (see ``Repository.subscribe``). The
+    forward map remembers each document's terms so an update only touches
+    the terms that changed.
+
+    Every query token must match (exactly, as a prefix, or -- on fuzzy
+    fields -- by trigram similarity) in some field; a document scores the
+    mean over tokens of its best ``match score * field weight``.
+    """
+
+    def __init__(self, fields: Sequence[SearchField], max_expansions: int = 512, min_similarity: float = 0.3):
+        self.fields = tuple(fields)
+        self.max_expansions = max_expansions
+        self.min_similarity = min_similarity
+        self._lock = threading.RLock()
+        self._indexes = [_FieldIndex(f) for f in self.fields]
+        self._docs: Dict[int, Tuple[Tuple[str, ...], ...]] = {}
+        # Keys written since a backfill started; the backfill must not
+        # overwrite them with the older rows it read.
+        self._touched: Optional[Set[int]] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # -- maintenance ---------------------------------------------------------
+
+    def on_change(self, key: UUID, item: Optional[BaseModel]) -> None:
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(key.int)
+            if item is None:
+                self._remove(key.int)
+            else:
+                self._put(key.int, item)
+
+    def backfill(self, items: Iterable[BaseModel], key_field: str) -> None:
+        """Index rows read from the store, skipping any written meanwhile."""
+        for item in items:
+            doc = getattr(item, key_field).int
+            with self._lock:
+                if doc not in self._docs and (self._touched is None or doc not in self._touched):
+                    self._put(doc, item)
+
+    def compact(self) -> None:
+        """Sort and merge pending terms now, rather than in the next query.
+
+        Worth calling after a bulk load, whose first query would otherwise
+        sort every term it added.
+        """
+        with self._lock:
+            for index in self._indexes:
+                index._runs(merge=True)
+
+    def _terms(self, item: BaseModel) -> Tuple[Tuple[str, ...], ...]:
+        return tuple(tokenize(getattr(item, f.name, None)) for f in self.fields)
+
+    def _put(self, doc: int, item: BaseModel) -> None:
+        terms = self._terms(item)
+        old = self._docs.get(doc)
+        if old == terms:
+            return
+        for index, before, after in zip(self._indexes, old or [()] * len(terms), terms):
+            for term in before:
+                if term not in after:
+                    index.discard(term, doc)
+            for term in after:
+                index.add(term, doc)
+        self._docs[doc] = terms
+
+    def _remove(self, doc: int) -> None:
+        old = self._docs.pop(doc, None)
+        if old is not None:
+            for index, terms in zip(self._indexes, old):
+                for term in terms:
+                    index.discard(term, doc)
+
+    # -- queries -------------------------------------------------------------
+
+    def _sources(self, token: str, deadline: _Deadline) -> List[Tuple[float, Postings]]:
+        """``(score, postings)`` pairs matching one query token, best score first."""
+        sources: List[Tuple[float, Postings]] = []
+        for index in self._indexes:
+            weight = index.field.weight
+            exact = index.postings.get(token)
+            if exact is not None:
+                sources.append((EXACT_SCORE * weight, exact))
+            for i, term in enumerate(index.prefixed(token, self.max_expansions)):
+                if i % CHECK_EVERY == CHECK_EVERY - 1 and deadline.check():
+                    break
+                coverage = len(token) / len(term)
+                sources.append(((PREFIX_SCORE + 0.4 * coverage) * weight, index.postings[term]))
+            if index.field.fuzzy and len(token) >= 3 and not deadline.check():
+                for term, similarity in index.similar(token, self.min_similarity, deadline):
+                    if not term.startswith(token):  # already scored as a prefix match
+                        sources.append((FUZZY_SCORE * similarity * weight, index.postings[term]))
+        sources.sort(key=lambda s: -s[0])
+        return sources
+
+    def search(self, query: str, deadline: _Deadline) -> Dict[int, float]:
+        """Score every document matching all tokens of ``query``.
+
+        Candidates come from the token with the fewest matching postings;
+        each other token is then scored either by probing its postings per
+        candidate or, when that would be dearer, by materialising its scores
+        once. Stops early (keeping what it has) when ``deadline`` expires.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+        # Only term expansion needs the lock. Writes update posting sets in
+        # place, so the candidates' are copied and scored without it: a
+        # long query must not hold up writers (and, on the in-memory
+        # backend, the event loop) for its whole budget.
+        with self._lock:
+            per_token = [
+                [(score, postings if isinstance(postings, int) else postings.copy())
+                 for score, postings in self._sources(token, deadline)]
+                for token in tokens
+            ]
+        per_token.sort(key=lambda sources: sum(_size(p) for _, p in sources))
+        if not per_token[0]:
+            return {}
+        scores: Dict[int, float] = {}
+        checked = 0
+        for score, postings in per_token[0]:
+            for doc in _members(postings):
+                if doc not in scores:
+                    scores[doc] = score
+            checked += _size(postings)
+            if checked >= CHECK_EVERY:
+                checked = 0
+                if deadline.check():
+                    break
+        for sources in per_token[1:]:
+            scores = self._narrow(scores, sources, deadline)
+            if not scores:
+                return {}
+        return {doc: total / len(tokens) for doc, total in scores.items()}
+
+    @staticmethod
+    def _narrow(scores: Dict[int, float], sources: List[Tuple[float, Postings]], deadline: _Deadline) -> Dict[int, float]:
+        """Keep the candidates some source matches, adding that token's best score."""
+        narrowed: Dict[int, float] = {}
+        materialise = sum(_size(p) for _, p in sources) < len(scores) * len(sources)
+        if materialise:
+            best: Dict[int, float] = {}
+            for score, postings in sources:
+                for doc in _members(postings):
+                    if doc not in best:
+                        best[doc] = score
+            for i, (doc, total) in enumerate(scores.items()):
+                if i % CHECK_EVERY == CHECK_EVERY - 1 and deadline.check():
+                    break
+                score = best.get(doc)
+                if score is not None:
+                    narrowed[doc] = total + score
+            return narrowed
+        for i, (doc, total) in enumerate(scores.items()):
+            if i % CHECK_EVERY == CHECK_EVERY - 1 and deadline.check():
+                break
+            for score, postings in sources:
+                if _contains(postings, doc):
+                    narrowed[doc] = total + score
+                    break
+        return narrowed
+
+
+# -----------------------------------------------------------------------------
+# Search across entities
+# -----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Match:
+    kind: str
+    key: UUID
+    score: float
+
+
+class SearchService:
+    """One :class:`SearchIndex` per searchable entity, queried together.
+
+    Indexes are process-local, like the memory backend: they follow writes
+    made through this worker's repositories and are backfilled from the
+    store in a background thread at startup (``ready`` is set when that
+    finishes). With the shared SQLite backend and several workers, rows
+    written by *other* workers are only picked up at the next restart, so
+    callers should re-read hits from the store and drop those that are gone.
+
+    A query gets ``budget`` seconds; past that, the current stage stops and
+    the best hits found so far are returned, marked incomplete.
+    """
+
+    def __init__(self, budget: float = 0.05):
+        self.budget = budget
+        self.ready = threading.Event()
+        self._indexes: Dict[str, Tuple[SearchIndex, Repository]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "SearchService":
+        return cls(budget=float(os.environ.get("SEARCH_BUDGET_MS", 50)) / 1000)
+
+    @property
+    def kinds(self) -> Tuple[str, ...]:
+        return tuple(self._indexes)
+
+    def register(self, kind: str, repo: Repository, fields: Sequence[SearchField]) -> SearchIndex:
+        index = SearchIndex(fields)
+        repo.subscribe(index.on_change)
+        self._indexes[kind] = (index, repo)
+        return index
+
+    def start(self) -> None:
+        # Start recording writes before reading, so none fall in between.
+        for index, _ in self._indexes.values():
+            index._touched = set()
+        self._thread = threading.Thread(target=self._backfill, name="search-backfill", daemon=True)
+        self._thread.start()
+
+    def _backfill(self) -> None:
+        started = time.perf_counter()
+        try:
+            for kind, (index, repo) in self._indexes.items():
+                for chunk in repo.iter_chunks(chunk_size=2000):
+                    index.backfill(chunk, repo.key_field)
+                with index._lock:
+                    index._touched = None
+                index.compact()
+        except Exception:
+            logger.exception("Search backfill failed; the index only covers new writes")
+        else:
+            logger.info("Search index built in %.1fs", time.perf_counter() - started)
+        finally:
+            self.ready.set()
+
+    def forget(self, kind: str, key: UUID) -> None:
+        """Drop a hit the store no longer has (deleted by another worker)."""
+        self._indexes[kind][0].on_change(key, None)
+
+    def search(
+        self, query: str, kinds: Optional[Sequence[str]] = None, limit: int = 20, budget: Optional[float] = None
+    ) -> Tuple[List[Match], bool]:
+        """Best ``limit`` hits across ``kinds`` and whether the search ran to completion."""
+        deadline = _Deadline(self.budget if budget is None else budget)
+        scored: List[Tuple[float, str, int]] = []
+        for kind in kinds or self.kinds:
+            index, _ = self._indexes[kind]
+            scored.extend((score, kind, doc) for doc, score in index.search(query, deadline).items())
+        best = heapq.nlargest(limit, scored)
+        hits = [Match(kind, UUID(int=doc), round(score, 4)) for score, kind, doc in best]
+        return hits, not deadline.expired and self.ready.is_set()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Collapse concurrent calls for the same key into one.
+
+    The first caller for a key (the leader) starts ``fn`` as a task; every
+    caller that arrives for that key while it is running awaits the same
+    task instead of starting its own, and all of them get its result or its
+    exception. Once the task finishes the key is forgotten, so later
+    callers start a fresh call: nothing is cached here.
+
+    The shared task is shielded: a caller that is cancelled (a client that
+    disconnected) stops waiting without cancelling the call for the others.
+
+    :meth:`forget` detaches a key's call: callers already waiting still get
+    its result, later ones start a new call. Use it when the underlying data
+    changes mid-flight, so nobody who arrives after a write is handed a
+    result read before it.
+
+    ``calls`` counts calls actually made, ``coalesced`` the callers that
+    joined one already in flight. :meth:`do` runs on the event loop;
+    :meth:`forget` is a single dict operation and may be called from any
+    thread.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(fn())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(flight)
+
+    def forget(self, key: Hashable) -> None:
+        self._flights.pop(key, None)
+
+    def _land(self, key: Hashable, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            self._flights.pop(key, None)  # forget() may have raced us from another thread
+        if not flight.cancelled():
+            flight.exception()  # retrieved, even if every caller has gone
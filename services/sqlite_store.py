@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from uuid import UUID
+
+from pydantic_core import to_json
+
+from models.validation import TRUSTED
+from services.pagination import SortKey, to_micros
+from services.repository import (
+    BatchOutcome,
+    ConflictError,
+    EntitySpec,
+    ModelT,
+    NotFoundError,
+    Precondition,
+    PreconditionFailedError,
+    Repository,
+    RepositoryError,
+    next_updated_at,
+)
+
+BUSY_TIMEOUT_SECONDS = 5.0
+STATEMENT_CACHE_SIZE = 256
+# Keys per ``WHERE pk IN (...)`` in get_many; well under SQLite's bound-parameter limit.
+GET_MANY_CHUNK = 500
+
+_instances: "weakref.WeakSet[SQLiteRepository]" = weakref.WeakSet()
+
+
+class SQLiteRepository(Repository[ModelT]):
+    """Repository persisted to an SQLite database file.
+
+    Each row stores the model as JSON next to copies of its key, creation
+    time and indexed fields in their own columns. Unique fields get UNIQUE
+    indexes; other indexed fields get ``(field, created_at, pk)`` indexes so
+    filtered pages are index range scans in sort order.
+
+    The database runs in WAL mode so readers do not block the writer, and
+    every thread keeps one long-lived connection whose statement cache holds
+    the prepared form of the fixed SQL strings used here. That lets several
+    uvicorn workers share one file; because of that the store is ``shared``
+    and change notifications only cover this process's writes.
+    """
+
+    shared = True
+
+    def __init__(self, spec: EntitySpec, path: str):
+        super().__init__(spec)
+        self.path = path
+        self._local = threading.local()
+        # Held from the start of each write until listeners have been told, so
+        # they see this process's writes in commit order.
+        self._write_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._columns = ("pk", "created_at", *spec.unique_fields, *spec.indexed_fields, "data")
+        self._filterable = set(spec.unique_fields) | set(spec.indexed_fields)
+
+        t = spec.table
+        placeholders = ", ".join("?" for _ in self._columns)
+        assignments = ", ".join(f"{c} = ?" for c in self._columns[1:])
+        self._sql_insert = f"INSERT INTO {t} ({', '.join(self._columns)}) VALUES ({placeholders})"
+        self._sql_update = f"UPDATE {t} SET {assignments} WHERE pk = ?"
+        self._sql_get = f"SELECT data FROM {t} WHERE pk = ?"
+        self._sql_version = f"SELECT json_extract(data, '$.updated_at') FROM {t} WHERE pk = ?"
+        self._sql_get_many = f"SELECT pk, data FROM {t} WHERE pk IN ({', '.join('?' * GET_MANY_CHUNK)})"
+        self._sql_delete = f"DELETE FROM {t} WHERE pk = ?"
+        self._sql_count = f"SELECT COUNT(*) FROM {t}"
+        self._create_schema()
+        _instances.add(self)
+
+    # -- connections ---------------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=BUSY_TIMEOUT_SECONDS,
+                isolation_level=None,  # explicit BEGIN/COMMIT below
+                check_same_thread=False,  # only closed from another thread, in close()
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _forget_connections(self) -> None:
+        # A connection must not cross fork(): the child abandons (rather than
+        # closes) the parent's handles and opens its own on first use.
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _create_schema(self) -> None:
+        spec = self.spec
+        t = spec.table
+        fields = ", ".join(f"{f} TEXT" for f in (*spec.unique_fields, *spec.indexed_fields))
+        conn = self._conn()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {t} ("
+            f"pk TEXT PRIMARY KEY, created_at INTEGER NOT NULL, {fields + ', ' if fields else ''}data TEXT NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_order ON {t} (created_at, pk)")
+        for f in spec.unique_fields:
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {t}_{f}_uq ON {t} ({f})")
+        for f in spec.indexed_fields:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_{f}_idx ON {t} ({f}, created_at, pk)")
+
+    # -- row mapping ---------------------------------------------------------
+
+    def _row(self, item: ModelT) -> Tuple[Any, ...]:
+        spec = self.spec
+        return (
+            getattr(item, spec.key_field).hex,
+            to_micros(item.created_at),
+            *(getattr(item, f) for f in (*spec.unique_fields, *spec.indexed_fields)),
+            # Raw field values rather than model_dump_json(), which would drop
+            # exclude=True fields such as the password hash.
+            to_json(item.__dict__).decode(),
+        )
+
+    def _load(self, data: str) -> ModelT:
+        # Rows were validated on the way in: parse types, skip field checks.
+        return self.spec.model.model_validate_json(data, context=TRUSTED)
+
+    def _conflict(self, exc: sqlite3.IntegrityError, item: ModelT) -> ConflictError:
+        # Message looks like "UNIQUE constraint failed: users.email".
+        column = str(exc).rsplit(".", 1)[-1]
+        field = self.key_field if column == "pk" else column
+        return ConflictError(self.entity, field, getattr(item, field, None))
+
+    # -- reads ---------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._conn().execute(self._sql_count).fetchone()[0]
+
+    def get(self, key: UUID) -> Optional[ModelT]:
+        row = self._conn().execute(self._sql_get, (key.hex,)).fetchone()
+        return None if row is None else self._load(row[0])
+
+    def version(self, key: UUID) -> Optional[datetime]:
+        # Reads one JSON member; no model is parsed or validated.
+        row = self._conn().execute(self._sql_version, (key.hex,)).fetchone()
+        return None if row is None else datetime.fromisoformat(row[0])
+
+    def get_many(self, keys: Sequence[UUID]) -> List[Optional[ModelT]]:
+        """Look ``keys`` up ``GET_MANY_CHUNK`` at a time with one prepared ``IN`` query.
+
+        Short chunks are padded with a repeated key so every chunk reuses the
+        same cached statement. With more than one chunk the queries share a
+        read transaction, so the result is a single snapshot.
+        """
+        wanted = list(dict.fromkeys(key.hex for key in keys))
+        conn = self._conn()
+        found: Dict[str, str] = {}
+        chunks = [wanted[i:i + GET_MANY_CHUNK] for i in range(0, len(wanted), GET_MANY_CHUNK)]
+        if len(chunks) > 1:
+            conn.execute("BEGIN")
+        try:
+            for chunk in chunks:
+                params = chunk + [chunk[-1]] * (GET_MANY_CHUNK - len(chunk))
+                found.update(conn.execute(self._sql_get_many, params).fetchall())
+        finally:
+            if len(chunks) > 1:
+                conn.execute("COMMIT")
+        loaded = {pk: self._load(data) for pk, data in found.items()}
+        return [loaded.get(key.hex) for key in keys]
+
+    def get_by(self, field: str, value: Hashable) -> Optional[ModelT]:
+        if field not in self.spec.unique_fields:
+            raise ValueError(f"{self.entity}.{field} is not a unique field")
+        row = self._conn().execute(f"SELECT data FROM {self.spec.table} WHERE {field} = ?", (value,)).fetchone()
+        return None if row is None else self._load(row[0])
+
+    def find_by(self, field: str, value: Hashable) -> List[ModelT]:
+        rows, _ = self.page({field: value}, limit=-1)
+        return rows
+
+    def page(
+        self,
+        filters: Mapping[str, Hashable],
+        after: Optional[SortKey] = None,
+        limit: int = 50,
+    ) -> Tuple[List[ModelT], Optional[SortKey]]:
+        """``limit=-1`` returns every matching row."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in self._filterable:
+                raise ValueError(f"{self.entity} cannot be filtered by {field!r}")
+            clauses.append(f"{field} = ?")
+            params.append(value)
+        if after is not None:
+            clauses.append("(created_at, pk) > (?, ?)")
+            params.extend((to_micros(after[0]), after[1].hex))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT data FROM {self.spec.table}{where} ORDER BY created_at, pk LIMIT ?"
+        params.append(limit + 1 if limit >= 0 else -1)
+        rows = [self._load(data) for (data,) in self._conn().execute(sql, params)]
+        if 0 <= limit < len(rows):
+            rows = rows[:limit]
+            last = rows[-1]
+            return rows, (last.created_at, getattr(last, self.key_field))
+        return rows, None
+
+    # -- writes --------------------------------------------------------------
+
+    def add(self, item: ModelT) -> ModelT:
+        with self._write_lock:
+            try:
+                self._conn().execute(self._sql_insert, self._row(item))
+            except sqlite3.IntegrityError as exc:
+                raise self._conflict(exc, item) from exc
+            self._notify(getattr(item, self.key_field), item)
+        return item
+
+    def update(self, key: UUID, changes: Dict[str, Any], precondition: Optional[Precondition] = None) -> ModelT:
+        with self._write_lock:
+            with self._transaction() as conn:
+                updated = self._update(conn, key, changes, precondition)
+            self._notify(key, updated)
+        return updated
+
+    def delete(self, key: UUID) -> ModelT:
+        with self._write_lock:
+            with self._transaction() as conn:
+                removed = self._delete(conn, key)
+            self._notify(key, None)
+        return removed
+
+    def _update(
+        self,
+        conn: sqlite3.Connection,
+        key: UUID,
+        changes: Dict[str, Any],
+        precondition: Optional[Precondition] = None,
+    ) -> ModelT:
+        row = conn.execute(self._sql_get, (key.hex,)).fetchone()
+        if row is None:
+            raise NotFoundError(self.entity, key)
+        current = self._load(row[0])
+        if precondition is not None and not precondition(current):
+            raise PreconditionFailedError(self.entity, key)
+        updated = current.model_copy(update={**changes, "updated_at": next_updated_at(current.updated_at)})
+        try:
+            conn.execute(self._sql_update, (*self._row(updated)[1:], key.hex))
+        except sqlite3.IntegrityError as exc:
+            raise self._conflict(exc, updated) from exc
+        return updated
+
+    def _delete(self, conn: sqlite3.Connection, key: UUID) -> ModelT:
+        row = conn.execute(self._sql_get, (key.hex,)).fetchone()
+        if row is None:
+            raise NotFoundError(self.entity, key)
+        conn.execute(self._sql_delete, (key.hex,))
+        return self._load(row[0])
+
+    # -- atomic batches ------------------------------------------------------
+
+    def add_many(self, items: Sequence[ModelT]) -> Tuple[bool, List[BatchOutcome]]:
+        def step(conn: sqlite3.Connection, item: ModelT) -> ModelT:
+            try:
+                conn.execute(self._sql_insert, self._row(item))
+            except sqlite3.IntegrityError as exc:
+                raise self._conflict(exc, item) from exc
+            return item
+        return self._apply_atomically([(lambda c, item=item: step(c, item)) for item in items])
+
+    def update_many(self, changes: Sequence[Tuple[UUID, Dict[str, Any]]]) -> Tuple[bool, List[BatchOutcome]]:
+        return self._apply_atomically([(lambda c, k=k, f=f: self._update(c, k, f)) for k, f in changes])
+
+    def delete_many(self, keys: Sequence[UUID]) -> Tuple[bool, List[BatchOutcome]]:
+        return self._apply_atomically([(lambda c, k=k: self._delete(c, k)) for k in keys], deleted=True)
+
+    def _apply_atomically(
+        self, steps: Sequence[Callable[[sqlite3.Connection], ModelT]], deleted: bool = False
+    ) -> Tuple[bool, List[BatchOutcome]]:
+        """Run every step in one transaction; commit only if none failed.
+
+        A failed constraint only aborts its own statement in SQLite, so the
+        remaining steps still run and every failing item gets reported.
+        """
+        outcomes: List[BatchOutcome] = []
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for step in steps:
+                    try:
+                        outcomes.append(step(conn))
+                    except RepositoryError as exc:
+                        outcomes.append(exc)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            applied = not any(isinstance(o, RepositoryError) for o in outcomes)
+            conn.execute("COMMIT" if applied else "ROLLBACK")
+            self._notify_batch(applied, outcomes, deleted)
+        return applied, outcomes
+
+
+def _after_fork_in_child() -> None:
+    for repo in list(_instances):
+        repo._forget_connections()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,108 @@
+"""SingleFlight, and the response cache coalescing built on it, counted by loader calls."""
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+
+from services.cache import ResponseCache
+from services.singleflight import SingleFlight
+
+
+class Loader:
+    """An async loader that counts its calls and blocks until released."""
+
+    def __init__(self, result="row"):
+        self.result = result
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, *args):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def _started(*tasks):
+    await asyncio.sleep(0)  # let every task reach its first await
+    return tasks
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flights, load = SingleFlight(), Loader()
+        tasks = await _started(*(asyncio.create_task(flights.do("k", load)) for _ in range(10)))
+        load.release.set()
+        assert await asyncio.gather(*tasks) == ["row"] * 10
+        assert (load.calls, flights.calls, flights.coalesced, len(flights)) == (1, 1, 9, 0)
+
+    asyncio.run(scenario())
+
+
+def test_distinct_keys_and_later_callers_load_again():
+    async def scenario():
+        flights, load = SingleFlight(), Loader()
+        load.release.set()
+        await asyncio.gather(flights.do("a", load), flights.do("b", load))
+        await flights.do("a", load)
+        assert load.calls == 3
+
+    asyncio.run(scenario())
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flights, load = SingleFlight(), Loader(KeyError("gone"))
+        tasks = await _started(*(asyncio.create_task(flights.do("k", load)) for _ in range(3)))
+        load.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert load.calls == 1
+        assert all(isinstance(r, KeyError) for r in results)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_the_call():
+    async def scenario():
+        flights, load = SingleFlight(), Loader()
+        leaving, staying = await _started(
+            asyncio.create_task(flights.do("k", load)), asyncio.create_task(flights.do("k", load))
+        )
+        leaving.cancel()
+        load.release.set()
+        assert await staying == "row"
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        assert load.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_forget_starts_a_fresh_call_for_later_callers():
+    async def scenario():
+        flights, first, second = SingleFlight(), Loader("old"), Loader("new")
+        (before,) = await _started(asyncio.create_task(flights.do("k", first)))
+        flights.forget("k")
+        (after,) = await _started(asyncio.create_task(flights.do("k", second)))
+        first.release.set()
+        second.release.set()
+        assert (await before, await after) == ("old", "new")
+        assert (first.calls, second.calls) == (1, 1)
+
+    asyncio.run(scenario())
+
+
+def test_response_cache_coalesces_misses_then_serves_hits():
+    async def scenario():
+        cache, load, key = ResponseCache("test", capacity=100, coalesce=True), Loader(), uuid.uuid4()
+        render = lambda item: ('"etag"', item.encode())
+        tasks = await _started(*(asyncio.create_task(cache.get_or_load(key, load, render)) for _ in range(5)))
+        load.release.set()
+        assert await asyncio.gather(*tasks) == [('"etag"', b"row")] * 5
+        assert await cache.get_or_load(key, load, render) == ('"etag"', b"row")
+        assert load.calls == 1
+
+    asyncio.run(scenario())